@@ -1,16 +1,29 @@
-from fastapi import Request, HTTPException, status
+import hmac
+from typing import Optional
+
+from fastapi import Depends, Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.auth_handler import verify_token
+from app.auth.auth_handler import decode_principal
+from app.auth.auth_service import get_user_profile
+from app.config import settings
+from app.database import get_async_session
+from app.schemas.token import TokenPrincipal
 
 class JWTBearer(HTTPBearer):
     """
-    JWT Bearer token authentication dependency
+    JWT Bearer token authentication dependency.
+
+    Verifies the token once per request (and its signature once per token,
+    see decode_principal) and returns the principal, so routes read the user
+    id from it instead of decoding the token again.
     """
-    def __init__(self, auto_error: bool = True):
+    def __init__(self, auto_error: bool = True, token_type: Optional[str] = "access"):
         super(JWTBearer, self).__init__(auto_error=auto_error)
+        self.token_type = token_type
 
-    async def __call__(self, request: Request) -> str:
+    async def __call__(self, request: Request) -> TokenPrincipal:
         credentials: HTTPAuthorizationCredentials = await super(JWTBearer, self).__call__(request)
         if credentials:
             if not credentials.scheme == "Bearer":
@@ -18,24 +31,73 @@ class JWTBearer(HTTPBearer):
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Invalid authentication scheme.",
                 )
-            if not self.verify_jwt(credentials.credentials):
+            principal = self.verify_jwt(credentials.credentials)
+            if principal is None:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Invalid token or expired token.",
                 )
-            return credentials.credentials
+            return principal
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Invalid authorization code.",
             )
 
-    def verify_jwt(self, jwtoken: str) -> bool:
+    def verify_jwt(self, jwtoken: str) -> Optional[TokenPrincipal]:
         """
-        Verify JWT token
+        Verify JWT token and return its principal, or None if it is invalid
+        or not of the expected type
         """
         try:
-            payload = verify_token(jwtoken)
-            return True
-        except:
-            return False
+            principal = decode_principal(jwtoken)
+        except HTTPException:
+            return None
+        if self.token_type is not None and principal.type != self.token_type:
+            return None
+        return principal
+
+# The principal of the access token sent with the request
+get_current_principal = JWTBearer()
+
+async def get_admin_principal(
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
+) -> TokenPrincipal:
+    """
+    The principal of the access token sent with the request, which must
+    belong to an admin user.
+
+    The admin flag is read from the user's current profile (cached, see
+    get_user_profile), not from profile claims in the token, so revoking
+    admin rights does not wait for the token to expire.
+
+    Raises:
+        HTTPException: 403 if the user is not an admin
+    """
+    profile = await session.run_sync(get_user_profile, principal.user_id)
+    if profile is None or not profile.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required.",
+        )
+    return principal
+
+async def require_metrics_access(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+) -> None:
+    """
+    Allow the request if it carries METRICS_TOKEN as bearer token (for a
+    Prometheus scraper, which cannot log in) or the access token of an admin user.
+
+    Raises:
+        HTTPException: 403 if neither is sent
+    """
+    authorization = request.headers.get("Authorization", "")
+    if settings.metrics_token and hmac.compare_digest(
+        authorization.encode("utf-8"), f"Bearer {settings.metrics_token}".encode("utf-8")
+    ):
+        return
+    principal = await get_current_principal(request)
+    await get_admin_principal(principal, session)
@@ -1,3 +1,6 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 
@@ -6,6 +9,8 @@ from fastapi import HTTPException, status
 
 # Import settings from config
 from app.config import settings
+from app.cache import LRUCache, register_cache
+from app.schemas.token import TokenPrincipal, UserProfile
 
 # JWT Configuration
 SECRET_KEY = settings.jwt_secret
@@ -23,13 +28,26 @@ def create_access_token(data: Dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def access_token_claims(profile: UserProfile) -> Dict:
+    """
+    Claims of an access token for a user: the subject, plus the display
+    fields when ACCESS_TOKEN_PROFILE_CLAIMS is enabled so that /auth/me can
+    be answered from the token alone
+    """
+    claims = {"sub": str(profile.id)}
+    if settings.access_token_profile_claims:
+        claims["profile"] = profile.model_dump(exclude={"id"})
+    return claims
+
 def create_refresh_token(data: Dict) -> str:
     """
     Create a new refresh token
     """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti keeps two tokens issued to the same user in the same second apart,
+    # since they are stored under a unique digest
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_hex(8)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -47,16 +65,52 @@ def verify_token(token: str) -> Dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_user_id_from_token(token: str) -> int:
+# Principals of already verified tokens, keyed by the SHA-256 of the token;
+# every entry expires when its token does, so a cached token is never accepted
+# past its exp
+verified_tokens = register_cache(
+    "verified_tokens",
+    LRUCache(max_entries=settings.token_cache_max_entries, ttl_seconds=0)
+)
+
+def decode_principal(token: str) -> TokenPrincipal:
     """
-    Extract user_id from a token
+    Verify a token once and return its user id, expiry, type and, if the
+    token carries them, the user's display fields.
+
+    The signature is only checked the first time a token is seen; later
+    requests with the same token are answered from verified_tokens.
+
+    Raises:
+        HTTPException: 401 if the token is invalid, expired or has no subject
     """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    found, principal = verified_tokens.lookup(key)
+    if found:
+        return principal
+
     payload = verify_token(token)
-    user_id = payload.get("sub")
-    if user_id is None:
+    try:
+        user_id = int(payload["sub"])
+        profile = payload.get("profile")
+        principal = TokenPrincipal(
+            user_id=user_id,
+            exp=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            type=payload.get("type"),
+            profile=UserProfile(id=user_id, **profile) if profile else None
+        )
+    except (KeyError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return int(user_id)
+
+    verified_tokens.set(key, principal, ttl=payload["exp"] - time.time())
+    return principal
+
+def get_user_id_from_token(token: str) -> int:
+    """
+    Extract user_id from a token
+    """
+    return decode_principal(token).user_id
@@ -3,21 +3,23 @@ from typing import Dict, Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
-from app.models.user import User
-from app.auth.auth_bearer import JWTBearer
+from app.database import get_async_session
+from app.auth.auth_bearer import get_current_principal
 from app.auth.auth_handler import (
+    access_token_claims,
     create_access_token, 
     create_refresh_token, 
-    verify_token,
-    get_user_id_from_token,
+    decode_principal,
     REFRESH_TOKEN_EXPIRE_DAYS
 )
+from app.schemas.token import TokenPrincipal
 from app.auth.auth_service import (
-    authenticate_user, 
+    authenticate_user_async,
+    cache_user_profile,
     get_user_by_email,
+    get_user_profile,
     create_refresh_token_in_db,
     get_refresh_token,
     revoke_token,
@@ -31,12 +33,12 @@ async def login(
     response: Response,
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Login endpoint to get access token and refresh token
     """
-    user = authenticate_user(session, form_data.username, form_data.password)
+    user = await authenticate_user_async(session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,7 +47,8 @@ async def login(
         )
     
     # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
+    profile = cache_user_profile(user)
+    access_token = create_access_token(data=access_token_claims(profile))
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
     
     # Store refresh token in database
@@ -53,8 +56,8 @@ async def login(
     user_agent = request.headers.get("user-agent")
     client_host = request.client.host if request.client else None
     
-    create_refresh_token_in_db(
-        session=session,
+    await session.run_sync(
+        create_refresh_token_in_db,
         user_id=user.id,
         token=refresh_token,
         expires_at=expires_at,
@@ -76,20 +79,14 @@ async def login(
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "admin": user.admin
-        }
+        "user": profile.model_dump()
     }
 
 @router.post("/refresh")
 async def refresh_token_endpoint(
     response: Response,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Refresh access token using refresh token from cookie
@@ -103,7 +100,7 @@ async def refresh_token_endpoint(
         )
     
     # Verify token in database
-    db_token = get_refresh_token(session, refresh_token)
+    db_token = await session.run_sync(get_refresh_token, refresh_token)
     if not db_token:
         response.delete_cookie(key="refresh_token")
         raise HTTPException(
@@ -114,15 +111,15 @@ async def refresh_token_endpoint(
     
     # Verify JWT
     try:
-        payload = verify_token(refresh_token)
-        if payload.get("type") != "refresh":
+        principal = decode_principal(refresh_token)
+        if principal.type != "refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        user_id = int(payload.get("sub"))
+        user_id = principal.user_id
         if user_id != db_token.user_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -131,27 +128,21 @@ async def refresh_token_endpoint(
             )
         
         # Get user
-        user = session.get(User, user_id)
-        if not user:
+        profile = await session.run_sync(get_user_profile, user_id)
+        if not profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
         
         # Create new access token
-        access_token = create_access_token(data={"sub": str(user.id)})
+        access_token = create_access_token(data=access_token_claims(profile))
         
         # Return new access token
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "admin": user.admin
-            }
+            "user": profile.model_dump()
         }
     
     except:
@@ -166,14 +157,14 @@ async def refresh_token_endpoint(
 async def logout(
     response: Response,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Logout endpoint to revoke refresh token
     """
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
-        revoke_token(session, refresh_token)
+        await session.run_sync(revoke_token, refresh_token)
     
     response.delete_cookie(key="refresh_token")
     return {"message": "Successfully logged out"}
@@ -181,39 +172,34 @@ async def logout(
 @router.post("/logout-all")
 async def logout_all(
     response: Response,
-    token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Logout from all devices by revoking all refresh tokens
     """
-    user_id = get_user_id_from_token(token)
-    revoke_all_user_tokens(session, user_id)
+    await session.run_sync(revoke_all_user_tokens, principal.user_id)
     
     response.delete_cookie(key="refresh_token")
     return {"message": "Successfully logged out from all devices"}
 
 @router.get("/me")
 async def get_current_user(
-    token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
-    Get current user information
+    Get current user information, from the access token when it carries the
+    profile and otherwise from the user profile cache
     """
-    user_id = get_user_id_from_token(token)
-    user = session.get(User, user_id)
+    profile = principal.profile
+    if profile is None:
+        profile = await session.run_sync(get_user_profile, principal.user_id)
     
-    if user is None:
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
     
-    return {
-        "id": user.id,
-        "email": user.email,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "admin": user.admin
-    }
+    return profile.model_dump()
@@ -1,10 +1,35 @@
+import asyncio
+import hashlib
+import logging
 from typing import Optional
 from datetime import datetime, timezone
+from sqlalchemy import delete, event, or_, update
+from sqlalchemy.orm import object_session
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.cache import LRUCache, register_cache
+from app.config import settings
+from app.database import async_engine
+from app.events import mark_tables_changed
 from app.models.user import User
 from app.models.refresh_token import RefreshToken
-from app.auth.password import verify_password
+from app.schemas.token import UserProfile
+from app.auth.password import (
+    verify_password,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash
+)
+
+logger = logging.getLogger(__name__)
+
+def utc_now() -> datetime:
+    """
+    Current UTC time as a naive datetime, as stored in the refresh_token
+    columns (timestamp without time zone); asyncpg refuses aware values there
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 def get_user_by_email(session: Session, email: str) -> Optional[User]:
     """
@@ -24,6 +49,99 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
         return None
     return user
 
+async def authenticate_user_async(session: AsyncSession, email: str, password: str) -> Optional[User]:
+    """
+    Authenticate a user with email and password, checking the password on the
+    bcrypt pool so that the event loop keeps serving other requests.
+
+    With PASSWORD_REHASH_ON_LOGIN, a password hashed with another cost factor
+    than BCRYPT_ROUNDS is rehashed and saved once it has been verified.
+
+    Raises:
+        HTTPException: 503 if the bcrypt pool is saturated
+    """
+    user = await session.run_sync(get_user_by_email, email)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.password):
+        return None
+    if settings.password_rehash_on_login and password_needs_rehash(user.password):
+        user.password = await get_password_hash_async(password)
+        session.add(user)
+        await session.commit()
+    return user
+
+# Display fields of recently seen users by id, for /auth/me and /auth/refresh.
+# Entries are tagged "user:<id>" and dropped once a commit updates or deletes
+# that user through the ORM; USER_PROFILE_CACHE_TTL_SECONDS bounds how stale
+# they get after writes this worker does not see (other workers, scripts).
+user_profile_cache = register_cache(
+    "user_profiles",
+    LRUCache(max_entries=settings.user_profile_cache_max_entries, ttl_seconds=settings.user_profile_cache_ttl_seconds)
+)
+
+def _user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def cache_user_profile(user: User) -> UserProfile:
+    """
+    Build the profile of a user just loaded from the database and cache it
+    """
+    profile = UserProfile(
+        id=user.id,
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        admin=bool(user.admin)
+    )
+    user_profile_cache.set(user.id, profile, tags=(_user_tag(user.id),))
+    return profile
+
+def get_user_profile(session: Session, user_id: int) -> Optional[UserProfile]:
+    """
+    Get the display fields of a user, from user_profile_cache when possible.
+
+    Returns:
+        The profile, or None if the user does not exist (not cached)
+    """
+    found, profile = user_profile_cache.lookup(user_id)
+    if found:
+        return profile
+    user = session.get(User, user_id)
+    if user is None:
+        return None
+    return cache_user_profile(user)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_profile(mapper, connection, target: User) -> None:
+    # Passwords included: any change to the row drops the cached profile once committed
+    session = object_session(target)
+    if session is not None:
+        mark_tables_changed(session, (_user_tag(target.id),))
+
+def hash_refresh_token(token: str) -> str:
+    """
+    SHA-256 hex digest a refresh token is stored and looked up under
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+# Refresh token state by digest: (id, user_id, expires_at, is_revoked).
+# Revocation is final, so revoked entries are kept until the token expires;
+# valid entries only live REFRESH_TOKEN_CACHE_TTL_SECONDS, which bounds how
+# long a token revoked through another worker is still accepted here.
+refresh_token_cache = register_cache(
+    "refresh_tokens",
+    LRUCache(max_entries=settings.refresh_token_cache_max_entries, ttl_seconds=settings.refresh_token_cache_ttl_seconds)
+)
+
+def _cache_refresh_token(token_hash: str, token_id: int, user_id: int, expires_at: datetime, is_revoked: bool) -> None:
+    if is_revoked:
+        ttl = (expires_at - utc_now()).total_seconds()
+    else:
+        ttl = min(settings.refresh_token_cache_ttl_seconds, (expires_at - utc_now()).total_seconds())
+    refresh_token_cache.set(token_hash, (token_id, user_id, expires_at, is_revoked), ttl=ttl)
+
 def create_refresh_token_in_db(
     session: Session, 
     user_id: int, 
@@ -33,13 +151,15 @@ def create_refresh_token_in_db(
     ip_address: Optional[str] = None
 ) -> RefreshToken:
     """
-    Store a refresh token in the database
+    Store the digest of a refresh token in the database
     """
+    if expires_at.tzinfo is not None:
+        expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
     db_token = RefreshToken(
         user_id=user_id,
-        token=token,
+        token_hash=hash_refresh_token(token),
         expires_at=expires_at,
-        created_at=datetime.now(timezone.utc),
+        created_at=utc_now(),
         is_revoked=False,
         user_agent=user_agent,
         ip_address=ip_address
@@ -47,45 +167,110 @@ def create_refresh_token_in_db(
     session.add(db_token)
     session.commit()
     session.refresh(db_token)
+    _cache_refresh_token(db_token.token_hash, db_token.id, user_id, expires_at, False)
     return db_token
 
 def get_refresh_token(session: Session, token: str) -> Optional[RefreshToken]:
     """
-    Get a refresh token from the database
+    Get a refresh token that is neither revoked nor expired.
+
+    Answered from refresh_token_cache when the token was seen recently,
+    otherwise with one lookup on the unique token_hash index.
     """
-    statement = select(RefreshToken).where(
-        RefreshToken.token == token,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.now(timezone.utc)
+    token_hash = hash_refresh_token(token)
+    found, entry = refresh_token_cache.lookup(token_hash)
+    if not found:
+        db_token = session.exec(select(RefreshToken).where(RefreshToken.token_hash == token_hash)).first()
+        if db_token is None:
+            return None
+        entry = (db_token.id, db_token.user_id, db_token.expires_at, db_token.is_revoked)
+        _cache_refresh_token(token_hash, *entry)
+
+    token_id, user_id, expires_at, is_revoked = entry
+    if is_revoked or expires_at <= utc_now():
+        return None
+    return RefreshToken(
+        id=token_id, user_id=user_id, token_hash=token_hash, expires_at=expires_at, is_revoked=False
     )
-    return session.exec(statement).first()
 
 def revoke_token(session: Session, token: str) -> bool:
     """
     Revoke a refresh token
     """
-    db_token = get_refresh_token(session, token)
-    if not db_token:
-        return False
-    
-    db_token.is_revoked = True
-    session.add(db_token)
+    token_hash = hash_refresh_token(token)
+    revoked = session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == token_hash, RefreshToken.is_revoked == False)
+        .values(is_revoked=True)
+        .returning(RefreshToken.id, RefreshToken.user_id, RefreshToken.expires_at)
+    ).first()
     session.commit()
+    if revoked is None:
+        return False
+    _cache_refresh_token(token_hash, *revoked, True)
     return True
 
 def revoke_all_user_tokens(session: Session, user_id: int) -> bool:
     """
-    Revoke all refresh tokens for a user
+    Revoke all refresh tokens for a user with a single UPDATE
     """
-    statement = select(RefreshToken).where(
-        RefreshToken.user_id == user_id,
-        RefreshToken.is_revoked == False
-    )
-    tokens = session.exec(statement).all()
-    
-    for token in tokens:
-        token.is_revoked = True
-        session.add(token)
-    
+    revoked = session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.is_revoked == False)
+        .values(is_revoked=True)
+        .returning(RefreshToken.token_hash, RefreshToken.id, RefreshToken.expires_at)
+    ).all()
     session.commit()
+    for token_hash, token_id, expires_at in revoked:
+        _cache_refresh_token(token_hash, token_id, user_id, expires_at, True)
     return True
+
+def delete_expired_refresh_tokens(session: Session, batch_size: int = 1000) -> int:
+    """
+    Delete up to batch_size expired or revoked refresh tokens and return how many were deleted.
+
+    Revocation is final and get_refresh_token refuses a token without a row
+    just like a revoked one, so revoked rows are deleted right away instead
+    of staying until they expire. Rows locked by another sweeper are
+    skipped, so several workers can sweep at the same time without waiting
+    on each other.
+    """
+    expired = (
+        select(RefreshToken.id)
+        .where(or_(RefreshToken.expires_at < utc_now(), RefreshToken.is_revoked == True))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = session.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired)))
+    session.commit()
+    return result.rowcount
+
+async def sweep_expired_refresh_tokens(
+    interval_seconds: float,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1
+) -> None:
+    """
+    Background task deleting expired and revoked refresh tokens every interval_seconds.
+
+    Rows are deleted in small batches, each in its own short transaction
+    with a pause in between, so the sweep never holds many locks or
+    competes with logins for long.
+    """
+    while True:
+        try:
+            deleted = 0
+            while True:
+                async with AsyncSession(async_engine) as session:
+                    count = await session.run_sync(delete_expired_refresh_tokens, batch_size)
+                deleted += count
+                if count < batch_size:
+                    break
+                await asyncio.sleep(pause_seconds)
+            if deleted:
+                logger.info("Deleted %d expired or revoked refresh tokens", deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Refresh token sweep failed", exc_info=True)
+        await asyncio.sleep(interval_seconds)
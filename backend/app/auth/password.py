@@ -1,9 +1,18 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from app.config import settings
+from app import metrics
+
 # Thử sử dụng CryptContext với xử lý lỗi
 try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 except Exception as e:
     print(f"Error initializing CryptContext: {e}")
     # Fallback to direct bcrypt usage
@@ -50,7 +59,7 @@ def get_password_hash(password: str) -> str:
         if isinstance(password, str):
             password = password.encode('utf-8')
 
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
         hashed = bcrypt.hashpw(password, salt)
 
         # Return as string
@@ -60,3 +69,79 @@ def get_password_hash(password: str) -> str:
     except Exception as e:
         print(f"Error using direct bcrypt: {e}")
         raise
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a bcrypt hash was made with another cost factor than BCRYPT_ROUNDS
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != settings.bcrypt_rounds
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop on a dedicated thread pool.
+
+    bcrypt releases the GIL while hashing, so the worker threads hash in
+    parallel while the event loop keeps serving other requests. At most
+    `concurrency` hashes run at once; further callers wait for a slot for up
+    to `queue_timeout` seconds and then get a 503, so a burst of logins is
+    shed instead of queueing without bound.
+    """
+    def __init__(self, concurrency: int, queue_timeout: float):
+        self.concurrency = max(1, concurrency)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the event loop it is first used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._slots
+
+    async def run(self, function, *args):
+        slots = self._semaphore()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.password_hash_rejections.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts at the moment, please try again",
+                headers={"Retry-After": str(max(1, round(self.queue_timeout)))},
+            )
+        metrics.password_hash_wait.observe(time.perf_counter() - started)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            slots.release()
+
+password_hasher = PasswordHasher(
+    concurrency=settings.password_hash_concurrency,
+    queue_timeout=settings.password_hash_queue_timeout_seconds
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password on the bcrypt pool, without blocking the event loop
+
+    Raises:
+        HTTPException: 503 if no bcrypt slot frees up within the queue timeout
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash on the bcrypt pool, without blocking the event loop
+
+    Raises:
+        HTTPException: 503 if no bcrypt slot frees up within the queue timeout
+    """
+    return await password_hasher.run(get_password_hash, password)
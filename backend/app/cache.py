@@ -0,0 +1,331 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Mapping, Optional, Set, Tuple
+
+from app.config import settings
+from app.events import on_tables_changed
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with a size bound, per-entry TTL and tags.
+
+    When full, the least recently used entry is evicted. Every entry can carry
+    tags (table names for the catalog caches) so that all entries depending on
+    a table can be dropped at once with invalidate_tags().
+
+    A value computed while its tags were invalidated may come from data older
+    than the invalidation. Callers read version(tags) before computing and
+    pass it to set(), which then drops the value if the tags have been
+    invalidated since. Tags only found out while computing (see add_tags)
+    are passed as extra_tags and checked the same way.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Set[str], Any]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+        # Invalidation counts per tag, and of clear(), behind version()
+        self._tag_invalidations: Dict[str, int] = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        # Caller must hold the lock
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Return (found, value) for key, counting a hit or a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Return the cached value for key, or default if it is missing or expired
+        """
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def version(self, tags: Iterable[str]) -> int:
+        """
+        Get a number that grows whenever any of the tags is invalidated
+        """
+        with self._lock:
+            return self._clears + sum(self._tag_invalidations.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        version: Optional[int] = None,
+        extra_tags: Optional[Mapping[str, int]] = None
+    ) -> None:
+        """
+        Store value under key for ttl seconds (defaults to ttl_seconds).
+
+        With version (from version(tags) before value was computed), the value
+        is not stored if the tags have been invalidated in the meantime; the
+        same goes for extra_tags (from collect_tags()), which the entry is
+        tagged with as well.
+        """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        version_tags = set(tags)
+        extra_tags = extra_tags or {}
+        tags = version_tags | set(extra_tags)
+        with self._lock:
+            if (version is not None and version != self._clears + sum(
+                self._tag_invalidations.get(tag, 0) for tag in version_tags
+            )) or _tags_invalidated_since(extra_tags):
+                self.stale_writes += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a single entry
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Drop every entry carrying any of the given tags and return how many were dropped
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                self._tag_invalidations[tag] = self._tag_invalidations.get(tag, 0) + 1
+                keys |= self._keys_by_tag.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self._clears += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size and hit/miss counters of this cache
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_writes': self.stale_writes
+            }
+
+def copy_result(value: Any) -> Any:
+    """
+    Copy the dicts and lists of a cached result.
+
+    Cached results are shared by every request, so a caller that changes what
+    it got back must not change the entry; everything else in a result
+    (numbers, strings, dates, frozen models) is immutable and shared as is.
+    """
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(copy_result(item) for item in value)
+    return value
+
+# Tables read by the book listings and details
+CATALOG_TABLES = {"book", "book_stats", "review", "discount", "author", "category"}
+
+# Every named cache, for stats and table-driven invalidation
+_caches: Dict[str, LRUCache] = {}
+
+# Invalidations per tag through invalidate_tags(), which the extra tags of a
+# result are checked against when it is stored
+_tag_epochs: Dict[str, int] = {}
+_tag_epochs_lock = threading.Lock()
+
+# Extra tags of the cached result being computed, with their epoch when first
+# added; mutated in place so that worker threads and tasks share it
+_extra_tags: ContextVar[Optional[Dict[str, int]]] = ContextVar("extra_tags", default=None)
+
+def _tags_invalidated_since(extra_tags: Mapping[str, int]) -> bool:
+    return any(_tag_epochs.get(tag, 0) != epoch for tag, epoch in extra_tags.items())
+
+def add_tags(tags: Iterable[str]) -> None:
+    """
+    Tag the cached results being computed with more than the tables they
+    read, e.g. a cover whose variants are still being built, so that
+    invalidate_tags() drops just those results when it changes. Does nothing
+    outside of collect_tags().
+    """
+    with _tag_epochs_lock:
+        reuse_tags({tag: _tag_epochs.get(tag, 0) for tag in tags})
+
+def reuse_tags(extra_tags: Mapping[str, int]) -> None:
+    """
+    Pass the extra tags of a cached result that is reused on to the results
+    being computed from it
+    """
+    collected = _extra_tags.get()
+    if collected is not None:
+        for tag, epoch in extra_tags.items():
+            collected.setdefault(tag, epoch)
+
+@contextmanager
+def collect_tags() -> Iterator[Dict[str, int]]:
+    """
+    Collect the tags added by add_tags() and reuse_tags() inside the block,
+    which an enclosing collect_tags() block receives as well
+    """
+    collected: Dict[str, int] = {}
+    token = _extra_tags.set(collected)
+    try:
+        yield collected
+    finally:
+        _extra_tags.reset(token)
+        reuse_tags(collected)
+
+def register_cache(name: str, cache: LRUCache) -> LRUCache:
+    """
+    Register a cache under a name so it shows up in cache_stats()
+    """
+    _caches[name] = cache
+    return cache
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the stats of every registered cache
+    """
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def invalidate_tags(tags: Iterable[str]) -> int:
+    """
+    Drop the entries carrying any of the given tags from every registered cache
+    """
+    tags = set(tags)
+    # Before the entries, so a result tagged earlier is never stored after them
+    with _tag_epochs_lock:
+        for tag in tags:
+            _tag_epochs[tag] = _tag_epochs.get(tag, 0) + 1
+    return sum(cache.invalidate_tags(tags) for cache in _caches.values())
+
+def clear_caches() -> None:
+    """
+    Drop every entry of every registered cache
+    """
+    for cache in _caches.values():
+        cache.clear()
+
+def cached(
+    name: str,
+    tags: Iterable[str],
+    ttl_seconds: Optional[float] = None,
+    max_entries: Optional[int] = None,
+    ignore: Iterable[str] = ("session",)
+) -> Callable:
+    """
+    Cache the results of a service function by its arguments.
+
+    The cache key is built from every bound argument except those in ignore
+    (the database session by default). Entries are tagged with the tables the
+    function reads, and are dropped when a commit writes to any of them.
+    Exceptions are not cached, nor are results whose tables were invalidated
+    while they were computed. Tags added while computing (see add_tags) are
+    kept with the entry and passed on whenever it is reused. Every caller
+    gets its own copy of the result (see copy_result).
+
+    Args:
+        name: Name of the cache in cache_stats()
+        tags: Tables the function reads
+        ttl_seconds: Entry lifetime (defaults to CACHE_TTL_SECONDS)
+        max_entries: Size bound (defaults to CACHE_MAX_ENTRIES)
+        ignore: Argument names left out of the key
+    """
+    tags = set(tags)
+    ignore = set(ignore)
+    cache = register_cache(name, LRUCache(
+        max_entries=settings.cache_max_entries if max_entries is None else max_entries,
+        ttl_seconds=settings.cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+    ))
+
+    def decorator(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple((arg, value) for arg, value in bound.arguments.items() if arg not in ignore)
+
+            found, entry = cache.lookup(key)
+            if found:
+                value, extra_tags = entry
+                reuse_tags(extra_tags)
+                return copy_result(value)
+
+            version = cache.version(tags)
+            with collect_tags() as extra_tags:
+                value = function(*args, **kwargs)
+            cache.set(key, (copy_result(value), extra_tags), tags=tags, version=version, extra_tags=extra_tags)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+on_tables_changed(None, invalidate_tags)
@@ -1,13 +1,43 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 
+# backend/, the default cover image directories are resolved from it
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings(BaseSettings):
     database_url: str = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/bookworm")
     sqlalchemy_string: str = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/bookworm")
+    async_database_url: str = os.getenv("ASYNC_DATABASE_URL", "")
     jwt_secret: str = os.getenv("JWT_SECRET", "your_jwt_secret_key_here")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     refresh_token_expire_days: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    refresh_token_cache_max_entries: int = int(os.getenv("REFRESH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    refresh_token_cache_ttl_seconds: int = int(os.getenv("REFRESH_TOKEN_CACHE_TTL_SECONDS", "30"))
+    refresh_token_sweep_interval_seconds: int = int(os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_concurrency: int = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2"))
+    password_hash_queue_timeout_seconds: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+    password_rehash_on_login: bool = os.getenv("PASSWORD_REHASH_ON_LOGIN", "false").lower() in ("1", "true", "yes")
+    user_profile_cache_max_entries: int = int(os.getenv("USER_PROFILE_CACHE_MAX_ENTRIES", "10000"))
+    user_profile_cache_ttl_seconds: int = int(os.getenv("USER_PROFILE_CACHE_TTL_SECONDS", "300"))
+    access_token_profile_claims: bool = os.getenv("ACCESS_TOKEN_PROFILE_CLAIMS", "false").lower() in ("1", "true", "yes")
+    token_cache_max_entries: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    pricing_date: str = os.getenv("PRICING_DATE", "2022-10-08")
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    cache_ttl_seconds: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    facet_cache_ttl_seconds: int = int(os.getenv("FACET_CACHE_TTL_SECONDS", "300"))
+    home_cache_ttl_seconds: int = int(os.getenv("HOME_CACHE_TTL_SECONDS", "60"))
+    cover_source_dir: str = os.getenv("COVER_SOURCE_DIR", os.path.join(os.path.dirname(BACKEND_DIR), "book_images"))
+    cover_variant_dir: str = os.getenv("COVER_VARIANT_DIR", os.path.join(BACKEND_DIR, ".cover_variants"))
+    cover_base_url: str = os.getenv("COVER_BASE_URL", "/covers")
+    catalog_version_poll_seconds: float = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "1"))
+    orm_strict_loading: bool = os.getenv("ORM_STRICT_LOADING", "false").lower() in ("1", "true", "yes")
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    sql_echo: bool = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+    sql_slow_query_ms: float = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    sql_request_statement_warning: int = int(os.getenv("SQL_REQUEST_STATEMENT_WARNING", "25"))
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='allow')
 
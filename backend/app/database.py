@@ -1,8 +1,59 @@
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from app.config import settings
+from app.instrumentation import instrument_engine
+from app.metrics import TimedAsyncQueuePool, TimedQueuePool, register_engine
 
-engine = create_engine(settings.sqlalchemy_string, echo=True)
+def _pool_options(url: str, poolclass) -> dict:
+    # PostgreSQL gets the default queue pool with checkout timing; SQLite
+    # (local runs) keeps the pool SQLAlchemy picks for it
+    return {"poolclass": poolclass} if make_url(url).get_backend_name() == "postgresql" else {}
+
+# Statements are timed and slow ones logged by app.instrumentation;
+# SQL_ECHO=true additionally logs every statement
+engine = create_engine(
+    settings.sqlalchemy_string,
+    echo=settings.sql_echo,
+    **_pool_options(settings.sqlalchemy_string, TimedQueuePool)
+)
+
+def to_async_database_url(url: str) -> str:
+    """
+    Turn a sync database URL into the matching asyncio driver URL
+    """
+    scheme, _, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+def asyncpg_dsn() -> str:
+    """
+    Get the plain asyncpg DSN of the configured database, for bulk COPY loads
+    """
+    return async_database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+async_database_url = settings.async_database_url or to_async_database_url(settings.sqlalchemy_string)
+
+async_engine = create_async_engine(
+    async_database_url,
+    echo=settings.sql_echo,
+    **_pool_options(async_database_url, TimedAsyncQueuePool)
+)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+register_engine("sync", engine)
+register_engine("async", async_engine.sync_engine)
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,72 @@
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# (tables, callback) pairs registered through on_tables_changed; None watches every table
+_listeners: List[Tuple[Optional[Set[str]], Callable[[Set[str]], None]]] = []
+# (tables, callback) pairs registered through on_tables_changed_in_database
+_database_listeners: List[Tuple[Set[str], Callable[[Set[str]], None]]] = []
+
+def on_tables_changed(tables: Optional[Iterable[str]], callback: Callable[[Set[str]], None]) -> None:
+    """
+    Call callback(changed_tables) after a commit that wrote to any of the given tables,
+    or to any table at all when tables is None
+    """
+    _listeners.append((set(tables) if tables is not None else None, callback))
+
+def notify_tables_changed(tables: Iterable[str]) -> None:
+    """
+    Run the callbacks registered for any of the given tables.
+
+    Called automatically for ORM writes; bulk Core/COPY writes that bypass the
+    session should call it themselves once they are committed.
+    """
+    changed = set(tables)
+    for watched, callback in _listeners:
+        if watched is None or watched & changed:
+            callback(changed)
+
+def on_tables_changed_in_database(tables: Iterable[str], callback: Callable[[Set[str]], None]) -> None:
+    """
+    Call callback(changed_tables) once the catalog version poller
+    (app.http_cache) has seen committed writes to any of the given tables,
+    made by any process, this one included.
+
+    For state kept current locally by other means that must also follow
+    writes of other workers, imports and manual SQL.
+    """
+    _database_listeners.append((set(tables), callback))
+
+def notify_tables_changed_in_database(tables: Iterable[str]) -> None:
+    """
+    Run the callbacks registered with on_tables_changed_in_database for any of the given tables
+    """
+    changed = set(tables)
+    for watched, callback in _database_listeners:
+        if watched & changed:
+            callback(changed)
+
+def mark_tables_changed(session: Session, tables: Iterable[str]) -> None:
+    """
+    Record tables written with Core statements on this session, so their
+    callbacks run after the commit just like for ORM writes
+    """
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context) -> None:
+    changed = session.info.setdefault("changed_tables", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session) -> None:
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        notify_tables_changed(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop("changed_tables", None)
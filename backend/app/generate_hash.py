@@ -1,7 +1,13 @@
-from auth.password import get_password_hash
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.password import get_password_hash
 
 # Generate hash for password "test123"
 password = "tester"
 hashed = get_password_hash(password)
 print(f"Password: {password}")
-print(f"Hashed: {hashed}")
\ No newline at end of file
+print(f"Hashed: {hashed}")
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import text
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cache import CATALOG_TABLES, collect_tags
+from app.config import settings
+from app.database import async_engine
+from app.events import notify_tables_changed, notify_tables_changed_in_database, on_tables_changed
+from app.services.pricing import get_pricing_date
+
+logger = logging.getLogger(__name__)
+
+# Catalog responses may be stored, but must be revalidated before every reuse
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag, with the weak comparison
+    RFC 9110 requires for it
+    """
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in [
+        candidate.removeprefix("W/") for candidate in candidates
+    ]
+
+# One row per catalog table, bumped at commit by the triggers of migration 0008
+CATALOG_VERSION_QUERY = text("SELECT table_name, version FROM catalog_version")
+
+class CatalogVersion:
+    """
+    The catalog version this worker answers conditional requests with.
+
+    Every catalog table has a row in catalog_version that a deferred trigger
+    bumps once per writing transaction, as it commits (see migration 0008),
+    whether the write comes from the API, an import or psql. A reader sees
+    the new version together with the rows that caused it, and rolled back
+    transactions leave it alone. The version is the sum of the rows. Workers
+    poll them, and the tables whose row moved are notified as changed
+    (app.events), which drops this worker's cached results and in-process
+    indexes built from them before the new version is published. A commit
+    from this worker makes the version unknown until the next poll; no ETag
+    is sent meanwhile.
+    """
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._last_seen: Optional[Dict[str, int]] = None
+        # Bumped on every local catalog commit, so a poll that started before it is discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Set while refresh() notifies changes, which are not local commits
+        self._notifying = threading.local()
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def changed(self, tables: Iterable[str] = ()) -> None:
+        """
+        Forget the version after a local catalog commit
+        """
+        if getattr(self._notifying, "active", False):
+            return
+        with self._lock:
+            self._generation += 1
+            self._version = None
+
+    def _notify(self, tables: Set[str]) -> None:
+        self._notifying.active = True
+        try:
+            notify_tables_changed(tables)
+        finally:
+            self._notifying.active = False
+        notify_tables_changed_in_database(tables)
+
+    def refresh(self, session: Session) -> Optional[int]:
+        """
+        Read the table versions from the database, notify the tables that
+        changed and publish the new version; on failure it is left unknown
+        """
+        with self._lock:
+            generation = self._generation
+        try:
+            versions = dict(session.execute(CATALOG_VERSION_QUERY).all())
+        except Exception:
+            with self._lock:
+                self._version = None
+            raise
+
+        with self._lock:
+            changed = set()
+            if self._last_seen is not None:
+                changed = {table for table, value in versions.items() if self._last_seen.get(table) != value}
+            self._last_seen = versions
+            if changed:
+                self._version = None
+
+        if changed:
+            self._notify(changed)
+
+        with self._lock:
+            if generation == self._generation:
+                self._version = sum(versions.values())
+            return self._version
+
+catalog_version = CatalogVersion()
+on_tables_changed(CATALOG_TABLES, catalog_version.changed)
+
+async def poll_catalog_version(interval_seconds: float) -> None:
+    """
+    Background task refreshing catalog_version every interval_seconds
+    """
+    failing = False
+    while True:
+        try:
+            async with AsyncSession(async_engine) as session:
+                await session.run_sync(catalog_version.refresh)
+            if failing:
+                logger.info("Catalog version available again, ETags re-enabled")
+            failing = False
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if not failing:
+                logger.warning("Could not read the catalog version, ETags disabled", exc_info=True)
+            failing = True
+        await asyncio.sleep(interval_seconds)
+
+async def catalog_etag(request: Request, response: Response) -> None:
+    """
+    Route dependency answering conditional GETs of catalog endpoints.
+
+    The weak ETag combines the catalog version with everything else the
+    response depends on (API version, pricing date, cover base URL, path and
+    query), so it is known before any query runs: a matching
+    If-None-Match gets 304 straight away, anything else gets the ETag with
+    the normal response.
+
+    Raises:
+        HTTPException: 304 if the client's copy is current
+    """
+    version = catalog_version.version
+    if version is None:
+        return
+
+    key = "|".join([
+        request.app.version,
+        get_pricing_date().isoformat(),
+        settings.cover_base_url,
+        request.url.path,
+        "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items())),
+    ])
+    etag = f'W/"{version}-{hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+class CatalogETagMiddleware:
+    """
+    ASGI middleware taking the ETag off responses built from results that
+    depend on more than the catalog tables.
+
+    Such results carry extra cache tags (see app.cache.add_tags), e.g. a
+    cover whose variants were still being built: the catalog version does
+    not move when it is done, so a client must not revalidate that copy.
+    The response is sent with Cache-Control: no-cache and no ETag instead,
+    and the next request gets the finished cover.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_without_etag(message):
+            if message["type"] == "http.response.start" and extra_tags:
+                headers = list(message.get("headers", []))
+                if any(name.lower() == b"etag" for name, _ in headers):
+                    headers = [
+                        (name, value) for name, value in headers
+                        if name.lower() not in (b"etag", b"cache-control")
+                    ]
+                    message["headers"] = headers + [(b"cache-control", b"no-cache")]
+            await send(message)
+
+        with collect_tags() as extra_tags:
+            await self.app(scope, receive, send_without_etag)
@@ -0,0 +1,155 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger("app.sql")
+request_logger = logging.getLogger("app.requests")
+
+class RequestStats:
+    """
+    SQL statements run and time spent in the database while serving one request
+    """
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+# Stats of the request being served; mutated in place so that statements run
+# in worker threads and in the greenlets of AsyncSession.run_sync are counted
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    """
+    Get the stats of the request being served, or None outside of a request
+    """
+    return _current_request.get()
+
+@contextmanager
+def collect_request_stats() -> Iterator[RequestStats]:
+    """
+    Count the statements run inside the block as if it were one request,
+    e.g. to assert a query budget in tests or benchmarks
+    """
+    stats = RequestStats()
+    token = _current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_request.reset(token)
+
+def _truncate(value: Any, limit: int = 1000) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+    if settings.sql_slow_query_ms and elapsed * 1000 >= settings.sql_slow_query_ms:
+        logger.warning(
+            "Slow query (%.1f ms): %s | parameters: %s",
+            elapsed * 1000, statement, _truncate(parameters),
+            extra={"duration_ms": round(elapsed * 1000, 3), "statement": statement, "parameters": _truncate(parameters)}
+        )
+
+def _handle_error(exception_context) -> None:
+    # The statement failed, after_cursor_execute will not run for it
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Time every statement run on the engine (use engine.sync_engine for an async
+    engine), adding it to the current request and logging the slow ones
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class SQLTimingMiddleware:
+    """
+    ASGI middleware counting the SQL statements and database time of every
+    HTTP request.
+
+    The totals are sent back in a Server-Timing header (db and app durations,
+    visible in the browser dev tools), recorded in the /metrics histograms
+    per route and logged once per request, at WARNING when the request ran
+    more than SQL_REQUEST_STATEMENT_WARNING statements.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        metrics.http_requests_in_flight.inc()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                server_timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries", '
+                    f'app;dur={total_ms:.1f}'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", server_timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            metrics.http_requests_in_flight.dec()
+            # Unmatched paths share one label so that scanners cannot blow up the series count
+            route = getattr(scope.get("route"), "path", None)
+            metrics.observe_request(
+                scope["method"], route or "unmatched", status_code, elapsed, stats.statements, stats.db_seconds
+            )
+            self._log(scope, route, status_code, stats, elapsed)
+
+    def _log(self, scope, route: Optional[str], status_code: int, stats: RequestStats, elapsed: float) -> None:
+        too_many = (
+            settings.sql_request_statement_warning
+            and stats.statements > settings.sql_request_statement_warning
+        )
+        level = logging.WARNING if too_many else logging.INFO
+        if not request_logger.isEnabledFor(level):
+            return
+
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(elapsed * 1000, 3),
+            "db_statements": stats.statements,
+            "db_ms": round(stats.db_seconds * 1000, 3),
+        }
+        request_logger.log(
+            level,
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra=fields
+        )
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, raiseload
+
+from app.config import settings
+from app.models.author import Author
+from app.models.book import Book
+
+# Eager-loading policy of the book cards (shop, on-sale, popular, recommended):
+# the author name comes with the book in the same query, and any other
+# relationship access raises instead of silently running one query per row.
+# Add the relationship here, not a lazy access in the formatting loop, when a
+# card needs more.
+BOOK_CARD_LOADING = (
+    joinedload(Book.author).load_only(Author.author_name),
+    raiseload("*"),
+)
+
+class LazyLoadError(RuntimeError):
+    """
+    Raised in strict loading mode when a relationship is loaded lazily
+    """
+
+_strict = settings.orm_strict_loading
+
+def strict_loading_enabled() -> bool:
+    return _strict
+
+def set_strict_loading(enabled: bool) -> None:
+    """
+    Make every lazy relationship load raise LazyLoadError (True) or run as usual (False)
+    """
+    global _strict
+    _strict = enabled
+
+@contextmanager
+def strict_loading(enabled: bool = True) -> Iterator[None]:
+    """
+    Enable strict loading mode for the duration of the block, e.g. in tests or benchmarks
+    """
+    previous = _strict
+    set_strict_loading(enabled)
+    try:
+        yield
+    finally:
+        set_strict_loading(previous)
+
+@event.listens_for(Session, "do_orm_execute")
+def _refuse_lazy_loads(orm_execute_state) -> None:
+    # lazy_loaded_from is only set for lazy loads, not for selectin/subquery eager loads
+    if _strict and orm_execute_state.lazy_loaded_from is not None:
+        state = orm_execute_state.lazy_loaded_from
+        raise LazyLoadError(
+            f"Lazy load from {state.class_.__name__} (id={state.identity}) in strict loading mode: "
+            f"{orm_execute_state.statement}"
+        )
@@ -1,15 +1,66 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.books import router as books_router
 from app.routers.categories import router as categories_router
 from app.routers.authors import router as authors_router
 from app.routers.orders import router as orders_router
+from app.routers.covers import router as covers_router
 from app.auth.auth_router import router as auth_router
+from app.auth.auth_bearer import get_admin_principal, require_metrics_access
+from app.auth.auth_service import sweep_expired_refresh_tokens
+from app.cache import cache_stats
+from app.config import settings
+from app.database import async_engine
+from app.http_cache import CatalogETagMiddleware, poll_catalog_version
+from app.instrumentation import SQLTimingMiddleware
+from app.metrics import render_metrics
+from app.services.book_suggest import suggest_index
+from app.services.covers import cover_variants
+
+logging.basicConfig(level=settings.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the typeahead index before serving; if the database is not
+    # reachable yet it is built on the first /books/suggest request instead
+    try:
+        async with AsyncSession(async_engine) as session:
+            await session.run_sync(lambda sync_session: suggest_index.rebuild(session=sync_session))
+    except Exception:
+        logger.warning("Could not build the suggestion index at startup", exc_info=True)
+
+    # Resize the covers on the builder thread; listings show a cover's
+    # variants once they are ready and never wait for them
+    cover_variants.enqueue(await asyncio.to_thread(cover_variants.source_names))
+
+    version_poller = None
+    if settings.catalog_version_poll_seconds > 0:
+        version_poller = asyncio.create_task(poll_catalog_version(settings.catalog_version_poll_seconds))
+
+    sweeper = None
+    if settings.refresh_token_sweep_interval_seconds > 0:
+        sweeper = asyncio.create_task(sweep_expired_refresh_tokens(settings.refresh_token_sweep_interval_seconds))
+    yield
+    for task in (version_poller, sweeper):
+        if task is None:
+            continue
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
 app = FastAPI(
     title="Bookworm API",
     description="API for Bookworm online bookstore",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -27,14 +78,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+app.add_middleware(CatalogETagMiddleware)
+
+# Added last so it wraps CORS too and times the whole request
+app.add_middleware(SQLTimingMiddleware)
+
 app.include_router(books_router)
 app.include_router(categories_router)
 app.include_router(authors_router)
 app.include_router(orders_router)
+app.include_router(covers_router)
 app.include_router(auth_router)
 
 @app.get("/")
 def root():
-    return {"message": "Welcome to Bookworm API"}
\ No newline at end of file
+    return {"message": "Welcome to Bookworm API"}
+
+@app.get("/cache/stats", dependencies=[Depends(get_admin_principal)])
+def get_cache_stats():
+    """
+    Get size and hit/miss counters of every in-process cache of this worker
+
+    Authentication required: This endpoint requires the JWT of an admin user.
+    """
+    return cache_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(require_metrics_access)])
+def get_metrics():
+    """
+    Get request latency, status codes, SQL statements per request, connection
+    pool state and cache hit ratios of this worker in the Prometheus text format
+
+    Authentication required: METRICS_TOKEN as bearer token, or the JWT of an admin user.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,243 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.cache import cache_stats
+
+# Metric names are prefixed so they do not clash with other exporters on the same Prometheus
+PREFIX = "bookworm"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonic counter per label values
+    """
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+        return lines
+
+class Gauge:
+    """
+    Value that goes up and down, per label values
+    """
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+        return lines
+
+class Histogram:
+    """
+    Observations counted into fixed buckets per label values.
+
+    An observation is one bisect and three increments; buckets are only made
+    cumulative when rendered.
+    """
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = [(key, list(series[0]), series[1], series[2]) for key, series in self._values.items()]
+        for key, bucket_counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.labels, key, 'le="%s"' % _number(bound))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+http_requests = Counter(
+    f"{PREFIX}_http_requests_total", "HTTP requests served", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    f"{PREFIX}_http_request_duration_seconds", "Time to serve an HTTP request", ("method", "route")
+)
+http_requests_in_flight = Gauge(
+    f"{PREFIX}_http_requests_in_flight", "HTTP requests being served"
+)
+db_statements_per_request = Histogram(
+    f"{PREFIX}_db_statements_per_request", "SQL statements run per HTTP request", ("method", "route"),
+    buckets=STATEMENT_BUCKETS
+)
+db_time_per_request = Histogram(
+    f"{PREFIX}_db_duration_per_request_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")
+)
+db_pool_checkout_duration = Histogram(
+    f"{PREFIX}_db_pool_checkout_seconds", "Time to get a connection from the pool, waiting included", ("pool",),
+    buckets=POOL_WAIT_BUCKETS
+)
+password_hash_wait = Histogram(
+    f"{PREFIX}_password_hash_wait_seconds", "Time a login waited for a free bcrypt slot", buckets=POOL_WAIT_BUCKETS
+)
+password_hash_rejections = Counter(
+    f"{PREFIX}_password_hash_rejections_total", "Logins refused with 503 because no bcrypt slot freed up in time"
+)
+
+def observe_request(method: str, route: str, status: int, seconds: float, statements: int, db_seconds: float) -> None:
+    """
+    Record one served HTTP request; route is the route template, not the raw path
+    """
+    http_requests.inc(method, route, str(status))
+    http_request_duration.observe(seconds, method, route)
+    db_statements_per_request.observe(statements, method, route)
+    db_time_per_request.observe(db_seconds, method, route)
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool recording how long every checkout takes (waiting for a free
+    connection or opening a new one) in db_pool_checkout_duration
+    """
+    metrics_name = "sync"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started, self.metrics_name)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool counterpart of TimedQueuePool, for the async engine
+    """
+    metrics_name = "async"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started, self.metrics_name)
+
+# Engines whose pool state is exported, by pool label
+_engines: Dict[str, Engine] = {}
+
+def register_engine(name: str, engine: Engine) -> None:
+    """
+    Export the pool size, checked-out and overflow connections of the engine
+    (use engine.sync_engine for an async engine)
+    """
+    _engines[name] = engine
+
+def _pool_lines() -> List[str]:
+    gauges = {
+        'size': Gauge(f"{PREFIX}_db_pool_size", "Configured size of the connection pool", ("pool",)),
+        'checked_out': Gauge(f"{PREFIX}_db_pool_checked_out", "Connections in use", ("pool",)),
+        'checked_in': Gauge(f"{PREFIX}_db_pool_checked_in", "Idle connections in the pool", ("pool",)),
+        'overflow': Gauge(f"{PREFIX}_db_pool_overflow", "Connections opened beyond the pool size (negative while below it)", ("pool",)),
+    }
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            gauges['size'].set(pool.size(), name)
+            gauges['checked_out'].set(pool.checkedout(), name)
+            gauges['checked_in'].set(pool.checkedin(), name)
+            gauges['overflow'].set(pool.overflow(), name)
+    return [line for gauge in gauges.values() for line in gauge.render()]
+
+def _cache_lines() -> List[str]:
+    hits = Counter(f"{PREFIX}_cache_hits_total", "Result cache lookups answered from the cache", ("cache",))
+    misses = Counter(f"{PREFIX}_cache_misses_total", "Result cache lookups that had to compute the result", ("cache",))
+    entries = Gauge(f"{PREFIX}_cache_entries", "Entries held by the result cache", ("cache",))
+    hit_ratio = Gauge(f"{PREFIX}_cache_hit_ratio", "Share of result cache lookups answered from the cache", ("cache",))
+    for name, stats in cache_stats().items():
+        hits.inc(name, amount=stats['hits'])
+        misses.inc(name, amount=stats['misses'])
+        entries.set(stats['size'], name)
+        if stats['hit_ratio'] is not None:
+            hit_ratio.set(stats['hit_ratio'], name)
+    return hits.render() + misses.render() + entries.render() + hit_ratio.render()
+
+_request_metrics = (
+    http_requests, http_request_duration, http_requests_in_flight,
+    db_statements_per_request, db_time_per_request, db_pool_checkout_duration,
+    password_hash_wait, password_hash_rejections,
+)
+
+def render_metrics() -> str:
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Request metrics are kept as they happen; pool and cache state is read
+    only here, at scrape time.
+    """
+    lines: List[str] = []
+    for metric in _request_metrics:
+        lines += metric.render()
+    lines += _pool_lines()
+    lines += _cache_lines()
+    return "\n".join(lines) + "\n"
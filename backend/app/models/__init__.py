@@ -6,3 +6,4 @@ from .discount import Discount
 from .order import Order, OrderItem
 from .review import Review
 from .refresh_token import RefreshToken
+from .book_stats import BookStats
@@ -0,0 +1,15 @@
+from typing import Optional
+from sqlalchemy import BigInteger, Column, Integer, Float, ForeignKey
+from sqlmodel import SQLModel, Field
+
+class BookStats(SQLModel, table=True):
+    __tablename__ = "book_stats"
+    book_id: int = Field(sa_column=Column(BigInteger, ForeignKey("book.id"), primary_key=True))
+    reviews_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    rating_sum: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    avg_rating: Optional[float] = Field(default=None, sa_column=Column(Float))
+    star_1_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    star_2_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    star_3_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    star_4_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    star_5_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
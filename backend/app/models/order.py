@@ -1,6 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
-from sqlalchemy import BigInteger, Column, Integer, SmallInteger, Numeric, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, Numeric, DateTime, ForeignKey, String, Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -9,10 +9,14 @@ if TYPE_CHECKING:
 
 class Order(SQLModel, table=True):
     __tablename__ = "order"
+    __table_args__ = (
+        Index("uq_order_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
     id: Optional[int] = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
     user_id: int = Field(sa_column=Column(Integer, ForeignKey("user.id")))
     order_date: datetime = Field(sa_column=Column("order_date", DateTime(0)))
     order_amount: float = Field(sa_column=Column(Numeric(8, 2)))
+    idempotency_key: Optional[str] = Field(default=None, sa_column=Column(String(64), nullable=True))
     user: Optional["User"] = Relationship(back_populates="orders")
     order_items: List["OrderItem"] = Relationship(back_populates="order")
 
@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import datetime, timezone
-from sqlalchemy import BigInteger, Column, DateTime, Boolean, ForeignKey
+from sqlalchemy import BigInteger, Column, DateTime, Boolean, ForeignKey, String, Index, text
 from sqlmodel import SQLModel, Field, Relationship
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -8,11 +8,17 @@ if TYPE_CHECKING:
 
 class RefreshToken(SQLModel, table=True):
     __tablename__ = "refresh_token"
+    __table_args__ = (
+        Index("uq_refresh_token_token_hash", "token_hash", unique=True),
+        Index("idx_refresh_token_expires_at", "expires_at"),
+        Index("idx_refresh_token_revoked", "id", postgresql_where=text("is_revoked")),
+    )
     id: Optional[int] = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
     user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("user.id")))
-    token: str = Field(max_length=255)
+    # SHA-256 hex digest of the token; the token itself is only kept by the client
+    token_hash: str = Field(sa_column=Column(String(64), nullable=False))
     expires_at: datetime = Field(sa_column=Column(DateTime(0)))
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=Column(DateTime(0)))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc).replace(tzinfo=None), sa_column=Column(DateTime(0)))
     is_revoked: bool = Field(default=False, sa_column=Column(Boolean))
     user_agent: Optional[str] = Field(default=None, max_length=255)
     ip_address: Optional[str] = Field(default=None, max_length=45)
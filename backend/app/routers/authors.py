@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict, Any, Optional, List
-from app.database import get_session
-from app.services import get_authors
+from app.database import get_async_session
+from app.http_cache import catalog_etag
+from app.services.aio import get_authors_async
 
 router = APIRouter(prefix="/authors", tags=["Authors"])
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/", response_model=List[Dict[str, Any]], dependencies=[Depends(catalog_etag)])
 async def get_authors_route(
-    session: Optional[Session] = Depends(get_session)
+    name_prefix: Optional[str] = Query(None, max_length=255, description="Only authors whose name starts with this (case-insensitive)"),
+    page: int = Query(1, ge=1, description="Page number"),
+    size: Optional[int] = Query(None, ge=1, le=100, description="Authors per page (all authors when omitted)"),
+    session: AsyncSession = Depends(get_async_session)
 ) -> List[Dict[str, Any]]:
     """
-    Get all authors with book count for each author.
+    Get authors with book count for each author.
     
-    Returns a list of authors with their ID, name, bio, and the number of books by each author.
+    Returns a list of authors with their ID, name, bio, and the number of books by each author,
+    ordered by name. Use name_prefix to narrow the list and page/size to page through it.
     """
-    return get_authors(session=session)
+    return await get_authors_async(name_prefix=name_prefix, page=page, size=size, session=session)
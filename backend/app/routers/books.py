@@ -1,13 +1,23 @@
 from fastapi import APIRouter, Query, Depends, Path
-from app.services import get_books, get_books_on_sale, get_popular_books, get_recommended_books, get_book_detail
-from app.services.book_detail import get_book_detail
-from sqlmodel import Session
+from app.services import get_home_books
+from app.services.aio import (
+    get_books_async,
+    get_books_on_sale_async,
+    get_popular_books_async,
+    get_recommended_books_async,
+    get_book_detail_async,
+    get_book_facets_async,
+    search_books_async,
+    get_suggestions_async
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict, Any, Optional, List
-from app.database import get_session
+from app.database import get_async_session
+from app.http_cache import catalog_etag
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
-@router.get("/", response_model=Dict[str, Any])
+@router.get("/", response_model=Dict[str, Any], dependencies=[Depends(catalog_etag)])
 async def get_books_route(
     category_id: Optional[int] = Query(None),
     author_id: Optional[int] = Query(None),
@@ -15,7 +25,8 @@ async def get_books_route(
     sort_by: Optional[str] = Query(None, description="Options: price_asc, price_desc, discount_desc, popularity_desc"),
     page: int = Query(1, ge=1),
     size: int = Query(15, description="Options: 5, 15, 20, 25"),
-    session: Optional[Session] = Depends(get_session)
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; overrides page"),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Get a paginated list of books with filtering and sorting options.
@@ -23,45 +34,127 @@ async def get_books_route(
     Supports:
     - Filtering by category, author, and minimum rating
     - Sorting by price (asc/desc), discount (desc), and popularity (desc)
-    - Pagination
+    - Pagination by page number, or by cursor for deep / infinite-scroll paging
 
-    Returns a dictionary with total count, page info, and list of books.
+    Returns a dictionary with total count, page info, list of books and the cursor of the next page.
     """
-    return get_books(
+    return await get_books_async(
         category_id=category_id,
         author_id=author_id,
         min_rating=min_rating,
         sort_by=sort_by,
         page=page,
         size=size,
+        cursor=cursor,
         session=session
     )
 
-@router.get("/on-sale", response_model=List[Dict[str, Any]])
+@router.get("/facets", response_model=Dict[str, Any])
+async def get_book_facets_route(
+    category_id: Optional[int] = Query(None),
+    author_id: Optional[int] = Query(None),
+    min_rating: Optional[float] = Query(None, ge=1, le=5, description="Minimum average rating (1-5)"),
+    session: AsyncSession = Depends(get_async_session)
+) -> Dict[str, Any]:
+    """
+    Get the total and per-category, per-author and per-rating book counts for the given filters.
+
+    Shares its cached result with the total of GET /books for the same filters.
+    """
+    return await get_book_facets_async(
+        category_id=category_id,
+        author_id=author_id,
+        min_rating=min_rating,
+        session=session
+    )
+
+@router.get("/search", response_model=Dict[str, Any])
+async def search_books_route(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in the title, summary or author name"),
+    category_id: Optional[int] = Query(None),
+    author_id: Optional[int] = Query(None),
+    min_rating: Optional[float] = Query(None, ge=1, le=5, description="Minimum average rating (1-5)"),
+    sort_by: Optional[str] = Query("relevance", description="Options: relevance, price_asc, price_desc, discount_desc, popularity_desc"),
+    page: int = Query(1, ge=1),
+    size: int = Query(15, description="Options: 5, 15, 20, 25"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; overrides page"),
+    session: AsyncSession = Depends(get_async_session)
+) -> Dict[str, Any]:
+    """
+    Search books by title, summary and author name.
+
+    Supports the same filters, sorts and pagination as GET /books, and sorts
+    by relevance by default. Every book in the result carries its match rank.
+    """
+    return await search_books_async(
+        q=q,
+        category_id=category_id,
+        author_id=author_id,
+        min_rating=min_rating,
+        sort_by=sort_by,
+        page=page,
+        size=size,
+        cursor=cursor,
+        session=session
+    )
+
+@router.get("/suggest", response_model=List[Dict[str, Any]])
+async def suggest_books_route(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed in the search box"),
+    limit: int = Query(8, ge=1, le=20),
+    session: AsyncSession = Depends(get_async_session)
+) -> List[Dict[str, Any]]:
+    """
+    Get book title and author name completions for a prefix.
+
+    Served from an in-memory index, so it can be called on every keystroke.
+    """
+    return await get_suggestions_async(q=q, limit=limit, session=session)
+
+@router.get("/on-sale", response_model=List[Dict[str, Any]], dependencies=[Depends(catalog_etag)])
 async def get_books_on_sale_route(
-    limit: int = Query(10, ge=1),
-    session: Optional[Session] = Depends(get_session)
+    limit: int = Query(10, ge=1, le=25),
+    session: AsyncSession = Depends(get_async_session)
 ) -> List[Dict[str, Any]]:
-    return get_books_on_sale(limit=limit, session=session)
+    return await get_books_on_sale_async(limit=limit, session=session)
 
-@router.get("/popular", response_model=Dict[str, Any])
+@router.get("/popular", response_model=Dict[str, Any], dependencies=[Depends(catalog_etag)])
 async def get_popular_books_route(
-    limit: int = Query(8, ge=1),
-    session: Optional[Session] = Depends(get_session)
+    limit: int = Query(8, ge=1, le=25),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
-    return get_popular_books(limit=limit, session=session)
+    return await get_popular_books_async(limit=limit, session=session)
 
-@router.get("/recommended", response_model=Dict[str, Any])
+@router.get("/recommended", response_model=Dict[str, Any], dependencies=[Depends(catalog_etag)])
 async def get_recommended_books_route(
-    limit: int = Query(8, ge=1),
-    session: Optional[Session] = Depends(get_session)
+    limit: int = Query(8, ge=1, le=25),
+    session: AsyncSession = Depends(get_async_session)
+) -> Dict[str, Any]:
+    return await get_recommended_books_async(limit=limit, session=session)
+
+@router.get("/home", response_model=Dict[str, Any], dependencies=[Depends(catalog_etag)])
+async def get_home_books_route(
+    on_sale_limit: int = Query(10, ge=1, le=25),
+    popular_limit: int = Query(8, ge=1, le=25),
+    recommended_limit: int = Query(8, ge=1, le=25)
 ) -> Dict[str, Any]:
-    return get_recommended_books(limit=limit, session=session)
+    """
+    Get everything the home page shows in one request.
+
+    Returns the on-sale, popular and recommended lists (same shapes as
+    /books/on-sale, /books/popular and /books/recommended), computed
+    concurrently and cached for a short time.
+    """
+    return await get_home_books(
+        on_sale_limit=on_sale_limit,
+        popular_limit=popular_limit,
+        recommended_limit=recommended_limit
+    )
 
-@router.get("/{book_id}", response_model=Dict[str, Any])
+@router.get("/{book_id}", response_model=Dict[str, Any], dependencies=[Depends(catalog_etag)])
 async def get_book_detail_route(
     book_id: int = Path(..., title="The ID of the book to get", ge=1),
-    session: Optional[Session] = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Get detailed information about a specific book.
@@ -72,5 +165,5 @@ async def get_book_detail_route(
     - Author information
     - Current discount (if any)
     """
-    return get_book_detail(book_id=book_id, session=session)
+    return await get_book_detail_async(book_id=book_id, session=session)
 
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict, Any, Optional, List
-from app.database import get_session
-from app.services import get_categories
+from app.database import get_async_session
+from app.http_cache import catalog_etag
+from app.services.aio import get_categories_async
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/", response_model=List[Dict[str, Any]], dependencies=[Depends(catalog_etag)])
 async def get_categories_route(
-    session: Optional[Session] = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> List[Dict[str, Any]]:
     """
     Get all categories with book count for each category.
     
     Returns a list of categories with their ID, name, description, and the number of books in each category.
     """
-    return get_categories(session=session)
+    return await get_categories_async(session=session)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from app.http_cache import etag_matches
+from app.services.covers import cover_variants
+
+router = APIRouter(prefix="/covers", tags=["Covers"])
+
+# Variant URLs change with their content, so clients and CDNs may keep them forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@router.api_route("/{filename}", methods=["GET", "HEAD"])
+async def get_cover_variant(filename: str, request: Request) -> Response:
+    """
+    Serve a cover image variant by the file name from its URL.
+
+    The strong ETag is the content hash in the name. Conditional requests
+    are answered with 304, and Range requests (with If-Range) with 206.
+    """
+    resolved = cover_variants.variant_path(filename)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="Cover not found")
+    path, digest, media_type = resolved
+
+    headers = {"etag": f'"{digest}"', "cache-control": IMMUTABLE}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, Path
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Path, Header, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict, Any, Optional, List
-from app.database import get_session
-from app.services.order import create_order, get_user_orders, get_order_detail, OrderItemRequest
-from app.auth.auth_bearer import JWTBearer
-from app.auth.auth_handler import get_user_id_from_token
+from app.database import get_async_session
+from app.services.order import OrderItemRequest
+from app.services.aio import create_order_async, get_user_orders_async, get_order_detail_async
+from app.auth.auth_bearer import get_current_principal
+from app.schemas.token import TokenPrincipal
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 @router.post("/", response_model=Dict[str, Any])
 async def create_order_route(
     items: List[OrderItemRequest],
-    token: str = Depends(JWTBearer()),
-    session: Optional[Session] = Depends(get_session)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Create a new order from the provided items list.
@@ -24,32 +26,44 @@ async def create_order_route(
 
     Note: All books are assumed to be in stock.
 
+    Send an Idempotency-Key header to make retries safe: repeating a request
+    with the same key returns the order created by the first attempt.
+
     Authentication required: This endpoint requires a valid JWT token.
     """
-    user_id = get_user_id_from_token(token)
-    result = create_order(user_id=user_id, items=items, session=session)
+    result = await create_order_async(user_id=principal.user_id, items=items, idempotency_key=idempotency_key, session=session)
     return result
 
 @router.get("/", response_model=Dict[str, Any])
 async def get_orders_route(
-    token: str = Depends(JWTBearer()),
-    session: Optional[Session] = Depends(get_session)
+    limit: int = Query(20, ge=1, le=100, description="Number of orders per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    summary: bool = Query(False, description="Return the orders without their items"),
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
-    Get all orders for the authenticated user.
+    Get the orders of the authenticated user, newest first.
 
-    Returns a list of orders with basic information.
+    Returns one page of orders with their items. Pass the returned next_cursor
+    to get the following page; it is null on the last page. With summary=true
+    the items are left out.
 
     Authentication required: This endpoint requires a valid JWT token.
     """
-    user_id = get_user_id_from_token(token)
-    return get_user_orders(user_id=user_id, session=session)
+    return await get_user_orders_async(
+        user_id=principal.user_id,
+        limit=limit,
+        cursor=cursor,
+        include_items=not summary,
+        session=session
+    )
 
 @router.get("/{order_id}", response_model=Dict[str, Any])
 async def get_order_detail_route(
     order_id: int = Path(..., title="The ID of the order to get", ge=1),
-    token: str = Depends(JWTBearer()),
-    session: Optional[Session] = Depends(get_session)
+    principal: TokenPrincipal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Get detailed information about a specific order.
@@ -62,5 +76,4 @@ async def get_order_detail_route(
 
     Authentication required: This endpoint requires a valid JWT token.
     """
-    user_id = get_user_id_from_token(token)
-    return get_order_detail(order_id=order_id, user_id=user_id, session=session)
+    return await get_order_detail_async(order_id=order_id, user_id=principal.user_id, session=session)
@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class Token(BaseModel):
@@ -11,3 +12,30 @@ class Token(BaseModel):
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
     type: Optional[str] = None
+
+
+class UserProfile(BaseModel):
+    """
+    The display fields of a user, as returned by /auth/me; cached and shared
+    between requests, so immutable
+    """
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    admin: bool = False
+
+
+class TokenPrincipal(BaseModel):
+    """
+    The verified claims of a JWT; shared between requests, so immutable
+    """
+    model_config = ConfigDict(frozen=True)
+
+    user_id: int
+    exp: datetime
+    type: Optional[str] = None
+    # Only set for access tokens issued with ACCESS_TOKEN_PROFILE_CLAIMS
+    profile: Optional[UserProfile] = None
@@ -3,6 +3,11 @@ from .books_on_sale import get_books_on_sale
 from .books_popular import get_popular_books
 from .books_recommended import get_recommended_books
 from .book_detail import get_book_detail
+from .books_home import get_home_books, invalidate_home_books
 from .categories import get_categories
 from .authors import get_authors
+from .book_stats import rebuild_book_stats
+from .book_facets import get_book_facets
+from .book_search import search_books
+from .book_suggest import get_suggestions, suggest_index
 from .t.authors import get_authors as get_authors_t
\ No newline at end of file
@@ -0,0 +1,43 @@
+import functools
+from typing import Any, Awaitable, Callable
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.services.books import get_books
+from app.services.book_detail import get_book_detail
+from app.services.book_facets import get_book_facets
+from app.services.book_search import search_books
+from app.services.book_suggest import get_suggestions
+from app.services.books_on_sale import get_books_on_sale
+from app.services.books_popular import get_popular_books
+from app.services.books_recommended import get_recommended_books
+from app.services.authors import get_authors
+from app.services.categories import get_categories
+from app.services.order import create_order, get_user_orders, get_order_detail
+
+def run_on_async_session(service: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """
+    Turn a service function into a coroutine that runs on an AsyncSession.
+
+    The service body runs through AsyncSession.run_sync, so each query it
+    issues is awaited on the asyncio driver and the event loop keeps serving
+    other requests in the meantime. The queries themselves are shared with
+    the sync version, and cache hits never touch the connection.
+    """
+    @functools.wraps(service)
+    async def wrapper(*args, session: AsyncSession, **kwargs):
+        return await session.run_sync(lambda sync_session: service(*args, session=sync_session, **kwargs))
+
+    return wrapper
+
+get_books_async = run_on_async_session(get_books)
+get_book_detail_async = run_on_async_session(get_book_detail)
+get_book_facets_async = run_on_async_session(get_book_facets)
+search_books_async = run_on_async_session(search_books)
+get_suggestions_async = run_on_async_session(get_suggestions)
+get_books_on_sale_async = run_on_async_session(get_books_on_sale)
+get_popular_books_async = run_on_async_session(get_popular_books)
+get_recommended_books_async = run_on_async_session(get_recommended_books)
+get_authors_async = run_on_async_session(get_authors)
+get_categories_async = run_on_async_session(get_categories)
+create_order_async = run_on_async_session(create_order)
+get_user_orders_async = run_on_async_session(get_user_orders)
+get_order_detail_async = run_on_async_session(get_order_detail)
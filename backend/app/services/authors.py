@@ -4,12 +4,25 @@ from sqlalchemy import func
 from app.models.author import Author
 from app.models.book import Book
 from app.database import get_session
+from app.cache import cached
 
-def get_authors(session: Optional[Session] = None) -> List[Dict[str, Any]]:
+@cached("authors", tags={"author", "book"})
+def get_authors(
+    name_prefix: Optional[str] = None,
+    page: int = 1,
+    size: Optional[int] = None,
+    session: Optional[Session] = None
+) -> List[Dict[str, Any]]:
     """
-    Get all authors with book count for each author.
+    Get authors with book count for each author.
+
+    The book counts come from a single grouped query joined to the authors,
+    ordered by author name.
 
     Args:
+        name_prefix: Optional case-insensitive prefix the author name must start with
+        page: Page number (1-based), used together with size
+        size: Number of authors per page (all authors when None)
         session: Optional database session
 
     Returns:
@@ -18,22 +31,27 @@ def get_authors(session: Optional[Session] = None) -> List[Dict[str, Any]]:
     if session is None:
         session = get_session()
 
-    # Query to get all authors ordered by author_name
-    authors_query = select(Author).order_by(Author.author_name)
-    authors = session.exec(authors_query).all()
-
-    # Format the results and count books for each author
-    result = []
-    for author in authors:
-        # Count books by this author
-        book_count_query = select(func.count(Book.id)).where(Book.author_id == author.id)
-        book_count = session.exec(book_count_query).one()
-
-        result.append({
-            'id': author.id,
-            'name': author.author_name,
-            'bio': author.author_bio,
-            'book_count': book_count or 0
-        })
+    authors_query = (
+        select(Author.id, Author.author_name, Author.author_bio, func.count(Book.id))
+        .outerjoin(Book, Book.author_id == Author.id)
+        .group_by(Author.id, Author.author_name, Author.author_bio)
+        .order_by(Author.author_name, Author.id)
+    )
+
+    if name_prefix:
+        authors_query = authors_query.where(
+            func.lower(Author.author_name).startswith(name_prefix.lower(), autoescape=True)
+        )
 
-    return result
+    if size is not None:
+        authors_query = authors_query.offset((page - 1) * size).limit(size)
+
+    return [
+        {
+            'id': author_id,
+            'name': author_name,
+            'bio': author_bio,
+            'book_count': book_count or 0
+        }
+        for author_id, author_name, author_bio, book_count in session.exec(authors_query).all()
+    ]
@@ -1,15 +1,16 @@
 from typing import Optional, Dict, Any
 from sqlmodel import Session, select
-from sqlalchemy import func, cast, Float
 from app.models.book import Book
 from app.models.author import Author
 from app.models.category import Category
-from app.models.discount import Discount
-from app.models.review import Review
+from app.models.book_stats import BookStats
 from app.database import get_session
-from datetime import date
+from app.cache import cached, CATALOG_TABLES
+from app.services.pricing import effective_discount_subquery
+from app.services.covers import cover_urls
 from fastapi import HTTPException
 
+@cached("book_detail", tags=CATALOG_TABLES)
 def get_book_detail(book_id: int, session: Optional[Session] = None) -> Dict[str, Any]:
     """
     Get detailed information about a specific book by its ID.
@@ -33,32 +34,25 @@ def get_book_detail(book_id: int, session: Optional[Session] = None) -> Dict[str
     if session is None:
         session = get_session()
 
-    # Get current date to check for active discounts
-    today = "2022-10-08"
+    # Effective discount of this book at the pricing date
+    discount_subquery = effective_discount_subquery(book_ids=[book_id])
 
-    # Subquery to get the average rating and review count for each book
-    reviews_stats_subquery = (
-        select(
-            Review.book_id,
-            func.count(Review.id).label("reviews_count"),
-            func.avg(cast(Review.rating_star, Float)).label("avg_rating")
-        )
-        .group_by(Review.book_id)
-        .subquery()
-    )
-
-    # Get book with category and author information
+    # Get book with category, author and current discount information
     book_query = (
         select(
             Book,
             Category.category_name,
             Author.author_name,
-            reviews_stats_subquery.c.reviews_count,
-            reviews_stats_subquery.c.avg_rating
+            BookStats.reviews_count,
+            BookStats.avg_rating,
+            discount_subquery.c.discount_price,
+            discount_subquery.c.discount_start_date,
+            discount_subquery.c.discount_end_date
         )
         .join(Category, Book.category_id == Category.id)
         .join(Author, Book.author_id == Author.id)
-        .outerjoin(reviews_stats_subquery, Book.id == reviews_stats_subquery.c.book_id)
+        .outerjoin(BookStats, Book.id == BookStats.book_id)
+        .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
         .where(Book.id == book_id)
     )
 
@@ -67,17 +61,8 @@ def get_book_detail(book_id: int, session: Optional[Session] = None) -> Dict[str
     if not book_result:
         raise HTTPException(status_code=404, detail=f"Book with ID {book_id} not found")
 
-    book, category_name, author_name, reviews_count, avg_rating = book_result
-
-    # Get current discount if available
-    discount_query = (
-        select(Discount)
-        .where(Discount.book_id == book_id)
-        .where(Discount.discount_start_date <= today)
-        .where(Discount.discount_end_date >= today)
-    )
-
-    discount = session.exec(discount_query).first()
+    (book, category_name, author_name, reviews_count, avg_rating,
+     discount_price, discount_start_date, discount_end_date) = book_result
 
     # Build the response
     result = {
@@ -85,6 +70,7 @@ def get_book_detail(book_id: int, session: Optional[Session] = None) -> Dict[str
         'title': book.book_title,
         'summary': book.book_summary,
         'cover': book.book_cover_photo,
+        'cover_urls': cover_urls(book.book_cover_photo),
         'original_price': book.book_price,
         'category': {
             'id': book.category_id,
@@ -99,13 +85,13 @@ def get_book_detail(book_id: int, session: Optional[Session] = None) -> Dict[str
     }
 
     # Add discount information if available
-    if discount:
-        result['discount_price'] = discount.discount_price
-        result['discount_start_date'] = discount.discount_start_date
-        result['discount_end_date'] = discount.discount_end_date
-        result['discount_amount'] = book.book_price - discount.discount_price
+    if discount_price is not None:
+        result['discount_price'] = discount_price
+        result['discount_start_date'] = discount_start_date
+        result['discount_end_date'] = discount_end_date
+        result['discount_amount'] = book.book_price - discount_price
         result['discount_percent'] = round((result['discount_amount'] / book.book_price) * 100, 2)
-        result['final_price'] = discount.discount_price
+        result['final_price'] = discount_price
     else:
         result['final_price'] = book.book_price
 
@@ -0,0 +1,105 @@
+from typing import Optional, Dict, Any
+from sqlmodel import Session, select
+from sqlalchemy import func, case
+from app.models.book import Book
+from app.models.book_stats import BookStats
+from app.models.author import Author
+from app.models.category import Category
+from app.database import get_session
+from app.cache import cached, CATALOG_TABLES
+from app.config import settings
+
+RATING_BUCKETS = [1, 2, 3, 4, 5]
+
+def _apply_filters(query, category_id: Optional[int], author_id: Optional[int], min_rating: Optional[float]):
+    # Same joins and filters as get_books, so counts match the listing
+    query = (
+        query
+        .select_from(Book)
+        .join(Author, Book.author_id == Author.id)
+        .join(Category, Book.category_id == Category.id)
+        .outerjoin(BookStats, Book.id == BookStats.book_id)
+    )
+    if category_id:
+        query = query.where(Book.category_id == category_id)
+    if author_id:
+        query = query.where(Book.author_id == author_id)
+    if min_rating:
+        query = query.where(BookStats.avg_rating >= min_rating)
+    return query
+
+# Facet results are cached per (category_id, author_id, min_rating) filter tuple
+@cached("book_facets", tags=CATALOG_TABLES, ttl_seconds=settings.facet_cache_ttl_seconds)
+def get_book_facets(
+    category_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    session: Optional[Session] = None
+) -> Dict[str, Any]:
+    """
+    Get the total book count and facet counts for a set of shop filters.
+
+    Each facet is counted with every filter except its own, so the sidebar can
+    show how many books each alternative choice would return:
+    - categories: books per category
+    - authors: books per author
+    - ratings: books with an average rating of at least 1..5 stars
+
+    Results are cached per filter tuple and dropped whenever books, reviews
+    or discounts change.
+
+    Args:
+        category_id: Optional filter by category ID
+        author_id: Optional filter by author ID
+        min_rating: Optional filter by minimum average rating (1-5)
+        session: Optional database session
+
+    Returns:
+        Dictionary with the total count and the category, author and rating facets
+    """
+    if session is None:
+        session = get_session()
+
+    total_query = _apply_filters(select(func.count(Book.id)), category_id, author_id, min_rating)
+    total = session.exec(total_query).one()
+
+    categories_query = (
+        _apply_filters(select(Book.category_id, func.count(Book.id)), None, author_id, min_rating)
+        .group_by(Book.category_id)
+        .order_by(Book.category_id)
+    )
+    authors_query = (
+        _apply_filters(select(Book.author_id, func.count(Book.id)), category_id, None, min_rating)
+        .group_by(Book.author_id)
+        .order_by(Book.author_id)
+    )
+    ratings_query = _apply_filters(
+        select(*[func.count(case((BookStats.avg_rating >= stars, 1))) for stars in RATING_BUCKETS]),
+        category_id, author_id, None
+    )
+
+    rating_counts = session.exec(ratings_query).one()
+
+    result = {
+        'total': total,
+        'categories': [
+            {'id': facet_id, 'count': count}
+            for facet_id, count in session.exec(categories_query).all()
+        ],
+        'authors': [
+            {'id': facet_id, 'count': count}
+            for facet_id, count in session.exec(authors_query).all()
+        ],
+        'ratings': [
+            {'min_rating': stars, 'count': count}
+            for stars, count in zip(RATING_BUCKETS, rating_counts)
+        ]
+    }
+
+    return result
+
+def invalidate_book_facets() -> None:
+    """
+    Drop every cached facet result
+    """
+    get_book_facets.cache.clear()
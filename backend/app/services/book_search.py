@@ -0,0 +1,206 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import func, case, false, literal, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app.models.book import Book
+from app.models.author import Author
+from app.database import get_session
+from app.cache import cached, CATALOG_TABLES
+from app.events import on_tables_changed
+from app.services.books import PAGE_SIZES, CURSOR_FIELDS, fetch_books_page
+
+# Text search configuration of book.search_vector (see migration 0004)
+SEARCH_CONFIG = "english"
+
+# Maintained by database triggers on PostgreSQL only, so it is not mapped on Book
+book_search_vector = literal_column("book.search_vector", TSVECTOR)
+
+# Relative weight of each field in the in-process index, mirroring the
+# A/B/C weights of the tsvector
+FIELD_WEIGHTS = {'title': 3.0, 'author': 2.0, 'summary': 1.0}
+
+_token_pattern = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase word tokens
+    """
+    return _token_pattern.findall(text.lower()) if text else []
+
+class BookSearchIndex:
+    """
+    In-process inverted index over book titles, summaries and author names.
+
+    Used instead of the tsvector column on databases without full-text search
+    (SQLite in development). It is built on first use and rebuilt lazily after
+    a commit writes to the book or author table. All query terms must match;
+    books are scored by weighted term frequency times inverse document frequency.
+
+    The index is built outside the lock and swapped in under it, like
+    SuggestIndex.rebuild: with an AsyncSession the build's queries wait on
+    the event loop thread, so a request blocking on the lock meanwhile would
+    stall the loop and with it the build. While one request rebuilds a stale
+    index the others keep searching the previous one.
+    """
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._document_count = 0
+        self._built = False
+        self._stale = True
+        self._building = False
+        self._lock = threading.Lock()
+
+    def mark_stale(self, tables=None) -> None:
+        self._stale = True
+
+    def _build(self, session: Session) -> Tuple[Dict[str, Dict[int, float]], int]:
+        query = (
+            select(Book.id, Book.book_title, Book.book_summary, Author.author_name)
+            .outerjoin(Author, Book.author_id == Author.id)
+        )
+
+        postings: Dict[str, Dict[int, float]] = {}
+        document_count = 0
+        for book_id, title, summary, author_name in session.exec(query).all():
+            document_count += 1
+            weights: Counter = Counter()
+            for field, text in (('title', title), ('author', author_name), ('summary', summary)):
+                for token in tokenize(text):
+                    weights[token] += FIELD_WEIGHTS[field]
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[book_id] = weight
+        return postings, document_count
+
+    def _current(self, session: Session) -> Tuple[Dict[str, Dict[int, float]], int]:
+        # The index to search: the built one, rebuilt first by a single
+        # request when stale. Before the first build completes, concurrent
+        # requests build their own copy rather than wait for it.
+        with self._lock:
+            rebuild = self._stale and not self._building
+            if rebuild:
+                # Cleared before building so a write during the build marks it stale again
+                self._stale = False
+                self._building = True
+            elif self._built:
+                return self._postings, self._document_count
+
+        try:
+            postings, document_count = self._build(session)
+        except Exception:
+            if rebuild:
+                with self._lock:
+                    self._stale = True
+                    self._building = False
+            raise
+
+        if rebuild:
+            with self._lock:
+                self._postings = postings
+                self._document_count = document_count
+                self._built = True
+                self._building = False
+        return postings, document_count
+
+    def search(self, text: str, session: Session) -> Dict[int, float]:
+        """
+        Get the score of every book matching all terms of text
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return {}
+
+        postings, document_count = self._current(session)
+
+        matches = [postings.get(term, {}) for term in terms]
+        if not all(matches):
+            return {}
+
+        book_ids = set.intersection(*(set(match) for match in matches))
+        scores = {}
+        for book_id in book_ids:
+            score = 0.0
+            for match in matches:
+                score += match[book_id] * (1 + math.log(document_count / len(match)))
+            scores[book_id] = round(score, 6)
+        return scores
+
+book_search_index = BookSearchIndex()
+
+on_tables_changed({"book", "author"}, book_search_index.mark_stale)
+
+def match_books(text: str, session: Session) -> Tuple[Any, Any]:
+    """
+    Build the (condition, rank) pair selecting the books that match a search text.
+
+    On PostgreSQL the condition is served by the GIN index on book.search_vector
+    and the rank is ts_rank_cd. Elsewhere the in-process index finds the
+    matching books and their scores.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        return book_search_vector.op("@@")(query), func.ts_rank_cd(book_search_vector, query)
+
+    scores = book_search_index.search(text, session)
+    if not scores:
+        return false(), literal(0.0)
+    return Book.id.in_(list(scores)), case(scores, value=Book.id, else_=0)
+
+@cached("book_search", tags=CATALOG_TABLES)
+def search_books(
+    q: str,
+    category_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    sort_by: Optional[str] = 'relevance',
+    page: int = 1,
+    size: int = 15,
+    cursor: Optional[str] = None,
+    session: Optional[Session] = None
+) -> Dict[str, Any]:
+    """
+    Search books by title, summary and author name.
+
+    Takes the same filters, sorts and pagination as get_books, plus the
+    'relevance' sort (the default) ordering by how well each book matches.
+    Words are all required; quoted phrases, "or" and "-word" follow the
+    websearch syntax on PostgreSQL.
+
+    Args:
+        q: Search text
+        category_id: Optional filter by category ID
+        author_id: Optional filter by author ID
+        min_rating: Optional filter by minimum average rating (1-5)
+        sort_by: Optional sorting method (relevance, price_asc, price_desc, discount_desc, popularity_desc)
+        page: Page number (starting from 1)
+        size: Number of items per page
+        cursor: Optional opaque cursor from a previous response's next_cursor
+        session: Optional database session
+
+    Returns:
+        Dictionary with total count, page info, list of matching books (each with
+        its rank) and the cursor of the next page
+    """
+    if size not in PAGE_SIZES:
+        size = 15
+    if page < 1:
+        page = 1
+    if sort_by not in CURSOR_FIELDS:
+        sort_by = 'relevance'
+    if session is None:
+        session = get_session()
+
+    return fetch_books_page(
+        session,
+        category_id=category_id,
+        author_id=author_id,
+        min_rating=min_rating,
+        sort_by=sort_by,
+        page=page,
+        size=size,
+        cursor=cursor,
+        match=match_books(q, session)
+    )
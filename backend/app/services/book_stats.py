@@ -0,0 +1,128 @@
+from typing import Optional, Iterable
+from sqlmodel import Session, select
+from sqlalchemy import func, cast, case, Float, update, insert, delete, event, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.book_stats import BookStats
+from app.models.review import Review
+from app.database import get_session
+
+RATING_STARS = [1, 2, 3, 4, 5]
+
+book_stats_table = BookStats.__table__
+
+def _star_column_name(rating_star: int) -> Optional[str]:
+    if rating_star in RATING_STARS:
+        return f"star_{rating_star}_count"
+    return None
+
+def apply_review_delta(connection, book_id: int, rating_star: int, delta: int) -> None:
+    """
+    Add (delta=1) or remove (delta=-1) a single review from the stats row of a book.
+
+    Runs on the connection of the flush that wrote the review, so the stats
+    row commits or rolls back together with the review itself.
+    """
+    if book_id is None or rating_star is None:
+        return
+
+    t = book_stats_table
+    star_column = _star_column_name(rating_star)
+    new_count = t.c.reviews_count + delta
+    new_sum = t.c.rating_sum + delta * rating_star
+
+    values = {
+        'reviews_count': new_count,
+        'rating_sum': new_sum,
+        'avg_rating': case((new_count > 0, cast(new_sum, Float) / new_count), else_=None),
+    }
+    if star_column:
+        values[star_column] = t.c[star_column] + delta
+
+    if delta > 0 and connection.dialect.name == "postgresql":
+        # Upsert so two first reviews for the same book cannot race on the insert
+        insert_values = {'book_id': book_id, 'reviews_count': 1, 'rating_sum': rating_star, 'avg_rating': float(rating_star)}
+        if star_column:
+            insert_values[star_column] = 1
+        statement = pg_insert(t).values(**insert_values)
+        connection.execute(statement.on_conflict_do_update(index_elements=[t.c.book_id], set_=values))
+        return
+
+    result = connection.execute(update(t).where(t.c.book_id == book_id).values(**values))
+    if result.rowcount == 0 and delta > 0:
+        insert_values = {'book_id': book_id, 'reviews_count': 1, 'rating_sum': rating_star, 'avg_rating': float(rating_star)}
+        if star_column:
+            insert_values[star_column] = 1
+        connection.execute(insert(t).values(**insert_values))
+
+@event.listens_for(Review, "after_insert")
+def _review_inserted(mapper, connection, review: Review) -> None:
+    apply_review_delta(connection, review.book_id, review.rating_star, 1)
+
+@event.listens_for(Review, "after_delete")
+def _review_deleted(mapper, connection, review: Review) -> None:
+    apply_review_delta(connection, review.book_id, review.rating_star, -1)
+
+# Load the previous value when these attributes change so that after_update
+# can take the old review out of the stats even if the row was expired
+@event.listens_for(Review.book_id, "set", active_history=True)
+@event.listens_for(Review.rating_star, "set", active_history=True)
+def _track_review_change(review: Review, value, oldvalue, initiator):
+    return value
+
+@event.listens_for(Review, "after_update")
+def _review_updated(mapper, connection, review: Review) -> None:
+    state = inspect(review)
+    book_history = state.attrs.book_id.history
+    rating_history = state.attrs.rating_star.history
+    if not book_history.has_changes() and not rating_history.has_changes():
+        return
+
+    old_book_id = book_history.deleted[0] if book_history.deleted else review.book_id
+    old_rating = rating_history.deleted[0] if rating_history.deleted else review.rating_star
+    apply_review_delta(connection, old_book_id, old_rating, -1)
+    apply_review_delta(connection, review.book_id, review.rating_star, 1)
+
+def rebuild_book_stats(session: Optional[Session] = None, book_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute book_stats from the review table.
+
+    Used for the initial backfill, after bulk loads that bypass the ORM and to
+    repair drift. Without book_ids the whole table is rebuilt in one transaction.
+
+    Args:
+        session: Optional database session
+        book_ids: Optional list of book IDs to refresh instead of every book
+
+    Returns:
+        The number of book_stats rows written
+    """
+    if session is None:
+        session = get_session()
+
+    t = book_stats_table
+
+    aggregate_query = (
+        select(
+            Review.book_id,
+            func.count(Review.id),
+            func.sum(Review.rating_star),
+            func.avg(cast(Review.rating_star, Float)),
+            *[func.count(case((Review.rating_star == star, 1))) for star in RATING_STARS]
+        )
+        .where(Review.book_id.is_not(None))
+        .group_by(Review.book_id)
+    )
+
+    delete_query = delete(t)
+    if book_ids is not None:
+        book_ids = list(book_ids)
+        aggregate_query = aggregate_query.where(Review.book_id.in_(book_ids))
+        delete_query = delete_query.where(t.c.book_id.in_(book_ids))
+
+    columns = ['book_id', 'reviews_count', 'rating_sum', 'avg_rating'] + [_star_column_name(star) for star in RATING_STARS]
+
+    session.execute(delete_query)
+    result = session.execute(insert(t).from_select(columns, aggregate_query))
+    session.commit()
+
+    return result.rowcount
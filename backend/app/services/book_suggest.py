@@ -0,0 +1,226 @@
+import bisect
+import heapq
+import logging
+import threading
+import unicodedata
+from typing import Optional, Dict, Any, List, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import event
+from app.models.book import Book
+from app.models.author import Author
+from app.database import engine, get_session
+from app.events import on_tables_changed_in_database
+
+logger = logging.getLogger(__name__)
+
+# How many prefix matches are ranked before the best ones are returned
+SUGGEST_SCAN_LIMIT = 200
+
+# Up to this many entries changed by a commit are moved one by one with
+# bisect; larger batches are merged into a new list in one pass
+SUGGEST_INCREMENTAL_LIMIT = 64
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Lowercase text and strip accents so "émile" and "Emile" complete the same way
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).strip()
+
+def _entries_for(kind: str, item_id: int, label: str) -> List[Tuple[str, str, int, str]]:
+    # The whole label plus every word suffix, so "sag" completes "Carl Sagan";
+    # each entry keeps the normalized label for ranking
+    normalized = normalize(label)
+    words = normalized.split()
+    return [(" ".join(words[i:]), kind, item_id, normalized) for i in range(len(words))]
+
+class SuggestIndex:
+    """
+    In-memory prefix index over book titles and author names.
+
+    Entries live in a sorted list searched with bisect, so a lookup costs
+    O(log n) plus the matches it returns and never touches the database.
+    It is built once (at startup, or on first use). Committed ORM writes of
+    this worker are applied right away, one batch per commit; writes by
+    anyone else (other workers, imports, psql) are picked up by rebuilding
+    it in the background once the catalog version poller sees them.
+    """
+    def __init__(self):
+        # (key, kind, id, normalized label), sorted by key
+        self._entries: List[Tuple[str, str, int, str]] = []
+        self._labels: Dict[Tuple[str, int], str] = {}
+        self._built = False
+        self._lock = threading.RLock()
+        self._rebuild_requested = False
+        self._rebuilding = False
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def rebuild(self, session: Optional[Session] = None) -> int:
+        """
+        Reload every title and author name from the database.
+
+        Needed after bulk loads that bypass the ORM. Returns the number of
+        titles and authors indexed.
+        """
+        if session is None:
+            session = get_session()
+
+        labels = {}
+        for book_id, title in session.exec(select(Book.id, Book.book_title)).all():
+            labels[("title", book_id)] = title
+        for author_id, author_name in session.exec(select(Author.id, Author.author_name)).all():
+            labels[("author", author_id)] = author_name
+
+        entries = sorted(
+            entry
+            for (kind, item_id), label in labels.items() if label
+            for entry in _entries_for(kind, item_id, label)
+        )
+
+        with self._lock:
+            self._entries = entries
+            self._labels = {key: label for key, label in labels.items() if label}
+            self._built = True
+        return len(self._labels)
+
+    def rebuild_in_background(self, tables=None) -> Optional[threading.Thread]:
+        """
+        Rebuild the index from the database in a background thread.
+
+        Requests made while a rebuild runs are served by one more rebuild
+        after it. Returns the started thread, or None if one was running.
+        """
+        with self._lock:
+            self._rebuild_requested = True
+            if self._rebuilding:
+                return None
+            self._rebuilding = True
+        thread = threading.Thread(target=self._rebuild_while_requested, name="suggest-index-rebuild", daemon=True)
+        thread.start()
+        return thread
+
+    def _rebuild_while_requested(self) -> None:
+        while True:
+            with self._lock:
+                if not self._rebuild_requested:
+                    self._rebuilding = False
+                    return
+                self._rebuild_requested = False
+            try:
+                with Session(engine) as session:
+                    self.rebuild(session)
+            except Exception:
+                logger.warning("Could not rebuild the suggestion index", exc_info=True)
+
+    def apply(self, changes: Dict[Tuple[str, int], Optional[str]]) -> None:
+        """
+        Apply committed changes: (kind, id) -> new label, or None when deleted
+        """
+        with self._lock:
+            if not self._built:
+                return
+            removed, added = [], []
+            for (kind, item_id), label in changes.items():
+                old_label = self._labels.pop((kind, item_id), None)
+                if old_label:
+                    removed.extend(_entries_for(kind, item_id, old_label))
+                if label:
+                    self._labels[(kind, item_id)] = label
+                    added.extend(_entries_for(kind, item_id, label))
+            added.sort()
+
+            if len(removed) + len(added) <= SUGGEST_INCREMENTAL_LIMIT:
+                for entry in removed:
+                    index = bisect.bisect_left(self._entries, entry)
+                    if index < len(self._entries) and self._entries[index] == entry:
+                        del self._entries[index]
+                for entry in added:
+                    bisect.insort(self._entries, entry)
+            else:
+                removed = set(removed)
+                kept = [entry for entry in self._entries if entry not in removed] if removed else self._entries
+                self._entries = list(heapq.merge(kept, added))
+
+    def suggest(self, text: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """
+        Get up to limit titles and authors completing text.
+
+        Labels that start with text rank before labels where a later word
+        does, then shorter labels first.
+        """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        matches = {}
+        with self._lock:
+            index = bisect.bisect_left(self._entries, (prefix,))
+            while index < len(self._entries) and len(matches) < SUGGEST_SCAN_LIMIT:
+                key, kind, item_id, normalized = self._entries[index]
+                if not key.startswith(prefix):
+                    break
+                label = self._labels[(kind, item_id)]
+                starts_label = normalized.startswith(prefix)
+                if starts_label or (kind, item_id) not in matches:
+                    matches[(kind, item_id)] = (not starts_label, len(label), label)
+                index += 1
+
+        ranked = sorted(matches.items(), key=lambda match: match[1])[:limit]
+        return [
+            {'type': kind, 'id': item_id, 'text': label}
+            for (kind, item_id), (_, _, label) in ranked
+        ]
+
+suggest_index = SuggestIndex()
+on_tables_changed_in_database({"book", "author"}, suggest_index.rebuild_in_background)
+
+# Incremental refresh: collect the titles and author names written by each
+# flush, and apply them once the transaction commits
+
+_SUGGEST_FIELDS = {Book: ("title", "book_title"), Author: ("author", "author_name")}
+
+@event.listens_for(Session, "after_flush")
+def _collect_suggest_changes(session, flush_context) -> None:
+    changes = session.info.setdefault("suggest_changes", {})
+    for instance in list(session.new) + list(session.dirty):
+        fields = _SUGGEST_FIELDS.get(type(instance))
+        if fields and instance.id is not None:
+            changes[(fields[0], instance.id)] = getattr(instance, fields[1])
+    for instance in session.deleted:
+        fields = _SUGGEST_FIELDS.get(type(instance))
+        if fields and instance.id is not None:
+            changes[(fields[0], instance.id)] = None
+
+@event.listens_for(Session, "after_commit")
+def _apply_suggest_changes(session) -> None:
+    changes = session.info.pop("suggest_changes", None)
+    if changes:
+        suggest_index.apply(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_suggest_changes(session) -> None:
+    session.info.pop("suggest_changes", None)
+
+def get_suggestions(q: str, limit: int = 8, session: Optional[Session] = None) -> List[Dict[str, Any]]:
+    """
+    Get title and author completions for a search box prefix.
+
+    Answered from the in-memory index; the database is only read if the
+    index has not been built yet.
+
+    Args:
+        q: Prefix typed so far
+        limit: Maximum number of suggestions
+        session: Optional database session, used to build the index on first use
+
+    Returns:
+        A list of dictionaries with the type ('title' or 'author'), ID and text of each suggestion
+    """
+    if not suggest_index.built:
+        suggest_index.rebuild(session)
+    return suggest_index.suggest(q, limit)
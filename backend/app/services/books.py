@@ -1,16 +1,77 @@
-from typing import Optional, Dict, Any, List
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Tuple
 from sqlmodel import Session, select
-from sqlalchemy import func, desc, cast, Float
+from sqlalchemy import func, desc, and_, or_
 from app.models.book import Book
-from app.models.review import Review
-from app.models.discount import Discount
+from app.models.book_stats import BookStats
 from app.models.author import Author
 from app.models.category import Category
 from app.database import get_session
-from datetime import date
+from app.cache import cached, CATALOG_TABLES
+from app.services.book_facets import get_book_facets
+from app.services.pricing import effective_discount_subquery
+from app.services.covers import cover_urls
+from fastapi import HTTPException
 
 PAGE_SIZES = [5, 15, 20, 25]
 
+# Fields of a formatted book that make up the keyset of each sort mode.
+# Book.id is always last so that every cursor position is unique.
+CURSOR_FIELDS = {
+    'price_asc': ['final_price', 'id'],
+    'price_desc': ['final_price', 'id'],
+    'discount_desc': ['discount_amount', 'final_price', 'id'],
+    'popularity_desc': ['reviews_count', 'final_price', 'id'],
+    # Only used by search_books, where rank is the text match score
+    'relevance': ['rank', 'id'],
+    None: ['id'],
+}
+
+def encode_cursor(sort_by: Optional[str], values: List[Any]) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor
+    """
+    payload = {
+        's': sort_by,
+        'k': [str(value) if isinstance(value, Decimal) else value for value in values]
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, sort_by: Optional[str]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor for the same sort mode
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload['k']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if payload.get('s') != sort_by or len(values) != len(CURSOR_FIELDS[sort_by]):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+
+    return [Decimal(value) if isinstance(value, str) else value for value in values]
+
+def keyset_condition(sort_keys: List[Any], values: List[Any]):
+    """
+    Build the WHERE clause selecting the rows that come after the given
+    sort key values, for sort keys with mixed directions.
+
+    sort_keys is a list of (expression, ascending) pairs.
+    """
+    conditions = []
+    for i, (expression, ascending) in enumerate(sort_keys):
+        equal_prefix = [sort_keys[j][0] == values[j] for j in range(i)]
+        after = expression > values[i] if ascending else expression < values[i]
+        conditions.append(and_(*equal_prefix, after))
+    return or_(*conditions)
+
+@cached("books", tags=CATALOG_TABLES)
 def get_books(
     category_id: Optional[int] = None,
     author_id: Optional[int] = None,
@@ -18,6 +79,7 @@ def get_books(
     sort_by: Optional[str] = None,
     page: int = 1,
     size: int = 15,
+    cursor: Optional[str] = None,
     session: Optional[Session] = None
 ) -> Dict[str, Any]:
     """
@@ -26,7 +88,7 @@ def get_books(
     Supports:
     - Filtering by category, author, and minimum rating
     - Sorting by price (asc/desc), discount (desc), and popularity (desc)
-    - Pagination
+    - Offset pagination (page) or keyset pagination (cursor)
 
     Args:
         category_id: Optional filter by category ID
@@ -35,44 +97,68 @@ def get_books(
         sort_by: Optional sorting method (price_asc, price_desc, discount_desc, popularity_desc)
         page: Page number (starting from 1)
         size: Number of items per page
+        cursor: Optional opaque cursor from a previous response's next_cursor.
+            When given, page is ignored and the rows after the cursor are returned.
         session: Optional database session
 
     Returns:
-        Dictionary with total count, page info, and list of books
+        Dictionary with total count, page info, list of books and the cursor of the next page
     """
     if size not in PAGE_SIZES:
         size = 15
     if page < 1:
         page = 1
+    if sort_by not in CURSOR_FIELDS or sort_by == 'relevance':
+        sort_by = None
     if session is None:
         session = get_session()
 
-    # Get current date to check for active discounts
-    today = "2022-10-08"  # Using a fixed date for now
+    # Total comes from the cached facet counts for the same filters
+    total = get_book_facets(
+        category_id=category_id,
+        author_id=author_id,
+        min_rating=min_rating,
+        session=session
+    )['total']
 
-    # Subquery to get the average rating and review count for each book
-    reviews_stats_subquery = (
-        select(
-            Review.book_id,
-            func.count(Review.id).label("reviews_count"),
-            func.avg(cast(Review.rating_star, Float)).label("avg_rating")
-        )
-        .group_by(Review.book_id)
-        .subquery()
+    return fetch_books_page(
+        session,
+        category_id=category_id,
+        author_id=author_id,
+        min_rating=min_rating,
+        sort_by=sort_by,
+        page=page,
+        size=size,
+        cursor=cursor,
+        total=total
     )
 
-    # Subquery to get the current discount price for each book (if available)
-    discount_subquery = (
-        select(
-            Discount.book_id,
-            Discount.discount_price.label("discount_price"),
-            (Book.book_price - Discount.discount_price).label("discount_amount")
-        )
-        .join(Book, Discount.book_id == Book.id)
-        .where(Discount.discount_start_date <= today)
-        .where(Discount.discount_end_date >= today)
-        .subquery()
-    )
+def fetch_books_page(
+    session: Session,
+    category_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    sort_by: Optional[str] = None,
+    page: int = 1,
+    size: int = 15,
+    cursor: Optional[str] = None,
+    total: Optional[int] = None,
+    match: Optional[Tuple[Any, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run the book listing query shared by get_books and search_books.
+
+    Arguments are expected to be validated by the caller. match is an optional
+    (condition, rank) pair restricting the books to a text search; its rank is
+    returned with every book and orders the 'relevance' sort. When total is
+    None it is counted with the same filters.
+    """
+
+    # Single effective discount per book at the pricing date
+    discount_subquery = effective_discount_subquery()
+    discount_amount = Book.book_price - discount_subquery.c.discount_price
+
+    final_price = func.coalesce(discount_subquery.c.discount_price, Book.book_price)
 
     # Main query with all necessary joins
     query = (
@@ -80,15 +166,15 @@ def get_books(
             Book,
             Author,
             Category,
-            reviews_stats_subquery.c.reviews_count,
-            reviews_stats_subquery.c.avg_rating,
+            BookStats.reviews_count,
+            BookStats.avg_rating,
             discount_subquery.c.discount_price,
-            discount_subquery.c.discount_amount,
-            func.coalesce(discount_subquery.c.discount_price, Book.book_price).label("final_price")
+            discount_amount.label("discount_amount"),
+            final_price.label("final_price")
         )
         .join(Author, Book.author_id == Author.id)
         .join(Category, Book.category_id == Category.id)
-        .outerjoin(reviews_stats_subquery, Book.id == reviews_stats_subquery.c.book_id)
+        .outerjoin(BookStats, Book.id == BookStats.book_id)
         .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
     )
 
@@ -99,59 +185,55 @@ def get_books(
         query = query.where(Book.author_id == author_id)
     if min_rating:
         # Chỉ hiển thị sách có đánh giá khi áp dụng bộ lọc min_rating
-        query = query.where(reviews_stats_subquery.c.avg_rating >= min_rating)
+        query = query.where(BookStats.avg_rating >= min_rating)
+    if match is not None:
+        query = query.where(match[0]).add_columns(match[1].label("rank"))
+
+    if total is None:
+        total = session.exec(select(func.count()).select_from(query.subquery())).one()
 
-    # Apply sorting
+    # Sort keys as (expression, ascending); Book.id breaks ties so that
+    # every row has a unique position for both offset and cursor paging
     if sort_by == 'price_asc':
-        query = query.order_by("final_price")
+        sort_keys = [(final_price, True), (Book.id, True)]
     elif sort_by == 'price_desc':
-        query = query.order_by(desc("final_price"))
+        sort_keys = [(final_price, False), (Book.id, False)]
     elif sort_by == 'discount_desc':
         # Sort by discount amount (desc) and then by final price (asc)
-        query = query.order_by(
-            desc(func.coalesce(discount_subquery.c.discount_amount, 0)),
-            "final_price"
-        )
+        sort_keys = [
+            (func.coalesce(discount_amount, 0), False),
+            (final_price, True),
+            (Book.id, True)
+        ]
     elif sort_by == 'popularity_desc':
         # Sort by review count (desc) and then by final price (asc)
         # Không lọc sách không có đánh giá, chỉ sắp xếp theo số lượng đánh giá
-        query = query.order_by(
-            desc(func.coalesce(reviews_stats_subquery.c.reviews_count, 0)),
-            "final_price"
-        )
+        sort_keys = [
+            (func.coalesce(BookStats.reviews_count, 0), False),
+            (final_price, True),
+            (Book.id, True)
+        ]
+    elif sort_by == 'relevance' and match is not None:
+        # Best text match first
+        sort_keys = [(match[1], False), (Book.id, True)]
     else:
         # Default sorting by ID
-        query = query.order_by(Book.id.desc())
+        sort_keys = [(Book.id, False)]
 
-    # Create a count query with the same filters
-    count_query = (
-        select(func.count(Book.id))
-        .join(Author, Book.author_id == Author.id)
-        .join(Category, Book.category_id == Category.id)
-        .outerjoin(reviews_stats_subquery, Book.id == reviews_stats_subquery.c.book_id)
-        .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
-    )
+    query = query.order_by(*[expression if ascending else desc(expression) for expression, ascending in sort_keys])
 
-    # Apply the same filters to the count query
-    if category_id:
-        count_query = count_query.where(Book.category_id == category_id)
-    if author_id:
-        count_query = count_query.where(Book.author_id == author_id)
-    if min_rating:
-        # Cập nhật count query để khớp với query chính
-        count_query = count_query.where(reviews_stats_subquery.c.avg_rating >= min_rating)
-
-    # Get total count
-    total = session.exec(count_query).one()
-
-    # Apply pagination
-    query = query.offset((page - 1) * size).limit(size)
+    # Apply pagination: seek past the cursor when given, otherwise skip whole pages
+    if cursor:
+        query = query.where(keyset_condition(sort_keys, decode_cursor(cursor, sort_by)))
+    else:
+        query = query.offset((page - 1) * size)
+    query = query.limit(size)
     results = session.exec(query).all()
 
     # Format results
     formatted_results = []
-    for book, author, category, reviews_count, avg_rating, discount_price, discount_amount, final_price in results:
-        formatted_results.append({
+    for book, author, category, reviews_count, avg_rating, discount_price, discount_amount, final_price, *rank in results:
+        formatted_book = {
             'id': book.id,
             'title': book.book_title,
             'summary': book.book_summary,
@@ -160,19 +242,30 @@ def get_books(
             'discount_amount': discount_amount,
             'final_price': final_price,
             'cover': book.book_cover_photo,
+            'cover_urls': cover_urls(book.book_cover_photo),
             'category_id': book.category_id,
             'category_name': category.category_name,
             'author_id': book.author_id,
             'author_name': author.author_name,
             'reviews_count': reviews_count or 0,
             'avg_rating': float(avg_rating) if avg_rating is not None else 0,
-        })
+        }
+        if match is not None:
+            formatted_book['rank'] = float(rank[0] or 0)
+        formatted_results.append(formatted_book)
+
+    # A full page means there may be more rows after the last one
+    next_cursor = None
+    if len(formatted_results) == size:
+        last = formatted_results[-1]
+        next_cursor = encode_cursor(sort_by, [last[field] or 0 for field in CURSOR_FIELDS[sort_by]])
 
     return {
         'total': total,
         'page': page,
         'size': size,
-        'items': formatted_results
+        'items': formatted_results,
+        'next_cursor': next_cursor
     }
 
 
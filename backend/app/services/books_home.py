@@ -0,0 +1,72 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_engine
+from app.cache import LRUCache, register_cache, copy_result, collect_tags, reuse_tags, CATALOG_TABLES
+from app.config import settings
+from app.services.aio import get_books_on_sale_async, get_popular_books_async, get_recommended_books_async
+
+# Home payloads keyed by the (on_sale_limit, popular_limit, recommended_limit) tuple
+_home_cache = register_cache("books_home", LRUCache(
+    max_entries=settings.cache_max_entries,
+    ttl_seconds=settings.home_cache_ttl_seconds
+))
+
+async def _run_with_own_session(service: Callable[..., Awaitable[Any]], limit: int) -> Any:
+    # A session runs one statement at a time, so every concurrent query gets its own
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        return await service(limit=limit, session=session)
+
+async def get_home_books(
+    on_sale_limit: int = 10,
+    popular_limit: int = 8,
+    recommended_limit: int = 8
+) -> Dict[str, Any]:
+    """
+    Get the on-sale, popular and recommended lists of the home page in one payload.
+
+    The three queries run concurrently on separate async sessions, and the combined
+    result is cached for HOME_CACHE_TTL_SECONDS or until books, reviews or
+    discounts change.
+
+    Args:
+        on_sale_limit: Number of on-sale books
+        popular_limit: Number of popular books
+        recommended_limit: Number of recommended books
+
+    Returns:
+        A dictionary with the on_sale, popular and recommended results, in the
+        same shapes as their individual endpoints
+    """
+    key = (on_sale_limit, popular_limit, recommended_limit)
+    cached = _home_cache.get(key)
+    if cached is not None:
+        result, extra_tags = cached
+        reuse_tags(extra_tags)
+        return copy_result(result)
+
+    version = _home_cache.version(CATALOG_TABLES)
+    # The three lists may carry tags of covers still being built
+    with collect_tags() as extra_tags:
+        on_sale, popular, recommended = await asyncio.gather(
+            _run_with_own_session(get_books_on_sale_async, on_sale_limit),
+            _run_with_own_session(get_popular_books_async, popular_limit),
+            _run_with_own_session(get_recommended_books_async, recommended_limit)
+        )
+
+    result = {
+        'on_sale': on_sale,
+        'popular': popular,
+        'recommended': recommended
+    }
+
+    _home_cache.set(
+        key, (copy_result(result), extra_tags), tags=CATALOG_TABLES, version=version, extra_tags=extra_tags
+    )
+    return result
+
+def invalidate_home_books() -> None:
+    """
+    Drop every cached home payload
+    """
+    _home_cache.clear()
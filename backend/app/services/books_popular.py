@@ -2,11 +2,14 @@ from typing import Optional, Dict, Any, List
 from sqlmodel import Session, select
 from sqlalchemy import func, desc
 from app.models.book import Book
-from app.models.review import Review
-from app.models.discount import Discount
+from app.models.book_stats import BookStats
 from app.database import get_session
-from datetime import date
+from app.cache import cached, CATALOG_TABLES
+from app.loading import BOOK_CARD_LOADING
+from app.services.pricing import effective_discount_subquery
+from app.services.covers import cover_urls
 
+@cached("books_popular", tags=CATALOG_TABLES)
 def get_popular_books(limit: int = 8, session: Optional[Session] = None) -> Dict[str, Any]:
     """
     Get top books with most reviews and lowest final price.
@@ -21,42 +24,22 @@ def get_popular_books(limit: int = 8, session: Optional[Session] = None) -> Dict
     if session is None:
         session = get_session()
     
-    # Get current date to check for active discounts
-    today = "2022-10-08"
-    
-    # Subquery to get the number of reviews and average rating for each book
-    reviews_stats_subquery = (
-        select(
-            Review.book_id,
-            func.count(Review.id).label("reviews_count"),
-            func.avg(Review.rating_star).label("avg_rating")
-        )
-        .group_by(Review.book_id)
-        .subquery()
-    )
-    
-    # Subquery to get the current discount price for each book (if available)
-    discount_subquery = (
-        select(
-            Discount.book_id,
-            Discount.discount_price.label("discounted_price")
-        )
-        .where(Discount.discount_start_date <= today)
-        .where(Discount.discount_end_date >= today)
-        .subquery()
-    )
+    # Single effective discount per book at the pricing date
+    discount_subquery = effective_discount_subquery()
     
     # Main query to get books with review counts, avg rating, and prices
     query = (
         select(
             Book,
-            reviews_stats_subquery.c.reviews_count,
-            reviews_stats_subquery.c.avg_rating,
-            func.coalesce(discount_subquery.c.discounted_price, Book.book_price).label("final_price")
+            BookStats.reviews_count,
+            BookStats.avg_rating,
+            func.coalesce(discount_subquery.c.discount_price, Book.book_price).label("final_price")
         )
-        .join(reviews_stats_subquery, Book.id == reviews_stats_subquery.c.book_id)
+        .join(BookStats, Book.id == BookStats.book_id)
         .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
-        .order_by(desc("reviews_count"), "final_price")
+        .where(BookStats.reviews_count > 0)
+        .order_by(desc(BookStats.reviews_count), "final_price")
+        .options(*BOOK_CARD_LOADING)
         .limit(limit)
     )
     
@@ -75,6 +58,7 @@ def get_popular_books(limit: int = 8, session: Optional[Session] = None) -> Dict
             'reviews_count': reviews_count,
             'avg_rating': float(avg_rating) if avg_rating is not None else None,
             'cover': book.book_cover_photo,
+            'cover_urls': cover_urls(book.book_cover_photo),
             'category_id': book.category_id,
             'author_id': book.author_id,
             'author_name': book.author.author_name if book.author else None,
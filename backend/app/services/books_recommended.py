@@ -1,12 +1,15 @@
 from typing import Optional, Dict, Any, List
 from sqlmodel import Session, select
-from sqlalchemy import func, desc, cast, Float
+from sqlalchemy import func, desc
 from app.models.book import Book
-from app.models.review import Review
-from app.models.discount import Discount
+from app.models.book_stats import BookStats
 from app.database import get_session
-from datetime import date
+from app.cache import cached, CATALOG_TABLES
+from app.loading import BOOK_CARD_LOADING
+from app.services.pricing import effective_discount_subquery
+from app.services.covers import cover_urls
 
+@cached("books_recommended", tags=CATALOG_TABLES)
 def get_recommended_books(limit: int = 8, session: Optional[Session] = None) -> Dict[str, Any]:
     """
     Get top books with highest average rating stars and lowest final price.
@@ -21,42 +24,22 @@ def get_recommended_books(limit: int = 8, session: Optional[Session] = None) ->
     if session is None:
         session = get_session()
     
-    # Get current date to check for active discounts
-    today = "2022-10-08"
-    
-    # Subquery to get the average rating stars for each book
-    avg_rating_subquery = (
-        select(
-            Review.book_id,
-            func.avg(cast(Review.rating_star, Float)).label("avg_rating"),
-            func.count(Review.id).label("reviews_count")
-        )
-        .group_by(Review.book_id)
-        .subquery()
-    )
-    
-    # Subquery to get the current discount price for each book (if available)
-    discount_subquery = (
-        select(
-            Discount.book_id,
-            Discount.discount_price.label("discounted_price")
-        )
-        .where(Discount.discount_start_date <= today)
-        .where(Discount.discount_end_date >= today)
-        .subquery()
-    )
+    # Single effective discount per book at the pricing date
+    discount_subquery = effective_discount_subquery()
     
     # Main query to get books with average ratings and prices
     query = (
         select(
             Book,
-            avg_rating_subquery.c.avg_rating,
-            avg_rating_subquery.c.reviews_count,
-            func.coalesce(discount_subquery.c.discounted_price, Book.book_price).label("final_price")
+            BookStats.avg_rating,
+            BookStats.reviews_count,
+            func.coalesce(discount_subquery.c.discount_price, Book.book_price).label("final_price")
         )
-        .join(avg_rating_subquery, Book.id == avg_rating_subquery.c.book_id)
+        .join(BookStats, Book.id == BookStats.book_id)
         .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
-        .order_by(desc("avg_rating"), "final_price")
+        .where(BookStats.reviews_count > 0)
+        .order_by(desc(BookStats.avg_rating), "final_price")
+        .options(*BOOK_CARD_LOADING)
         .limit(limit)
     )
     
@@ -75,6 +58,7 @@ def get_recommended_books(limit: int = 8, session: Optional[Session] = None) ->
             'avg_rating': round(avg_rating, 2) if avg_rating else 0,
             'reviews_count': reviews_count,
             'cover': book.book_cover_photo,
+            'cover_urls': cover_urls(book.book_cover_photo),
             'category_id': book.category_id,
             'author_id': book.author_id,
             'author_name': book.author.author_name if book.author else None,
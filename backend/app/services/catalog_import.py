@@ -0,0 +1,357 @@
+import csv
+import io
+import json
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import asyncpg
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine, asyncpg_dsn
+from app.services.book_stats import rebuild_book_stats
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# book_stats is refreshed for this many books per statement
+STATS_BATCH_SIZE = 5000
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    value = _text(value)
+    return Decimal(value) if value is not None else None
+
+def _int(value: Any) -> Optional[int]:
+    value = _text(value)
+    return int(value) if value is not None else None
+
+def _date(value: Any) -> Optional[date]:
+    value = _text(value)
+    return date.fromisoformat(value[:10]) if value is not None else None
+
+def _datetime(value: Any) -> Optional[datetime]:
+    value = _text(value)
+    return datetime.fromisoformat(value).replace(tzinfo=None) if value is not None else None
+
+def _rating(value: Any) -> Optional[int]:
+    value = _int(value)
+    if value is not None and not 1 <= value <= 5:
+        raise ValueError("rating_star out of range")
+    return value
+
+# Rows of discounts and reviews point at their book by title and author name
+_BOOK_LOOKUP = """
+    JOIN (SELECT DISTINCT ON (author_name) id, author_name FROM author ORDER BY author_name, id) a
+        ON a.author_name = s.author_name
+    JOIN (SELECT DISTINCT ON (book_title, author_id) id, book_title, author_id FROM book ORDER BY book_title, author_id, id) b
+        ON b.book_title = s.book_title AND b.author_id = a.id
+"""
+
+class ImportSpec:
+    """
+    How one kind of catalog row is parsed, resolved and merged.
+
+    fields are the input columns as (name, SQL type, parser, required).
+    resolve is a SELECT over the staging table "s" producing the target
+    columns plus s.ordinal; rows it drops had a foreign key that could not be
+    resolved. keys are the natural key columns the rows are upserted on, and
+    values the columns updated when the key already exists.
+    """
+    def __init__(
+        self,
+        table: str,
+        fields: List[Tuple[str, str, Callable[[Any], Any], bool]],
+        resolve: str,
+        keys: List[str],
+        values: List[str]
+    ):
+        self.table = table
+        self.fields = fields
+        self.resolve = resolve
+        self.keys = keys
+        self.values = values
+
+IMPORT_SPECS: Dict[str, ImportSpec] = {
+    "authors": ImportSpec(
+        table="author",
+        fields=[
+            ("author_name", "varchar(255)", _text, True),
+            ("author_bio", "text", _text, False),
+        ],
+        resolve="SELECT s.ordinal, s.author_name, s.author_bio FROM import_stage s",
+        keys=["author_name"],
+        values=["author_bio"],
+    ),
+    "categories": ImportSpec(
+        table="category",
+        fields=[
+            ("category_name", "varchar(120)", _text, True),
+            ("category_desc", "varchar(255)", _text, False),
+        ],
+        resolve="SELECT s.ordinal, s.category_name, s.category_desc FROM import_stage s",
+        keys=["category_name"],
+        values=["category_desc"],
+    ),
+    "books": ImportSpec(
+        table="book",
+        fields=[
+            ("book_title", "varchar(255)", _text, True),
+            ("author_name", "varchar(255)", _text, True),
+            ("category_name", "varchar(120)", _text, True),
+            ("book_summary", "text", _text, True),
+            ("book_price", "numeric(5, 2)", _decimal, True),
+            ("book_cover_photo", "varchar(20)", _text, False),
+        ],
+        resolve="""
+            SELECT s.ordinal, s.book_title, a.id AS author_id, c.id AS category_id,
+                   s.book_summary, s.book_price, s.book_cover_photo
+            FROM import_stage s
+            JOIN (SELECT DISTINCT ON (author_name) id, author_name FROM author ORDER BY author_name, id) a
+                ON a.author_name = s.author_name
+            JOIN (SELECT DISTINCT ON (category_name) id, category_name FROM category ORDER BY category_name, id) c
+                ON c.category_name = s.category_name
+        """,
+        keys=["book_title", "author_id"],
+        values=["category_id", "book_summary", "book_price", "book_cover_photo"],
+    ),
+    "discounts": ImportSpec(
+        table="discount",
+        fields=[
+            ("book_title", "varchar(255)", _text, True),
+            ("author_name", "varchar(255)", _text, True),
+            ("discount_start_date", "date", _date, True),
+            ("discount_end_date", "date", _date, False),
+            ("discount_price", "numeric(5, 2)", _decimal, True),
+        ],
+        resolve=f"""
+            SELECT s.ordinal, b.id AS book_id, s.discount_start_date, s.discount_end_date, s.discount_price
+            FROM import_stage s {_BOOK_LOOKUP}
+        """,
+        keys=["book_id", "discount_start_date"],
+        values=["discount_end_date", "discount_price"],
+    ),
+    "reviews": ImportSpec(
+        table="review",
+        fields=[
+            ("book_title", "varchar(255)", _text, True),
+            ("author_name", "varchar(255)", _text, True),
+            ("review_title", "varchar(120)", _text, True),
+            ("review_details", "text", _text, False),
+            ("review_date", "timestamp(0)", _datetime, True),
+            ("rating_star", "smallint", _rating, True),
+        ],
+        resolve=f"""
+            SELECT s.ordinal, b.id AS book_id, s.review_title, s.review_details, s.review_date, s.rating_star
+            FROM import_stage s {_BOOK_LOOKUP}
+        """,
+        keys=["book_id", "review_title", "review_date"],
+        values=["review_details", "rating_star"],
+    ),
+}
+
+# Entities are imported in this order so that foreign keys resolve
+IMPORT_ORDER = ["authors", "categories", "books", "discounts", "reviews"]
+
+def read_rows(path: str, file_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the rows of a CSV (with a header line) or JSONL file as dictionaries
+    """
+    if file_format is None:
+        file_format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+    with io.open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def _max_length(sql_type: str) -> Optional[int]:
+    match = re.fullmatch(r"varchar\((\d+)\)", sql_type)
+    return int(match.group(1)) if match else None
+
+def _parse(spec: ImportSpec, rows: Iterable[Dict[str, Any]], report: Dict[str, Any]) -> Iterator[Tuple[Any, ...]]:
+    # Convert input rows to staging records; rows that fail are counted, not loaded,
+    # so that a single bad value cannot abort the COPY of a whole chunk
+    fields = [(name, parse, required, _max_length(sql_type)) for name, sql_type, parse, required in spec.fields]
+    for ordinal, row in enumerate(rows):
+        report['read'] += 1
+        try:
+            record = [ordinal]
+            for name, parse, required, max_length in fields:
+                value = parse(row.get(name))
+                if value is None and required:
+                    raise ValueError(f"missing {name}")
+                if max_length is not None and value is not None and len(value) > max_length:
+                    raise ValueError(f"{name} longer than {max_length}")
+                record.append(value)
+        except (ValueError, TypeError, InvalidOperation, AttributeError):
+            report['invalid'] += 1
+            continue
+        yield tuple(record)
+
+def _chunks(records: Iterator[Tuple[Any, ...]], size: int) -> Iterator[List[Tuple[Any, ...]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def import_entity(
+    connection: asyncpg.Connection,
+    entity: str,
+    rows: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[str, int, float], None]] = None
+) -> Dict[str, Any]:
+    """
+    Stream one entity into a staging table with COPY and merge it in one go.
+
+    Foreign keys (author, category, book) are resolved with a single join over
+    the staging table and repeated keys keep their last row. Natural keys are
+    not unique in the database (two authors may share a name), so each row
+    is matched to the existing row of its key with the lowest id, the same
+    one references resolve to; that row is updated only when a value
+    changed, and rows without a match are inserted. Imports of the same
+    entity take turns on an advisory lock, so two of them cannot both insert
+    a new key.
+
+    Args:
+        connection: asyncpg connection to run on (one transaction per entity)
+        entity: One of IMPORT_SPECS
+        rows: Input rows as dictionaries
+        chunk_size: Number of rows sent per COPY
+        progress: Optional callback(entity, rows_staged, elapsed_seconds) after every chunk
+
+    Returns:
+        A report with the rows read, invalid, unresolved, duplicated, inserted and updated,
+        the elapsed time and the throughput. For entities that reference a book,
+        book_ids lists the books whose rows were inserted or updated.
+    """
+    spec = IMPORT_SPECS[entity]
+    report = {'entity': entity, 'read': 0, 'invalid': 0, 'staged': 0, 'unresolved': 0,
+              'duplicates': 0, 'inserted': 0, 'updated': 0}
+    started = time.perf_counter()
+
+    columns = ["ordinal"] + [name for name, _, _, _ in spec.fields]
+    column_types = ", ".join(f"{name} {sql_type}" for name, sql_type, _, _ in spec.fields)
+    keys = ", ".join(spec.keys)
+    key_match = " AND ".join(f"t.{key} = r.{key}" for key in spec.keys)
+    target_columns = spec.keys + spec.values
+    book_ids = "book_id" in target_columns
+    # Number of changed rows, plus the books they belong to
+    summary = "SELECT count(*) AS changed_rows" + (", array_agg(DISTINCT book_id) AS book_ids" if book_ids else "")
+    returning = "RETURNING t.book_id" if book_ids else "RETURNING 1"
+    target_keys = ", ".join(f"t.{key}" for key in spec.keys)
+
+    async with connection.transaction():
+        await connection.execute(f"CREATE TEMP TABLE import_stage (ordinal bigint, {column_types}) ON COMMIT DROP")
+
+        for chunk in _chunks(_parse(spec, rows, report), chunk_size):
+            await connection.copy_records_to_table("import_stage", records=chunk, columns=columns)
+            report['staged'] += len(chunk)
+            if progress:
+                progress(entity, report['staged'], time.perf_counter() - started)
+
+        await connection.execute(f"CREATE TEMP TABLE import_resolved ON COMMIT DROP AS {spec.resolve}")
+        await connection.execute(
+            f"CREATE TEMP TABLE import_rows ON COMMIT DROP AS "
+            f"SELECT DISTINCT ON ({keys}) * FROM import_resolved ORDER BY {keys}, ordinal DESC"
+        )
+        resolved = await connection.fetchval("SELECT count(*) FROM import_resolved")
+        merged = await connection.fetchval("SELECT count(*) FROM import_rows")
+        report['unresolved'] = report['staged'] - resolved
+        report['duplicates'] = resolved - merged
+        await connection.execute("ANALYZE import_rows")
+
+        await connection.execute("SELECT pg_advisory_xact_lock(hashtext('catalog_import'), hashtext($1))", spec.table)
+        await connection.execute(
+            f"CREATE TEMP TABLE import_matched ON COMMIT DROP AS "
+            f"SELECT r.*, m.id AS target_id FROM import_rows r LEFT JOIN ("
+            f"SELECT {target_keys}, min(t.id) AS id FROM {spec.table} t JOIN import_rows r ON {key_match} "
+            f"GROUP BY {target_keys}"
+            f") m ON {' AND '.join(f'm.{key} = r.{key}' for key in spec.keys)}"
+        )
+
+        touched = set()
+        if spec.values:
+            assignments = ", ".join(f"{value} = r.{value}" for value in spec.values)
+            changed = " OR ".join(f"t.{value} IS DISTINCT FROM r.{value}" for value in spec.values)
+            updated = await connection.fetchrow(
+                f"WITH changed AS (UPDATE {spec.table} t SET {assignments} FROM import_matched r "
+                f"WHERE t.id = r.target_id AND ({changed}) {returning}) {summary} FROM changed"
+            )
+            report['updated'] = updated['changed_rows']
+            if book_ids:
+                touched.update(updated['book_ids'] or [])
+
+        inserted = await connection.fetchrow(
+            f"WITH added AS (INSERT INTO {spec.table} AS t ({', '.join(target_columns)}) "
+            f"SELECT {', '.join(target_columns)} FROM import_matched WHERE target_id IS NULL {returning}) "
+            f"{summary} FROM added"
+        )
+        report['inserted'] = inserted['changed_rows']
+        if book_ids:
+            touched.update(inserted['book_ids'] or [])
+            report['book_ids'] = sorted(touched)
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['read'] / report['seconds']) if report['seconds'] else None
+    return report
+
+async def import_catalog(
+    sources: Dict[str, Iterable[Dict[str, Any]]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[str, int, float], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Import several entities in dependency order, then refresh derived data once.
+
+    book_stats is recomputed after the reviews are loaded, for the books whose
+    reviews changed only. Running API workers are not told directly: they
+    follow the catalog_version rows (see app.http_cache) and drop their
+    cached results, suggestion index and search index for the tables the
+    import wrote within CATALOG_VERSION_POLL_SECONDS.
+
+    Args:
+        sources: Rows per entity name (authors, categories, books, discounts, reviews)
+        chunk_size: Number of rows sent per COPY
+        progress: Optional progress callback, see import_entity
+
+    Returns:
+        One report per imported entity
+    """
+    unknown = set(sources) - set(IMPORT_SPECS)
+    if unknown:
+        raise ValueError(f"Unknown entities: {', '.join(sorted(unknown))}")
+
+    reports = []
+    connection = await asyncpg.connect(asyncpg_dsn())
+    try:
+        for entity in IMPORT_ORDER:
+            if entity in sources:
+                reports.append(await import_entity(connection, entity, sources[entity], chunk_size, progress))
+    finally:
+        await connection.close()
+
+    reviewed = sorted({
+        book_id for report in reports if report['entity'] == "reviews" for book_id in report['book_ids']
+    })
+    if reviewed:
+        async with AsyncSession(async_engine) as session:
+            for start in range(0, len(reviewed), STATS_BATCH_SIZE):
+                batch = reviewed[start:start + STATS_BATCH_SIZE]
+                await session.run_sync(lambda sync_session: rebuild_book_stats(session=sync_session, book_ids=batch))
+
+    return reports
@@ -4,11 +4,16 @@ from sqlalchemy import func
 from app.models.category import Category
 from app.models.book import Book
 from app.database import get_session
+from app.cache import cached
 
+@cached("categories", tags={"category", "book"})
 def get_categories(session: Optional[Session] = None) -> List[Dict[str, Any]]:
     """
     Get all categories with book count for each category.
 
+    The book counts come from a single grouped query joined to the categories,
+    ordered by category name.
+
     Args:
         session: Optional database session
 
@@ -18,22 +23,19 @@ def get_categories(session: Optional[Session] = None) -> List[Dict[str, Any]]:
     if session is None:
         session = get_session()
 
-    # Query to get all categories ordered by category_name
-    categories_query = select(Category).order_by(Category.category_name)
-    categories = session.exec(categories_query).all()
-
-    # Format the results and count books in each category
-    result = []
-    for category in categories:
-        # Count books in this category
-        book_count_query = select(func.count(Book.id)).where(Book.category_id == category.id)
-        book_count = session.exec(book_count_query).one()
+    categories_query = (
+        select(Category.id, Category.category_name, Category.category_desc, func.count(Book.id))
+        .outerjoin(Book, Book.category_id == Category.id)
+        .group_by(Category.id, Category.category_name, Category.category_desc)
+        .order_by(Category.category_name, Category.id)
+    )
 
-        result.append({
-            'id': category.id,
-            'name': category.category_name,
-            'description': category.category_desc,
+    return [
+        {
+            'id': category_id,
+            'name': category_name,
+            'description': category_desc,
             'book_count': book_count or 0
-        })
-
-    return result
+        }
+        for category_id, category_name, category_desc, book_count in session.exec(categories_query).all()
+    ]
@@ -0,0 +1,314 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from typing import Optional, Dict, Iterable, List, Set, Tuple
+
+from PIL import Image, ImageOps
+
+from app.cache import add_tags, invalidate_tags
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Variant widths in pixels; sources are never upscaled
+COVER_SIZES = {
+    "thumbnail": 120,
+    "card": 320,
+    "detail": 640,
+}
+
+# Format -> (Pillow encoder, file extension, media type, encoder options)
+COVER_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Cover names come from Book.book_cover_photo and end up in file paths
+COVER_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+VARIANT_FILENAME = re.compile(
+    r"(?P<name>[A-Za-z0-9_-]{1,64})-(?P<size>%s)-(?P<digest>[0-9a-f]{16})\.(?P<extension>%s)" % (
+        "|".join(COVER_SIZES), "|".join(extension for _, extension, _, _ in COVER_FORMATS.values())
+    )
+)
+MEDIA_TYPES = {extension: media_type for _, extension, media_type, _ in COVER_FORMATS.values()}
+
+def cover_tag(name: str) -> str:
+    """
+    Cache tag of the results that found a cover without variants yet
+    """
+    return f"cover:{name}"
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Several workers may build the same cover at once; they write the same
+    # bytes, and readers only ever see complete files
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+def _resize(image: Image.Image, width: int) -> Image.Image:
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+def _encode(image: Image.Image, format_name: str) -> bytes:
+    encoder, _, _, options = COVER_FORMATS[format_name]
+    if encoder == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha channel: flatten on white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, encoder, **options)
+    return buffer.getvalue()
+
+class CoverVariants:
+    """
+    Resized WebP and JPEG variants of the cover images, built once per source.
+
+    Every variant file is named after the SHA-256 of its own bytes, so its
+    URL changes whenever its content does and can be cached forever. The
+    names of the variants of one source are recorded in a small manifest
+    named after the hash of the source; a source is therefore only resized
+    again when its content changes, and never twice by different workers
+    that see the same manifest.
+
+    Requests never build: a cover whose variants are not known yet is
+    queued for a background builder thread and has no URLs until it is
+    done, and a known cover is a dict lookup without any file access.
+    Cached results that found a cover without URLs are tagged with it
+    (cover_tag) and dropped once it is built; nothing else is.
+    Variants are built for every source at startup (or ahead of time with
+    scripts/build_cover_variants.py); a source image replaced later is
+    picked up at the next start.
+    """
+    def __init__(self, source_dir: str, variant_dir: str):
+        self.source_dir = source_dir
+        self.variant_dir = variant_dir
+        # cover name -> variant file names, or None if it has no readable source
+        self._known: Dict[str, Optional[Dict[str, Dict[str, str]]]] = {}
+        # cover name -> (mtime_ns, size) of the source the variants were built from
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        # One lock per cover, so that covers are built in parallel but each only once
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued: Set[str] = set()
+        self._builder: Optional[threading.Thread] = None
+
+    def source_path(self, name: str) -> Optional[str]:
+        """
+        Path of the source image of a cover, or None if there is none
+        """
+        if not name or not COVER_NAME.fullmatch(name):
+            return None
+        for extension in SOURCE_EXTENSIONS:
+            path = os.path.join(self.source_dir, name + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def variants(self, name: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Get the variant file names of a cover without waiting for them.
+
+        Returns:
+            {size: {format: file name}}, or None if the cover has no readable
+            source or its variants are still being built
+        """
+        if not name or not COVER_NAME.fullmatch(name):
+            return None
+        try:
+            return self._known[name]
+        except KeyError:
+            add_tags([cover_tag(name)])
+            self.enqueue([name])
+            return None
+
+    def enqueue(self, names: Iterable[str]) -> None:
+        """
+        Have the background builder build the variants of these covers
+        """
+        with self._lock:
+            for name in names:
+                if name not in self._queued:
+                    self._queued.add(name)
+                    self._queue.put(name)
+            if self._builder is None:
+                self._builder = threading.Thread(target=self._build_queued, name="cover-builder", daemon=True)
+                self._builder.start()
+
+    def wait(self) -> None:
+        """
+        Block until every queued cover is built
+        """
+        self._queue.join()
+
+    def _build_queued(self) -> None:
+        changed: Set[str] = set()
+        while True:
+            name = self._queue.get()
+            try:
+                if self.build(name):
+                    changed.add(name)
+            except Exception:
+                logger.warning("Cover builder failed on %s", name, exc_info=True)
+            finally:
+                with self._lock:
+                    self._queued.discard(name)
+                # Publish once per burst rather than once per cover
+                if changed and self._queue.empty():
+                    self._publish(changed)
+                    changed = set()
+                self._queue.task_done()
+
+    def _publish(self, names: Set[str]) -> None:
+        # Results cached while these covers had no URLs would keep showing none
+        invalidate_tags({cover_tag(name) for name in names})
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def build(self, name: str) -> bool:
+        """
+        Build the variants of a cover now if its source is new or changed.
+
+        Returns:
+            Whether the cover was not known before or its URLs changed
+        """
+        with self._lock_for(name):
+            path = self.source_path(name)
+            if path is None:
+                stamp = None
+            else:
+                stat_result = os.stat(path)
+                stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+            if name in self._known and self._stamps.get(name) == stamp:
+                return False
+
+            variants = None
+            if path is not None:
+                try:
+                    variants = self._load_or_build(name, path)
+                except Exception:
+                    logger.warning("Could not build the variants of cover %s", name, exc_info=True)
+            known = name in self._known
+            previous = self._known.get(name)
+            self._stamps[name] = stamp
+            self._known[name] = variants
+            return not known or variants != previous
+
+    def _load_or_build(self, name: str, path: str) -> Dict[str, Dict[str, str]]:
+        with open(path, "rb") as f:
+            source = f.read()
+        manifest_path = os.path.join(
+            self.variant_dir, f"{name}.{hashlib.sha256(source).hexdigest()[:16]}.json"
+        )
+
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as f:
+                variants = json.load(f)
+            if all(
+                os.path.isfile(os.path.join(self.variant_dir, filename))
+                for formats in variants.values() for filename in formats.values()
+            ):
+                return variants
+
+        os.makedirs(self.variant_dir, exist_ok=True)
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(source)))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+
+        variants: Dict[str, Dict[str, str]] = {}
+        for size, width in COVER_SIZES.items():
+            resized = _resize(image, width)
+            variants[size] = {}
+            for format_name, (_, extension, _, _) in COVER_FORMATS.items():
+                data = _encode(resized, format_name)
+                filename = f"{name}-{size}-{hashlib.sha256(data).hexdigest()[:16]}.{extension}"
+                target = os.path.join(self.variant_dir, filename)
+                if not os.path.isfile(target):
+                    _write_atomic(target, data)
+                variants[size][format_name] = filename
+
+        # Written last, so a manifest only ever lists files that exist
+        _write_atomic(manifest_path, json.dumps(variants).encode("utf-8"))
+        logger.info("Built %d variants of cover %s", len(COVER_SIZES) * len(COVER_FORMATS), name)
+        return variants
+
+    def urls(self, name: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Get the variant URLs of a cover, as returned by the book listings and details.
+
+        Returns:
+            {size: {format: URL}}, e.g. urls("book1")["card"]["webp"], or None
+            if the cover has no readable source or is not built yet (clients
+            then fall back to the original image named by the cover field)
+        """
+        variants = self.variants(name)
+        if variants is None:
+            return None
+        base_url = settings.cover_base_url.rstrip("/")
+        return {
+            size: {format_name: f"{base_url}/{filename}" for format_name, filename in formats.items()}
+            for size, formats in variants.items()
+        }
+
+    def variant_path(self, filename: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Resolve a variant file name from a cover URL.
+
+        Returns:
+            (path, digest, media type), or None if the name is not a variant
+            name or the file does not exist
+        """
+        match = VARIANT_FILENAME.fullmatch(filename)
+        if match is None:
+            return None
+        path = os.path.join(self.variant_dir, filename)
+        if not os.path.isfile(path):
+            return None
+        return path, match.group("digest"), MEDIA_TYPES[match.group("extension")]
+
+    def source_names(self) -> List[str]:
+        """
+        Names of every cover in the source directory
+        """
+        if not os.path.isdir(self.source_dir):
+            logger.warning("Cover source directory %s does not exist", self.source_dir)
+            return []
+        return sorted({
+            os.path.splitext(entry)[0] for entry in os.listdir(self.source_dir)
+            if os.path.splitext(entry)[1] in SOURCE_EXTENSIONS
+        })
+
+    def build_all(self) -> Dict[str, int]:
+        """
+        Build the variants of every source image that does not have them yet, in this thread
+
+        Returns:
+            The number of source images found and of those that could not be read
+        """
+        names = self.source_names()
+        for name in names:
+            self.build(name)
+        failed = sum(1 for name in names if self._known.get(name) is None)
+        return {'sources': len(names), 'failed': failed}
+
+# The shared variant store used by the services and the /covers route
+cover_variants = CoverVariants(settings.cover_source_dir, settings.cover_variant_dir)
+
+def cover_urls(name: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Variant URLs of a cover by size and format, or None if it has no image
+    """
+    return cover_variants.urls(name)
@@ -1,10 +1,16 @@
-from typing import Optional, Dict, Any, List
+import base64
+import binascii
+import json
+from typing import Optional, Dict, Any, List, Tuple
 from sqlmodel import Session, select
+from sqlalchemy import insert, and_, or_, func
+from sqlalchemy.exc import IntegrityError
 from app.models.order import Order, OrderItem
 from app.models.book import Book
-from app.models.discount import Discount
 from app.database import get_session
-from datetime import date, datetime
+from app.services.pricing import resolve_prices
+from app.events import mark_tables_changed
+from datetime import datetime
 from fastapi import HTTPException
 from pydantic import BaseModel
 
@@ -12,20 +18,78 @@ class OrderItemRequest(BaseModel):
     book_id: int
     quantity: int
 
-def create_order(user_id: int, items: List[OrderItemRequest], session: Optional[Session] = None) -> Dict[str, Any]:
+def _find_order_by_idempotency_key(session: Session, user_id: int, idempotency_key: str) -> Optional[Dict[str, Any]]:
+    # Rebuild the create_order response of an order placed earlier with the same key
+    order = session.exec(
+        select(Order)
+        .where(Order.user_id == user_id)
+        .where(Order.idempotency_key == idempotency_key)
+    ).first()
+    if not order:
+        return None
+
+    order_items_result = session.exec(
+        select(OrderItem, Book.book_title)
+        .join(Book, OrderItem.book_id == Book.id)
+        .where(OrderItem.order_id == order.id)
+        .order_by(OrderItem.id)
+    ).all()
+
+    return {
+        "success": True,
+        "order": {
+            "id": order.id,
+            "user_id": order.user_id,
+            "order_date": order.order_date,
+            "order_amount": order.order_amount,
+            "items": [
+                {
+                    "book_id": order_item.book_id,
+                    "title": title,
+                    "quantity": order_item.quantity,
+                    "price": order_item.price,
+                    "item_total": order_item.price * order_item.quantity
+                }
+                for order_item, title in order_items_result
+            ]
+        }
+    }
+
+def _replay_order(existing: Dict[str, Any], items: List[OrderItemRequest]) -> Dict[str, Any]:
+    # A retried request must carry the same cart as the order it replays
+    requested = sorted((item.book_id, item.quantity) for item in items)
+    placed = sorted((item["book_id"], item["quantity"]) for item in existing["order"]["items"])
+    if requested != placed:
+        raise HTTPException(status_code=409, detail="Idempotency key was already used for a different order")
+    return existing
+
+def create_order(
+    user_id: int,
+    items: List[OrderItemRequest],
+    idempotency_key: Optional[str] = None,
+    session: Optional[Session] = None
+) -> Dict[str, Any]:
     """
     Create a new order from the provided items list.
 
+    The order is written with a fixed number of statements whatever the cart
+    size: one price lookup for all books, one order insert returning its ID
+    and one multi-row insert for the items.
+
     Args:
         user_id: The ID of the user
         items: List of items with book_id and quantity
+        idempotency_key: Optional client-chosen key. Retrying a request with the
+            same key returns the order created by the first attempt instead of
+            placing a new one.
         session: Optional database session
 
     Returns:
         A dictionary containing the created order information
 
     Raises:
-        HTTPException: If the items list is empty, book not found, or quantity is invalid
+        HTTPException: If the items list is empty, book not found, quantity is invalid,
+            or the idempotency key was used for a different cart
     """
     if session is None:
         session = get_session()
@@ -33,92 +97,87 @@ def create_order(user_id: int, items: List[OrderItemRequest], session: Optional[
     if not items:
         raise HTTPException(status_code=400, detail="No items provided")
 
-    # Get current date to check for active discounts
-    today = date.today()
-
-    # Get book details for all items
-    book_details = {}
-
+    # Validate quantities
     for item in items:
-        # Check if book exists
-        book_query = select(Book).where(Book.id == item.book_id)
-        book = session.exec(book_query).first()
-
-        if not book:
-            raise HTTPException(status_code=404, detail=f"Book with ID {item.book_id} not found")
-
-        # Validate quantity
         if item.quantity <= 0:
             raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
 
         if item.quantity > 8:
             raise HTTPException(status_code=400, detail="Maximum quantity allowed is 8")
 
-        # Store book details for later use
-        book_details[item.book_id] = book
+    # Return the original order if this is a retry
+    if idempotency_key:
+        existing = _find_order_by_idempotency_key(session, user_id, idempotency_key)
+        if existing:
+            return _replay_order(existing, items)
 
-    # Calculate order total and prepare order items
-    order_items_data = []
-    order_total = 0
+    # Resolve the current price of every book with the same pricing
+    # component the listings use, so the charged price matches the shown one
+    prices = resolve_prices([item.book_id for item in items], session=session)
 
+    # Check that every book exists
     for item in items:
-        book = book_details[item.book_id]
-
-        # Check for active discount
-        discount_query = (
-            select(Discount)
-            .where(Discount.book_id == book.id)
-            .where(Discount.discount_start_date <= today)
-            .where(Discount.discount_end_date >= today)
-        )
+        if item.book_id not in prices:
+            raise HTTPException(status_code=404, detail=f"Book with ID {item.book_id} not found")
 
-        discount = session.exec(discount_query).first()
+    # Read titles now, the commit expires the loaded books
+    titles = {book_id: price['book'].book_title for book_id, price in prices.items()}
 
-        # Calculate item price
-        item_price = discount.discount_price if discount else book.book_price
-        item_total = item_price * item.quantity
+    # Calculate order total and prepare order items
+    order_items_data = []
+    order_total = 0
 
-        # Add to order total
-        order_total += item_total
+    for item in items:
+        item_price = prices[item.book_id]['final_price']
+        order_total += item_price * item.quantity
 
-        # Prepare order item data
         order_items_data.append({
             "book_id": item.book_id,
             "quantity": item.quantity,
             "price": item_price
         })
 
-    # Create order
-    new_order = Order(
-        user_id=user_id,
-        order_date=datetime.now(),
-        order_amount=order_total
+    order_date = datetime.now()
+
+    # Create order and get its ID in the same statement
+    try:
+        order_id = session.execute(
+            insert(Order)
+            .values(
+                user_id=user_id,
+                order_date=order_date,
+                order_amount=order_total,
+                idempotency_key=idempotency_key
+            )
+            .returning(Order.id)
+        ).scalar_one()
+    except IntegrityError:
+        # A concurrent retry with the same key won the race
+        session.rollback()
+        if idempotency_key:
+            existing = _find_order_by_idempotency_key(session, user_id, idempotency_key)
+            if existing:
+                return _replay_order(existing, items)
+        raise
+
+    # Create all order items in one multi-row insert
+    session.execute(
+        insert(OrderItem).values([
+            {"order_id": order_id, **item_data}
+            for item_data in order_items_data
+        ])
     )
 
-    session.add(new_order)
-    session.flush()  # Get the order ID
-
-    # Create order items
-    for item_data in order_items_data:
-        order_item = OrderItem(
-            order_id=new_order.id,
-            book_id=item_data["book_id"],
-            quantity=item_data["quantity"],
-            price=item_data["price"]
-        )
-        session.add(order_item)
-
+    mark_tables_changed(session, {"order", "order_item"})
     session.commit()
 
     # Format the response
     order_items = []
 
     for item_data in order_items_data:
-        book = book_details[item_data["book_id"]]
-
         order_items.append({
             "book_id": item_data["book_id"],
-            "title": book.book_title,
+            "title": titles[item_data["book_id"]],
             "quantity": item_data["quantity"],
             "price": item_data["price"],
             "item_total": item_data["price"] * item_data["quantity"]
@@ -127,69 +186,136 @@ def create_order(user_id: int, items: List[OrderItemRequest], session: Optional[
     result = {
         "success": True,
         "order": {
-            "id": new_order.id,
-            "user_id": new_order.user_id,
-            "order_date": new_order.order_date,
-            "order_amount": new_order.order_amount,
+            "id": order_id,
+            "user_id": user_id,
+            "order_date": order_date,
+            "order_amount": order_total,
             "items": order_items
         }
     }
 
     return result
 
-def get_user_orders(user_id: int, session: Optional[Session] = None) -> Dict[str, Any]:
+def encode_order_cursor(order_date: Optional[datetime], order_id: int) -> str:
+    """
+    Encode the (order_date, id) of the last order of a page into an opaque cursor
+    """
+    raw = json.dumps(
+        [order_date.isoformat() if order_date is not None else None, order_id],
+        separators=(',', ':')
+    ).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_order_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    Decode a cursor produced by encode_order_cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        order_date, order_id = json.loads(raw)
+        return (datetime.fromisoformat(order_date) if order_date is not None else None), int(order_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_user_orders(
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    include_items: bool = True,
+    session: Optional[Session] = None
+) -> Dict[str, Any]:
     """
-    Get all orders for a specific user.
+    Get a page of orders for a specific user, newest first.
+
+    Orders are paged by (order_date, id) so a page costs the same however long
+    the history is; orders without a date come first, as in the
+    idx_order_user_date index. The items of every order on the page are
+    fetched together in one extra query, which is skipped entirely in summary
+    mode. total is the number of all orders of the user, counted from the
+    same index.
 
     Args:
         user_id: The ID of the user
+        limit: Maximum number of orders to return
+        cursor: Cursor from the previous page (next_cursor) to continue after
+        include_items: Whether to include the items of each order
         session: Optional database session
 
     Returns:
-        A dictionary containing the list of orders
+        A dictionary containing the orders of the page, the number of orders
+        of the user and the cursor of the next page (None on the last page)
+
+    Raises:
+        HTTPException: If the cursor is invalid
     """
     if session is None:
         session = get_session()
 
-    # Get all orders for the user
-    orders_query = select(Order).where(Order.user_id == user_id).order_by(Order.order_date.desc())
+    orders_query = select(Order.id, Order.order_date, Order.order_amount).where(Order.user_id == user_id)
+
+    if cursor:
+        last_order_date, last_order_id = decode_order_cursor(cursor)
+        if last_order_date is None:
+            # Still among the undated orders, which sort before all others
+            orders_query = orders_query.where(or_(
+                Order.order_date.is_not(None),
+                and_(Order.order_date.is_(None), Order.id < last_order_id)
+            ))
+        else:
+            orders_query = orders_query.where(or_(
+                Order.order_date < last_order_date,
+                and_(Order.order_date == last_order_date, Order.id < last_order_id)
+            ))
+
+    # Fetch one extra row to know whether there is a next page
+    orders_query = orders_query.order_by(Order.order_date.desc().nulls_first(), Order.id.desc()).limit(limit + 1)
     orders = session.exec(orders_query).all()
 
-    result = []
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_order_cursor(orders[-1].order_date, orders[-1].id)
+
+    result = [
+        {
+            "id": order.id,
+            "order_date": order.order_date,
+            "order_amount": order.order_amount
+        }
+        for order in orders
+    ]
 
-    for order in orders:
-        # Get order items
+    if include_items and result:
+        # Get the items of every order on the page at once
         order_items_query = (
-            select(OrderItem, Book)
+            select(OrderItem.order_id, OrderItem.book_id, OrderItem.quantity, OrderItem.price, Book.book_title)
             .join(Book, OrderItem.book_id == Book.id)
-            .where(OrderItem.order_id == order.id)
+            .where(OrderItem.order_id.in_([order["id"] for order in result]))
+            .order_by(OrderItem.order_id, OrderItem.id)
         )
 
-        order_items_result = session.exec(order_items_query).all()
+        items_by_order: Dict[int, List[Dict[str, Any]]] = {order["id"]: [] for order in result}
 
-        # Format order items
-        items = []
-
-        for order_item, book in order_items_result:
-            items.append({
-                "book_id": order_item.book_id,
-                "title": book.book_title,
-                "quantity": order_item.quantity,
-                "price": order_item.price,
-                "item_total": order_item.price * order_item.quantity
+        for order_id, book_id, quantity, price, title in session.exec(order_items_query).all():
+            items_by_order[order_id].append({
+                "book_id": book_id,
+                "title": title,
+                "quantity": quantity,
+                "price": price,
+                "item_total": price * quantity
             })
 
-        # Format order
-        result.append({
-            "id": order.id,
-            "order_date": order.order_date,
-            "order_amount": order.order_amount,
-            "items": items
-        })
+        for order in result:
+            order["items"] = items_by_order[order["id"]]
+
+    total = session.exec(
+        select(func.count()).select_from(Order).where(Order.user_id == user_id)
+    ).one()
 
     return {
         "items": result,
-        "total": len(result)
+        "total": total,
+        "next_cursor": next_cursor
     }
 
 def get_order_detail(order_id: int, user_id: int, session: Optional[Session] = None) -> Dict[str, Any]:
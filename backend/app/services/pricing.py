@@ -0,0 +1,150 @@
+from datetime import date
+from typing import Optional, Dict, Any, Iterable
+from sqlmodel import Session, select
+from sqlalchemy import func, and_, or_, literal, literal_column, Date, Boolean
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from app.models.book import Book
+from app.models.discount import Discount
+from app.database import get_session
+from app.config import settings
+
+def get_pricing_date() -> date:
+    """
+    Get the date prices are resolved at.
+
+    PRICING_DATE pins it to a fixed day (the sample data set only has
+    discounts around 2022-10-08); an empty value or "today" uses the
+    current date.
+    """
+    if settings.pricing_date and settings.pricing_date.lower() != "today":
+        return date.fromisoformat(settings.pricing_date)
+    return date.today()
+
+class DiscountActiveOn(ColumnElement):
+    """
+    SQL predicate "this discount is active on as_of".
+
+    On PostgreSQL it renders as a daterange containment test so the GiST
+    index idx_discount_active_range on
+    daterange(discount_start_date, discount_end_date, '[]') can serve it.
+    Other databases get the equivalent pair of comparisons. A NULL end date
+    means the discount has no end.
+    """
+    inherit_cache = True
+    type = Boolean()
+    _traverse_internals = [("as_of", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, as_of: date):
+        self.as_of = literal(as_of, Date)
+
+@compiles(DiscountActiveOn)
+def _compile_discount_active_on(element, compiler, **kw):
+    condition = and_(
+        Discount.discount_start_date <= element.as_of,
+        or_(Discount.discount_end_date.is_(None), Discount.discount_end_date >= element.as_of)
+    )
+    return compiler.process(condition, **kw)
+
+@compiles(DiscountActiveOn, "postgresql")
+def _compile_discount_active_on_postgresql(element, compiler, **kw):
+    # The bounds are rendered inline so the expression matches the index definition
+    date_range = func.daterange(Discount.discount_start_date, Discount.discount_end_date, literal_column("'[]'"))
+    return compiler.process(date_range.op("@>")(element.as_of), **kw)
+
+def effective_discount_subquery(as_of: Optional[date] = None, book_ids: Optional[Iterable[int]] = None):
+    """
+    Subquery with the single effective discount of every book on sale at as_of.
+
+    When several discounts of a book overlap, the lowest discount price wins
+    (ties go to the newest discount), so joining it never duplicates books.
+
+    Columns: book_id, discount_id, discount_price, discount_start_date, discount_end_date
+
+    Args:
+        as_of: Date to resolve prices at (defaults to get_pricing_date())
+        book_ids: Optional list of book IDs to restrict the lookup to
+    """
+    if as_of is None:
+        as_of = get_pricing_date()
+
+    ranked = (
+        select(
+            Discount.book_id.label("book_id"),
+            Discount.id.label("discount_id"),
+            Discount.discount_price.label("discount_price"),
+            Discount.discount_start_date.label("discount_start_date"),
+            Discount.discount_end_date.label("discount_end_date"),
+            func.row_number().over(
+                partition_by=Discount.book_id,
+                order_by=(Discount.discount_price.asc(), Discount.id.desc())
+            ).label("discount_rank")
+        )
+        .where(DiscountActiveOn(as_of))
+    )
+    if book_ids is not None:
+        ranked = ranked.where(Discount.book_id.in_(list(book_ids)))
+    ranked = ranked.subquery()
+
+    return (
+        select(
+            ranked.c.book_id,
+            ranked.c.discount_id,
+            ranked.c.discount_price,
+            ranked.c.discount_start_date,
+            ranked.c.discount_end_date
+        )
+        .where(ranked.c.discount_rank == 1)
+        .subquery("effective_discount")
+    )
+
+def resolve_prices(
+    book_ids: Iterable[int],
+    as_of: Optional[date] = None,
+    session: Optional[Session] = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Resolve the effective price of a set of books in a single query.
+
+    Args:
+        book_ids: The IDs of the books to price
+        as_of: Date to resolve prices at (defaults to get_pricing_date())
+        session: Optional database session
+
+    Returns:
+        A dictionary keyed by book ID with the book, its active discount (if any)
+        and the final price. Books that do not exist are missing from the result.
+    """
+    if session is None:
+        session = get_session()
+
+    book_ids = list(set(book_ids))
+    if not book_ids:
+        return {}
+
+    discount_subquery = effective_discount_subquery(as_of, book_ids=book_ids)
+
+    query = (
+        select(
+            Book,
+            discount_subquery.c.discount_price,
+            discount_subquery.c.discount_start_date,
+            discount_subquery.c.discount_end_date
+        )
+        .outerjoin(discount_subquery, Book.id == discount_subquery.c.book_id)
+        .where(Book.id.in_(book_ids))
+    )
+
+    prices = {}
+    for book, discount_price, discount_start_date, discount_end_date in session.exec(query).all():
+        prices[book.id] = {
+            'book': book,
+            'original_price': book.book_price,
+            'discount_price': discount_price,
+            'discount_start_date': discount_start_date,
+            'discount_end_date': discount_end_date,
+            'final_price': discount_price if discount_price is not None else book.book_price
+        }
+
+    return prices
@@ -0,0 +1,8 @@
+"""
+Benchmark tools for the Bookworm API.
+
+- benchmark.generate: seeded synthetic catalog loaded into PostgreSQL with COPY
+- benchmark.run: timed scenarios over the service functions and HTTP routes,
+  written as JSON (p50/p95/p99 latency and queries per request)
+- benchmark.compare: side-by-side diff of two result files
+"""
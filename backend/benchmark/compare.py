@@ -0,0 +1,42 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+Usage:
+    python -m benchmark.compare results/before.json results/after.json
+"""
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+def _load(path: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    with open(path) as f:
+        results = json.load(f)
+    return {(scenario['name'], scenario['cache']): scenario for scenario in results['scenarios']}
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "     n/a"
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        raise SystemExit("Usage: python -m benchmark.compare BEFORE.json AFTER.json")
+
+    before, after = _load(argv[0]), _load(argv[1])
+
+    print(f"{'scenario':<34} {'cache':<5} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'queries':>13}")
+    for key in sorted(set(before) | set(after)):
+        if key not in before or key not in after:
+            print(f"{key[0]:<34} {key[1]:<5} only in {'after' if key in after else 'before'}")
+            continue
+        old, new = before[key], after[key]
+        columns = []
+        for field in ('p50', 'p95', 'p99'):
+            old_value, new_value = old['latency_ms'][field], new['latency_ms'][field]
+            columns.append(f"{new_value:8.2f} {_change(old_value, new_value)}")
+        old_queries, new_queries = old['queries_per_request']['mean'], new['queries_per_request']['mean']
+        print(f"{key[0]:<34} {key[1]:<5} {' '.join(columns)} {old_queries:5.1f} -> {new_queries:5.1f}")
+
+if __name__ == "__main__":
+    main()
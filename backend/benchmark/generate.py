@@ -0,0 +1,270 @@
+"""
+Generate a synthetic catalog and bulk-load it into PostgreSQL.
+
+The data is fully determined by --seed and the scale arguments, so two runs
+with the same arguments load the same rows. Rows are streamed with COPY and
+never held in memory as a whole, so 10^6 books / 10^7 reviews fit in a laptop.
+
+The target database must already have the schema (SQL dump or db_script.sql
+followed by `alembic upgrade head`). Without --truncate new rows are appended
+after the existing IDs.
+
+Usage:
+    python -m benchmark.generate --books 1000000 --reviews-per-book 10 --truncate
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Tuple
+
+import asyncpg
+import bcrypt
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.database import async_engine, asyncpg_dsn
+from app.services.book_stats import rebuild_book_stats
+
+# Password of every generated user, for the login scenarios
+BENCHMARK_PASSWORD = "benchmark"
+
+WORDS = (
+    "time night river garden silent city shadow light winter summer empire stone "
+    "ocean fire secret journey house moon star forest memory war peace heart road "
+    "dream island mountain storm glass iron golden last first lost hidden broken "
+    "wild dark bright long short little great history music space science love "
+    "world king queen child mother father friend stranger letter voice song book"
+).split()
+
+FIRST_NAMES = "Anna Ben Carla David Emma Felix Grace Hugo Iris Jack Kate Leo Mia Noah Olga Paul Rosa Sam Tina Victor".split()
+LAST_NAMES = "Adams Brown Clarke Dumas Evans Fischer Garcia Hughes Ito Jones Kim Lopez Martin Nguyen Olsen Perez Quinn Rossi Smith Turner".split()
+
+TRUNCATE_TABLES = 'order_item, "order", refresh_token, review, discount, book_stats, book, author, category, "user"'
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def _price(rng: random.Random) -> Decimal:
+    return Decimal(rng.randint(499, 9999)) / 100
+
+class CatalogGenerator:
+    """
+    Produce the rows of every table from one seeded random generator per table,
+    so changing the scale of one table does not change the rows of the others.
+    """
+    def __init__(self, args: argparse.Namespace, first_ids: Dict[str, int]):
+        self.args = args
+        self.first_ids = first_ids
+        self.pricing_date = date.fromisoformat(args.pricing_date)
+        self.book_prices: List[Decimal] = []
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.args.seed}:{table}")
+
+    def categories(self) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("category")
+        for i in range(self.args.categories):
+            yield (self.first_ids["category"] + i, f"{_words(rng, 2).title()} {i}", _words(rng, 8))
+
+    def authors(self) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("author")
+        for i in range(self.args.authors):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+            yield (self.first_ids["author"] + i, name, _words(rng, 20))
+
+    def books(self) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("book")
+        for i in range(self.args.books):
+            price = _price(rng)
+            self.book_prices.append(price)
+            yield (
+                self.first_ids["book"] + i,
+                self.first_ids["category"] + rng.randrange(self.args.categories),
+                self.first_ids["author"] + rng.randrange(self.args.authors),
+                _words(rng, rng.randint(2, 6)).capitalize(),
+                _words(rng, rng.randint(20, 60)),
+                price,
+                f"book{rng.randint(1, 10)}"
+            )
+
+    def reviews(self) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("review")
+        review_id = self.first_ids["review"]
+        start = datetime(2020, 1, 1)
+        for i in range(self.args.books):
+            # Skewed counts so that popularity sorting has a long tail
+            count = int(rng.expovariate(1 / self.args.reviews_per_book)) if self.args.reviews_per_book else 0
+            for _ in range(count):
+                yield (
+                    review_id,
+                    self.first_ids["book"] + i,
+                    _words(rng, 4).capitalize(),
+                    _words(rng, 30),
+                    start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+                    min(5, max(1, int(rng.gauss(3.8, 1.1) + 0.5)))
+                )
+                review_id += 1
+
+    def discounts(self) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("discount")
+        discount_id = self.first_ids["discount"]
+        for i, price in enumerate(self.book_prices):
+            if rng.random() >= self.args.discount_ratio:
+                continue
+            # Most discounts are active around the pricing date, some are past or open-ended
+            start = self.pricing_date - timedelta(days=rng.randint(-30, 60))
+            end = None if rng.random() < 0.2 else start + timedelta(days=rng.randint(7, 90))
+            discount_price = (price * Decimal(rng.randint(50, 95)) / 100).quantize(Decimal("0.01"))
+            yield (discount_id, self.first_ids["book"] + i, start, end, discount_price)
+            discount_id += 1
+
+    def users(self, password_hash: str) -> Iterator[Tuple[Any, ...]]:
+        rng = self._rng("user")
+        for i in range(self.args.users):
+            user_id = self.first_ids["user"] + i
+            yield (
+                user_id,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                f"bench{user_id}@example.com",
+                password_hash,
+                False
+            )
+
+    def orders(self) -> Tuple[Iterator[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+        """
+        Yield order rows; their items are collected into the returned list as
+        the orders are produced
+        """
+        rng = self._rng("order")
+        items: List[Tuple[Any, ...]] = []
+
+        def order_rows() -> Iterator[Tuple[Any, ...]]:
+            item_id = self.first_ids["order_item"]
+            start = datetime(2021, 1, 1)
+            for i in range(self.args.orders):
+                order_id = self.first_ids["order"] + i
+                amount = Decimal(0)
+                for _ in range(rng.randint(1, 4)):
+                    book_index = rng.randrange(len(self.book_prices))
+                    quantity = rng.randint(1, 3)
+                    price = self.book_prices[book_index]
+                    items.append((item_id, order_id, self.first_ids["book"] + book_index, quantity, price))
+                    amount += price * quantity
+                    item_id += 1
+                yield (
+                    order_id,
+                    self.first_ids["user"] + rng.randrange(self.args.users),
+                    start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+                    amount
+                )
+
+        return order_rows(), items
+
+async def _copy(connection, table: str, columns: List[str], records) -> Tuple[int, float]:
+    started = time.perf_counter()
+    result = await connection.copy_records_to_table(table, records=records, columns=columns)
+    elapsed = time.perf_counter() - started
+    rows = int(result.split()[-1])
+    print(f"  {table:<12} {rows:>10} rows {elapsed:8.1f}s {rows / elapsed if elapsed else 0:>10.0f} rows/s")
+    return rows, elapsed
+
+async def generate(args: argparse.Namespace) -> Dict[str, int]:
+    """
+    Load the synthetic catalog and return the number of rows written per table
+    """
+    connection = await asyncpg.connect(asyncpg_dsn())
+    try:
+        if args.truncate:
+            await connection.execute(f"TRUNCATE {TRUNCATE_TABLES} RESTART IDENTITY CASCADE")
+
+        first_ids = {}
+        for table in ("category", "author", "book", "review", "discount", "user", "order", "order_item"):
+            first_ids[table] = await connection.fetchval(f'SELECT coalesce(max(id), 0) + 1 FROM "{table}"')
+
+        generator = CatalogGenerator(args, first_ids)
+        password_hash = bcrypt.hashpw(BENCHMARK_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        order_rows, order_items = generator.orders()
+
+        database = await connection.fetchval("SELECT current_database()")
+        print(f"Loading seed={args.seed} into {database}")
+        counts = {}
+        async with connection.transaction():
+            counts["category"], _ = await _copy(connection, "category", ["id", "category_name", "category_desc"], generator.categories())
+            counts["author"], _ = await _copy(connection, "author", ["id", "author_name", "author_bio"], generator.authors())
+            counts["book"], _ = await _copy(
+                connection, "book",
+                ["id", "category_id", "author_id", "book_title", "book_summary", "book_price", "book_cover_photo"],
+                generator.books()
+            )
+            counts["review"], _ = await _copy(
+                connection, "review",
+                ["id", "book_id", "review_title", "review_details", "review_date", "rating_star"],
+                generator.reviews()
+            )
+            counts["discount"], _ = await _copy(
+                connection, "discount",
+                ["id", "book_id", "discount_start_date", "discount_end_date", "discount_price"],
+                generator.discounts()
+            )
+            counts["user"], _ = await _copy(
+                connection, "user",
+                ["id", "first_name", "last_name", "email", "password", "admin"],
+                generator.users(password_hash)
+            )
+            counts["order"], _ = await _copy(connection, "order", ["id", "user_id", "order_date", "order_amount"], order_rows)
+            counts["order_item"], _ = await _copy(
+                connection, "order_item", ["id", "order_id", "book_id", "quantity", "price"], iter(order_items)
+            )
+
+            # Explicit IDs bypass the sequences; move them past the loaded rows
+            for table in first_ids:
+                await connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM \"{table}\"))"
+                )
+    finally:
+        await connection.close()
+
+    started = time.perf_counter()
+    async with AsyncSession(async_engine) as session:
+        await session.run_sync(lambda sync_session: rebuild_book_stats(session=sync_session))
+    print(f"  book_stats rebuilt in {time.perf_counter() - started:.1f}s")
+
+    connection = await asyncpg.connect(asyncpg_dsn())
+    try:
+        await connection.execute("ANALYZE")
+    finally:
+        await connection.close()
+
+    return counts
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-load a seeded synthetic catalog into PostgreSQL")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--authors", type=int, default=None, help="Default: books / 10")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--reviews-per-book", type=float, default=10, help="Mean reviews per book")
+    parser.add_argument("--discount-ratio", type=float, default=0.2, help="Share of books with a discount")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--pricing-date", default=settings.pricing_date if settings.pricing_date not in ("", "today") else date.today().isoformat())
+    parser.add_argument("--truncate", action="store_true", help="Empty every catalog, user and order table first")
+    args = parser.parse_args(argv)
+    if args.authors is None:
+        args.authors = max(1, args.books // 10)
+    return args
+
+def main(argv: List[str] = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    started = time.perf_counter()
+    counts = asyncio.run(generate(args))
+    print(f"Loaded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
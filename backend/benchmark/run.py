@@ -0,0 +1,189 @@
+"""
+Run the benchmark scenarios and write the results as JSON.
+
+Every scenario is timed over --iterations requests after --warmup untimed
+ones. Cold runs clear the in-process result caches before each request,
+warm runs keep them, so both the query cost and the cached path are
+measured. SQL statements are counted per request on the app's own engine,
+and strict loading mode is on so a lazy relationship load (a hidden N+1)
+fails the scenario instead of only slowing it down.
+
+Usage:
+    python -m benchmark.run --iterations 200 --output results/after.json
+    python -m benchmark.run --only route. --cache cold
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event
+
+from app.cache import clear_caches
+from app.database import async_engine
+from app.loading import strict_loading
+from app.main import app
+from benchmark.generate import BENCHMARK_PASSWORD
+from benchmark.scenarios import Scenario, load_context, service_scenarios, route_scenarios
+
+class StatementCounter:
+    """
+    Count the SQL statements sent by the app's async engine
+    """
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], statements: List[int], errors: int) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        'iterations': len(latencies),
+        'errors': errors,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'min': round(latencies[0], 3) if latencies else 0.0,
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'queries_per_request': {
+            'mean': round(sum(statements) / len(statements), 2) if statements else 0.0,
+            'max': max(statements) if statements else 0,
+        }
+    }
+
+async def run_scenario(
+    scenario: Scenario,
+    counter: StatementCounter,
+    cache: str,
+    iterations: int,
+    warmup: int,
+    seed: int
+) -> Dict[str, Any]:
+    """
+    Time one scenario and summarize its latencies and statement counts
+    """
+    rng = random.Random(f"{seed}:{scenario.name}")
+    latencies: List[float] = []
+    statements: List[int] = []
+    errors = 0
+
+    for iteration in range(warmup + iterations):
+        if cache == "cold":
+            clear_caches()
+        count_before = counter.count
+        started = time.perf_counter()
+        try:
+            await scenario.call(rng)
+        except Exception as error:
+            errors += 1
+            if errors == 1:
+                print(f"    {scenario.name}: {type(error).__name__}: {error}", file=sys.stderr)
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        if iteration >= warmup:
+            latencies.append(elapsed)
+            statements.append(counter.count - count_before)
+
+    return {'name': scenario.name, 'cache': cache, **summarize(latencies, statements, errors)}
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    context = await load_context()
+    if not context.book_ids:
+        raise SystemExit("No books found: load data first with python -m benchmark.generate")
+
+    counter = StatementCounter()
+    caches = ["cold", "warm"] if args.cache == "both" else [args.cache]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        scenarios = service_scenarios(context) + route_scenarios(context, client, args.password)
+        scenarios = [
+            scenario for scenario in scenarios
+            if (not args.only or any(scenario.name.startswith(prefix) for prefix in args.only))
+            and (args.writes or not scenario.writes)
+        ]
+
+        results = []
+        for scenario in scenarios:
+            # Write scenarios never hit a cache, one pass is enough
+            for cache in (["cold"] if scenario.writes else caches):
+                result = await run_scenario(scenario, counter, cache, args.iterations, args.warmup, args.seed)
+                latency = result['latency_ms']
+                print(
+                    f"  {scenario.name:<34} {cache:<4} p50 {latency['p50']:8.2f}  p95 {latency['p95']:8.2f}  "
+                    f"p99 {latency['p99']:8.2f} ms  {result['queries_per_request']['mean']:6.1f} q/req"
+                )
+                results.append(result)
+
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'database': async_engine.url.render_as_string(hide_password=True),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'sample': {
+                'books': len(context.book_ids),
+                'categories': len(context.category_ids),
+                'authors': len(context.author_ids),
+                'user_orders': len(context.order_ids),
+            },
+        },
+        'scenarios': results
+    }
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time every service function and route against the configured database")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", choices=["cold", "warm", "both"], default="both")
+    parser.add_argument("--only", action="append", default=[], help="Only scenarios whose name starts with this (repeatable)")
+    parser.add_argument("--writes", action="store_true", help="Include scenarios that place orders")
+    parser.add_argument("--allow-lazy-loads", action="store_true", help="Do not fail scenarios that lazy-load relationships")
+    parser.add_argument("--password", default=BENCHMARK_PASSWORD, help="Password of the generated users, for the login scenario")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmark/results/<timestamp>.json)")
+    return parser.parse_args(argv)
+
+def main(argv: List[str] = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    with strict_loading(not args.allow_lazy_loads):
+        results = asyncio.run(run(args))
+
+    output = args.output or f"benchmark/results/{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Benchmark scenarios: one per service function and one per HTTP route.
+
+Each scenario is an async callable taking a Random and running one request.
+Parameters (book IDs, filters, search words, the user) are sampled from the
+loaded data in load_context(), so the same scenarios work at any scale.
+"""
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func
+
+from app.auth.auth_handler import create_access_token
+from app.database import async_engine
+from app.models.author import Author
+from app.models.book import Book
+from app.models.category import Category
+from app.models.order import Order
+from app.models.user import User
+from app.services import aio
+from app.services.books import CURSOR_FIELDS
+from app.services.books_home import get_home_books
+from app.services.order import OrderItemRequest
+from app.services.pricing import resolve_prices
+
+SORTS = [sort for sort in CURSOR_FIELDS if sort != 'relevance']
+
+class Scenario:
+    """
+    A named request to time. writes=True marks scenarios that insert rows.
+    """
+    def __init__(self, name: str, call: Callable[[random.Random], Awaitable[Any]], writes: bool = False):
+        self.name = name
+        self.call = call
+        self.writes = writes
+
+class BenchmarkContext:
+    """
+    IDs and words sampled from the database the scenarios run against
+    """
+    def __init__(self):
+        self.book_ids: List[int] = []
+        self.category_ids: List[int] = []
+        self.author_ids: List[int] = []
+        self.words: List[str] = []
+        self.user_id: Optional[int] = None
+        self.user_email: Optional[str] = None
+        self.order_ids: List[int] = []
+        self.token: Optional[str] = None
+
+async def load_context(sample_size: int = 500) -> BenchmarkContext:
+    """
+    Sample the parameters of the scenarios, using the user with the most orders
+    """
+    context = BenchmarkContext()
+    async with AsyncSession(async_engine) as session:
+        context.book_ids = list((await session.exec(select(Book.id).order_by(func.random()).limit(sample_size))).all())
+        context.category_ids = list((await session.exec(select(Category.id))).all())
+        context.author_ids = list((await session.exec(select(Author.id).order_by(func.random()).limit(sample_size))).all())
+        titles = (await session.exec(select(Book.book_title).order_by(func.random()).limit(sample_size))).all()
+        context.words = sorted({word for title in titles for word in title.lower().split() if len(word) > 2}) or ["book"]
+
+        user_row = (await session.exec(
+            select(Order.user_id, func.count(Order.id))
+            .group_by(Order.user_id)
+            .order_by(func.count(Order.id).desc())
+            .limit(1)
+        )).first()
+        user = await session.get(User, user_row[0]) if user_row else (await session.exec(select(User).limit(1))).first()
+        if user is not None:
+            context.user_id = user.id
+            context.user_email = user.email
+            context.order_ids = list((await session.exec(
+                select(Order.id).where(Order.user_id == user.id).limit(sample_size)
+            )).all())
+            context.token = create_access_token({"sub": str(user.id)})
+
+    return context
+
+def _books_params(context: BenchmarkContext, rng: random.Random) -> Dict[str, Any]:
+    # A mix of the shop page requests: plain, filtered, sorted and deeper pages
+    params: Dict[str, Any] = {"size": rng.choice([15, 20]), "page": rng.choice([1, 1, 1, 2, 5, 20])}
+    roll = rng.random()
+    if roll < 0.3 and context.category_ids:
+        params["category_id"] = rng.choice(context.category_ids)
+    elif roll < 0.5 and context.author_ids:
+        params["author_id"] = rng.choice(context.author_ids)
+    elif roll < 0.6:
+        params["min_rating"] = rng.choice([3, 4])
+    sort_by = rng.choice(SORTS)
+    if sort_by:
+        params["sort_by"] = sort_by
+    return params
+
+def _cart(context: BenchmarkContext, rng: random.Random) -> List[Dict[str, int]]:
+    books = rng.sample(context.book_ids, min(len(context.book_ids), rng.randint(1, 5)))
+    return [{"book_id": book_id, "quantity": rng.randint(1, 3)} for book_id in books]
+
+def service_scenarios(context: BenchmarkContext) -> List[Scenario]:
+    """
+    Scenarios calling the service functions directly on an AsyncSession
+    """
+    def with_session(call):
+        async def run(rng: random.Random):
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                return await call(session, rng)
+        return run
+
+    scenarios = [
+        Scenario("service.get_books", with_session(
+            lambda session, rng: aio.get_books_async(session=session, **_books_params(context, rng)))),
+        Scenario("service.get_book_facets", with_session(
+            lambda session, rng: aio.get_book_facets_async(
+                session=session,
+                category_id=rng.choice(context.category_ids + [None]) if context.category_ids else None
+            ))),
+        Scenario("service.search_books", with_session(
+            lambda session, rng: aio.search_books_async(q=rng.choice(context.words), session=session))),
+        Scenario("service.get_suggestions", with_session(
+            lambda session, rng: aio.get_suggestions_async(q=rng.choice(context.words)[:3], session=session))),
+        Scenario("service.get_book_detail", with_session(
+            lambda session, rng: aio.get_book_detail_async(book_id=rng.choice(context.book_ids), session=session))),
+        Scenario("service.get_books_on_sale", with_session(
+            lambda session, rng: aio.get_books_on_sale_async(limit=10, session=session))),
+        Scenario("service.get_popular_books", with_session(
+            lambda session, rng: aio.get_popular_books_async(limit=8, session=session))),
+        Scenario("service.get_recommended_books", with_session(
+            lambda session, rng: aio.get_recommended_books_async(limit=8, session=session))),
+        Scenario("service.get_home_books", lambda rng: get_home_books()),
+        Scenario("service.get_authors", with_session(
+            lambda session, rng: aio.get_authors_async(session=session))),
+        Scenario("service.get_categories", with_session(
+            lambda session, rng: aio.get_categories_async(session=session))),
+        Scenario("service.resolve_prices", with_session(
+            lambda session, rng: session.run_sync(
+                lambda sync_session: resolve_prices(rng.sample(context.book_ids, min(5, len(context.book_ids))), session=sync_session)
+            ))),
+    ]
+
+    if context.user_id is not None:
+        scenarios += [
+            Scenario("service.get_user_orders", with_session(
+                lambda session, rng: aio.get_user_orders_async(user_id=context.user_id, session=session))),
+            Scenario("service.get_order_detail", with_session(
+                lambda session, rng: aio.get_order_detail_async(
+                    order_id=rng.choice(context.order_ids), user_id=context.user_id, session=session
+                ))),
+            Scenario("service.create_order", with_session(
+                lambda session, rng: aio.create_order_async(
+                    user_id=context.user_id,
+                    items=[OrderItemRequest(**item) for item in _cart(context, rng)],
+                    session=session
+                )), writes=True),
+        ]
+
+    if not context.order_ids:
+        scenarios = [scenario for scenario in scenarios if scenario.name != "service.get_order_detail"]
+
+    return scenarios
+
+def route_scenarios(context: BenchmarkContext, client: httpx.AsyncClient, password: Optional[str]) -> List[Scenario]:
+    """
+    Scenarios sending HTTP requests through the whole app (routing,
+    validation, dependencies and serialization included)
+    """
+    def get(path_or_factory, params_factory=None, authenticated=False):
+        async def run(rng: random.Random):
+            path = path_or_factory(rng) if callable(path_or_factory) else path_or_factory
+            headers = {"Authorization": f"Bearer {context.token}"} if authenticated else None
+            response = await client.get(path, params=params_factory(rng) if params_factory else None, headers=headers)
+            response.raise_for_status()
+        return run
+
+    scenarios = [
+        Scenario("route.GET /books/", get("/books/", lambda rng: _books_params(context, rng))),
+        Scenario("route.GET /books/facets", get("/books/facets", lambda rng: (
+            {"category_id": rng.choice(context.category_ids)} if context.category_ids and rng.random() < 0.5 else {}
+        ))),
+        Scenario("route.GET /books/search", get("/books/search", lambda rng: {"q": rng.choice(context.words)})),
+        Scenario("route.GET /books/suggest", get("/books/suggest", lambda rng: {"q": rng.choice(context.words)[:3]})),
+        Scenario("route.GET /books/{id}", get(lambda rng: f"/books/{rng.choice(context.book_ids)}")),
+        Scenario("route.GET /books/on-sale", get("/books/on-sale")),
+        Scenario("route.GET /books/popular", get("/books/popular")),
+        Scenario("route.GET /books/recommended", get("/books/recommended")),
+        Scenario("route.GET /books/home", get("/books/home")),
+        Scenario("route.GET /authors/", get("/authors/")),
+        Scenario("route.GET /categories/", get("/categories/")),
+    ]
+
+    if context.token:
+        async def post_order(rng: random.Random):
+            response = await client.post(
+                "/orders/", json=_cart(context, rng), headers={"Authorization": f"Bearer {context.token}"}
+            )
+            response.raise_for_status()
+
+        scenarios += [
+            Scenario("route.GET /orders/", get("/orders/", authenticated=True)),
+            Scenario("route.GET /auth/me", get("/auth/me", authenticated=True)),
+            Scenario("route.POST /orders/", post_order, writes=True),
+        ]
+        if context.order_ids:
+            scenarios.append(Scenario(
+                "route.GET /orders/{id}", get(lambda rng: f"/orders/{rng.choice(context.order_ids)}", authenticated=True)
+            ))
+
+    if password and context.user_email:
+        async def login(rng: random.Random):
+            response = await client.post("/auth/login", data={"username": context.user_email, "password": password})
+            response.raise_for_status()
+
+        scenarios.append(Scenario("route.POST /auth/login", login))
+
+    return scenarios
@@ -0,0 +1,25 @@
+"""Helpers shared by the migration scripts in versions/."""
+from alembic import op
+import sqlalchemy as sa
+
+
+def drop_if_invalid(name: str) -> None:
+    """
+    Drop index name if it is INVALID, so the CREATE INDEX CONCURRENTLY IF NOT
+    EXISTS that follows rebuilds it.
+
+    A concurrent build that failed or was interrupted leaves an invalid index
+    behind, which IF NOT EXISTS would otherwise keep. Nothing is checked when
+    the SQL is only generated (--sql). Run it inside an autocommit_block().
+    """
+    if op.get_context().as_sql:
+        return
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT NOT i.indisvalid FROM pg_class c "
+            "JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ),
+        {"name": name}
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
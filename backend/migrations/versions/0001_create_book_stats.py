@@ -0,0 +1,57 @@
+"""create book_stats
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create book_stats and backfill it from the review table."""
+    op.create_table(
+        "book_stats",
+        sa.Column("book_id", sa.BigInteger(), sa.ForeignKey("book.id"), primary_key=True),
+        sa.Column("reviews_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_sum", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("avg_rating", sa.Float(), nullable=True),
+        sa.Column("star_1_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("star_2_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("star_3_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("star_4_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("star_5_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        INSERT INTO book_stats (book_id, reviews_count, rating_sum, avg_rating,
+                                star_1_count, star_2_count, star_3_count, star_4_count, star_5_count)
+        SELECT book_id,
+               count(id),
+               sum(rating_star),
+               avg(CAST(rating_star AS FLOAT)),
+               count(CASE WHEN rating_star = 1 THEN 1 END),
+               count(CASE WHEN rating_star = 2 THEN 1 END),
+               count(CASE WHEN rating_star = 3 THEN 1 END),
+               count(CASE WHEN rating_star = 4 THEN 1 END),
+               count(CASE WHEN rating_star = 5 THEN 1 END)
+        FROM review
+        WHERE book_id IS NOT NULL
+        GROUP BY book_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop book_stats."""
+    op.drop_table("book_stats")
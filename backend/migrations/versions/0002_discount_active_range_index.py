@@ -0,0 +1,39 @@
+"""index active discount date ranges
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    GiST index serving DiscountActiveOn (daterange containment) in
+    app.services.pricing, built without blocking writes to discount.
+    """
+    with op.get_context().autocommit_block():
+        drop_if_invalid("idx_discount_active_range")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_discount_active_range ON discount "
+            "USING gist (daterange(discount_start_date, discount_end_date, '[]'))"
+        )
+
+
+def downgrade() -> None:
+    """Drop the active discount range index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_discount_active_range")
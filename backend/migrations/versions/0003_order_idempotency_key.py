@@ -0,0 +1,43 @@
+"""add order idempotency key
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add order.idempotency_key, unique per user (NULLs never collide).
+
+    Adding a nullable column without a default only changes the catalog;
+    the unique index is built without blocking order placement.
+    """
+    op.add_column("order", sa.Column("idempotency_key", sa.String(64), nullable=True))
+    with op.get_context().autocommit_block():
+        drop_if_invalid("uq_order_user_idempotency_key")
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_order_user_idempotency_key '
+            'ON "order" (user_id, idempotency_key)'
+        )
+
+
+def downgrade() -> None:
+    """Drop order.idempotency_key."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_order_user_idempotency_key")
+    op.drop_column("order", "idempotency_key")
@@ -0,0 +1,118 @@
+"""full-text search vector on book
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Books whose search_vector is filled per statement (and transaction) of the backfill
+BACKFILL_BATCH_SIZE = 5000
+
+BOOK_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(book.book_title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(
+        (SELECT author_name FROM author WHERE author.id = book.author_id), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(book.book_summary, '')), 'C')
+"""
+
+
+def _backfill() -> None:
+    # One short transaction per id range, so the book table is never locked
+    # as a whole; books written meanwhile are already covered by the trigger
+    if op.get_context().as_sql:
+        op.execute(f"UPDATE book SET search_vector = {BOOK_SEARCH_VECTOR} WHERE search_vector IS NULL")
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM book")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(
+            sa.text(
+                f"UPDATE book SET search_vector = {BOOK_SEARCH_VECTOR} "
+                "WHERE id >= :start AND id < :end AND search_vector IS NULL"
+            ),
+            {"start": start, "end": start + BACKFILL_BATCH_SIZE}
+        )
+
+
+def upgrade() -> None:
+    """
+    Add book.search_vector (title A, author name B, summary C) kept up to date
+    by triggers, so ORM writes and bulk loads alike are indexed, plus the GIN
+    index serving app.services.book_search.
+
+    The column and triggers are added in one short transaction; existing
+    books are then backfilled in keyed batches and the index is built
+    concurrently, so the upgrade never blocks writes to book for long.
+    """
+    op.execute("ALTER TABLE book ADD COLUMN search_vector tsvector")
+
+    op.execute(
+        """
+        CREATE FUNCTION book_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.book_title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(
+                    (SELECT author_name FROM author WHERE id = NEW.author_id), '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(NEW.book_summary, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER book_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE OF book_title, book_summary, author_id ON book "
+        "FOR EACH ROW EXECUTE FUNCTION book_search_vector_update()"
+    )
+
+    # Renaming an author re-indexes their books through the book trigger
+    op.execute(
+        """
+        CREATE FUNCTION author_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE book SET book_title = book_title WHERE author_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER author_search_vector_trigger "
+        "AFTER UPDATE OF author_name ON author "
+        "FOR EACH ROW WHEN (OLD.author_name IS DISTINCT FROM NEW.author_name) "
+        "EXECUTE FUNCTION author_search_vector_update()"
+    )
+
+    with op.get_context().autocommit_block():
+        _backfill()
+        drop_if_invalid("idx_book_search_vector")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_book_search_vector ON book USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    """Drop the search vector, its triggers and index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_book_search_vector")
+    op.execute("DROP TRIGGER IF EXISTS author_search_vector_trigger ON author")
+    op.execute("DROP FUNCTION IF EXISTS author_search_vector_update()")
+    op.execute("DROP TRIGGER IF EXISTS book_search_vector_trigger ON book")
+    op.execute("DROP FUNCTION IF EXISTS book_search_vector_update()")
+    op.drop_column("book", "search_vector")
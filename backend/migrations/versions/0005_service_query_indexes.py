@@ -0,0 +1,75 @@
+"""index set for the service query patterns
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# name -> (table, CREATE INDEX body after "ON"), each matched to the query it serves
+INDEXES = {
+    # effective_discount_subquery with book_ids (resolve_prices, book detail,
+    # order placement): per-book lookup, window ordered by price, no heap visit
+    "idx_discount_book_dates": (
+        "discount",
+        "discount (book_id, discount_start_date, discount_end_date) INCLUDE (discount_price)"
+    ),
+    # rebuild_book_stats and per-book review reads; rating_star makes the
+    # aggregate index-only
+    "idx_review_book_id": ("review", "review (book_id) INCLUDE (rating_star)"),
+    # get_books / facets filters and the grouped counts of /categories and /authors
+    "idx_book_category_id": ("book", "book (category_id)"),
+    "idx_book_author_id": ("book", "book (author_id)"),
+    # get_user_orders: WHERE user_id ORDER BY order_date DESC, id DESC with keyset
+    # paging; order_amount covers the summary mode
+    "idx_order_user_date": ("order", '"order" (user_id, order_date DESC, id DESC) INCLUDE (order_amount)'),
+    # Batched item fetch of the order history and order detail
+    "idx_order_item_order_id": ("order_item", "order_item (order_id)"),
+    # get_popular_books / get_recommended_books only rank reviewed books
+    "idx_book_stats_popular": (
+        "book_stats",
+        "book_stats (reviews_count DESC, book_id) WHERE reviews_count > 0"
+    ),
+    "idx_book_stats_recommended": (
+        "book_stats",
+        "book_stats (avg_rating DESC, book_id) WHERE reviews_count > 0"
+    ),
+    # /authors?name_prefix= (lower(author_name) LIKE 'prefix%')
+    "idx_author_name_prefix": ("author", "author (lower(author_name) text_pattern_ops)"),
+}
+
+
+def upgrade() -> None:
+    """
+    Build the indexes without blocking writes (CREATE INDEX CONCURRENTLY), so
+    `alembic upgrade head` can run against a live database. Re-running after
+    an interrupted build resumes with the missing or invalid ones.
+    """
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in INDEXES.items():
+            drop_if_invalid(name)
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+        # Refresh planner statistics (expression indexes get their own)
+        for table in dict.fromkeys(table for table, _ in INDEXES.values()):
+            op.execute(f'ANALYZE "{table}"')
+
+
+def downgrade() -> None:
+    """Drop the service query indexes without blocking writes."""
+    with op.get_context().autocommit_block():
+        for name in reversed(list(INDEXES)):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
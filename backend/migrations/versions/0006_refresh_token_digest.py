@@ -0,0 +1,110 @@
+"""store refresh token digests
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Refresh tokens hashed per statement (and transaction) of the backfill
+BACKFILL_BATCH_SIZE = 5000
+
+TOKEN_HASH = "encode(sha256(convert_to(token, 'UTF8')), 'hex')"
+
+
+def _backfill() -> None:
+    # One short transaction per id range, so refresh_token is never locked
+    # as a whole; rows written meanwhile are already hashed by the trigger
+    if op.get_context().as_sql:
+        op.execute(f"UPDATE refresh_token SET token_hash = {TOKEN_HASH} WHERE token_hash IS NULL")
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM refresh_token")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(
+            sa.text(
+                f"UPDATE refresh_token SET token_hash = {TOKEN_HASH} "
+                "WHERE id >= :start AND id < :end AND token_hash IS NULL"
+            ),
+            {"start": start, "end": start + BACKFILL_BATCH_SIZE}
+        )
+
+
+def upgrade() -> None:
+    """
+    Add refresh_token.token_hash, the SHA-256 hex digest of the token, under
+    a unique index, plus an index on expires_at for the expired-row sweeper.
+
+    Existing rows are hashed in keyed batches and the indexes are built
+    concurrently, so logins are never blocked for long. token stays (now
+    nullable) and a trigger hashes whatever older instances still write
+    to it, so both versions can run during a rolling deploy; revision 0010
+    drops it once they are gone.
+    """
+    op.add_column("refresh_token", sa.Column("token_hash", sa.String(64), nullable=True))
+    op.alter_column("refresh_token", "token", nullable=True)
+    op.execute(
+        """
+        CREATE FUNCTION refresh_token_hash_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.token_hash := encode(sha256(convert_to(NEW.token, 'UTF8')), 'hex');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER refresh_token_hash_trigger "
+        "BEFORE INSERT OR UPDATE OF token ON refresh_token "
+        "FOR EACH ROW WHEN (NEW.token IS NOT NULL) EXECUTE FUNCTION refresh_token_hash_update()"
+    )
+
+    with op.get_context().autocommit_block():
+        _backfill()
+        # The same token may have been stored more than once; keep its newest row
+        op.execute(
+            "DELETE FROM refresh_token r USING refresh_token newer "
+            "WHERE newer.token_hash = r.token_hash AND newer.id > r.id"
+        )
+        drop_if_invalid("uq_refresh_token_token_hash")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_refresh_token_token_hash "
+            "ON refresh_token (token_hash)"
+        )
+        drop_if_invalid("idx_refresh_token_expires_at")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_refresh_token_expires_at "
+            "ON refresh_token (expires_at)"
+        )
+
+
+def downgrade() -> None:
+    """Drop refresh_token.token_hash and its indexes.
+
+    Rows issued without a raw token cannot get it back from their digests,
+    so they are revoked and their users have to log in again.
+    """
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_refresh_token_expires_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_refresh_token_token_hash")
+    op.execute("DROP TRIGGER IF EXISTS refresh_token_hash_trigger ON refresh_token")
+    op.execute("DROP FUNCTION IF EXISTS refresh_token_hash_update()")
+    op.execute("UPDATE refresh_token SET token = token_hash, is_revoked = true WHERE token IS NULL")
+    op.alter_column("refresh_token", "token", nullable=False)
+    op.drop_column("refresh_token", "token_hash")
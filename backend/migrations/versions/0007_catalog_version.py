@@ -0,0 +1,63 @@
+"""catalog version bumped by triggers
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The tables read by the catalog endpoints (app.cache.CATALOG_TABLES)
+CATALOG_TABLES = ("book", "book_stats", "review", "discount", "author", "category")
+
+
+def upgrade() -> None:
+    """
+    Add the single-row catalog_version table and statement-level triggers
+    bumping it on every write to a catalog table, ORM writes, bulk COPY
+    loads and manual SQL alike. The bump is part of the writing transaction,
+    so the new version becomes visible together with the data it describes;
+    app.http_cache builds the catalog ETags from it.
+    """
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.CheckConstraint("id = 1", name="ck_catalog_version_single_row"),
+    )
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+
+    op.execute(
+        """
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CATALOG_TABLES:
+        op.execute(
+            f"CREATE TRIGGER catalog_version_trigger "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()"
+        )
+
+
+def downgrade() -> None:
+    """Drop the catalog version triggers and table."""
+    for table in CATALOG_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS catalog_version_trigger ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS catalog_version_bump()")
+    op.drop_table("catalog_version")
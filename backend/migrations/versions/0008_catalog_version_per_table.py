@@ -0,0 +1,114 @@
+"""per-table catalog versions bumped at commit
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The tables read by the catalog endpoints (app.cache.CATALOG_TABLES)
+CATALOG_TABLES = ("book", "book_stats", "review", "discount", "author", "category")
+
+
+def upgrade() -> None:
+    """
+    Replace the single catalog_version row with one row per catalog table,
+    bumped once per writing transaction, as the transaction commits.
+
+    Every writing statement used to update the one row and hold its lock
+    until commit, so catalog writers ran one at a time (an import blocked
+    every review insert). The bump now runs from a deferred constraint
+    trigger: it is queued with the write and fires at COMMIT, is discarded
+    with a rolled back transaction or savepoint, and a transaction-local
+    setting makes only the first queued event of a table update its row.
+    Row locks are therefore held only for the commit itself (an advisory
+    lock makes commits bump in turn, so two transactions writing the same
+    tables in a different order cannot deadlock), and a reader sees a new
+    version exactly when it can see the rows that caused it.
+    TRUNCATE has no row events and bumps from a statement-level trigger.
+    """
+    for table in CATALOG_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS catalog_version_trigger ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS catalog_version_bump()")
+    op.drop_table("catalog_version")
+
+    op.create_table(
+        "catalog_version",
+        sa.Column("table_name", sa.String(63), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO catalog_version (table_name, version) VALUES "
+        + ", ".join(f"('{table}', 1)" for table in CATALOG_TABLES)
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger AS $$
+        BEGIN
+            IF coalesce(current_setting('catalog_version.' || TG_TABLE_NAME, true), '') <> 'bumped' THEN
+                PERFORM set_config('catalog_version.' || TG_TABLE_NAME, 'bumped', true);
+                PERFORM pg_advisory_xact_lock(hashtext('catalog_version'));
+                UPDATE catalog_version SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CATALOG_TABLES:
+        op.execute(
+            f"CREATE CONSTRAINT TRIGGER catalog_version_trigger "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"DEFERRABLE INITIALLY DEFERRED "
+            f"FOR EACH ROW EXECUTE FUNCTION catalog_version_bump()"
+        )
+        op.execute(
+            f"CREATE TRIGGER catalog_version_truncate_trigger "
+            f"AFTER TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()"
+        )
+
+
+def downgrade() -> None:
+    """Restore the single-row catalog_version table of migration 0007."""
+    for table in CATALOG_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS catalog_version_trigger ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS catalog_version_truncate_trigger ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS catalog_version_bump()")
+    op.drop_table("catalog_version")
+
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.CheckConstraint("id = 1", name="ck_catalog_version_single_row"),
+    )
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+    op.execute(
+        """
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CATALOG_TABLES:
+        op.execute(
+            f"CREATE TRIGGER catalog_version_trigger "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()"
+        )
@@ -0,0 +1,40 @@
+"""index revoked refresh tokens for the sweeper
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations._helpers import drop_if_invalid
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Partial index of the revoked refresh tokens, which the sweeper deletes
+    along with the expired ones; it stays as small as the backlog of
+    revoked rows. Built without blocking logins.
+    """
+    with op.get_context().autocommit_block():
+        drop_if_invalid("idx_refresh_token_revoked")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_refresh_token_revoked "
+            "ON refresh_token (id) WHERE is_revoked"
+        )
+
+
+def downgrade() -> None:
+    """Drop the revoked refresh token index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_refresh_token_revoked")
@@ -0,0 +1,64 @@
+"""drop the raw refresh token column
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Drop refresh_token.token and its hashing trigger, kept by revision 0006
+    for instances that still wrote raw tokens; apply once none is running.
+
+    token_hash becomes NOT NULL through a CHECK constraint validated without
+    blocking writes, which SET NOT NULL then relies on instead of scanning
+    the table under an exclusive lock.
+    """
+    op.execute("DROP TRIGGER IF EXISTS refresh_token_hash_trigger ON refresh_token")
+    op.execute("DROP FUNCTION IF EXISTS refresh_token_hash_update()")
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_refresh_token_token")
+    op.drop_column("refresh_token", "token")
+
+    op.execute(
+        "ALTER TABLE refresh_token ADD CONSTRAINT ck_refresh_token_token_hash_not_null "
+        "CHECK (token_hash IS NOT NULL) NOT VALID"
+    )
+    op.execute("ALTER TABLE refresh_token VALIDATE CONSTRAINT ck_refresh_token_token_hash_not_null")
+    op.alter_column("refresh_token", "token_hash", nullable=False)
+    op.drop_constraint("ck_refresh_token_token_hash_not_null", "refresh_token")
+
+
+def downgrade() -> None:
+    """Bring back refresh_token.token (empty) and its hashing trigger."""
+    op.alter_column("refresh_token", "token_hash", nullable=True)
+    op.add_column("refresh_token", sa.Column("token", sa.String(255), nullable=True))
+    op.execute(
+        """
+        CREATE FUNCTION refresh_token_hash_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.token_hash := encode(sha256(convert_to(NEW.token, 'UTF8')), 'hex');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER refresh_token_hash_trigger "
+        "BEFORE INSERT OR UPDATE OF token ON refresh_token "
+        "FOR EACH ROW WHEN (NEW.token IS NOT NULL) EXECUTE FUNCTION refresh_token_hash_update()"
+    )
+    op.create_index("idx_refresh_token_token", "refresh_token", ["token"])
@@ -0,0 +1,42 @@
+import sys
+import os
+import argparse
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.covers import COVER_FORMATS, COVER_SIZES, CoverVariants
+
+def main():
+    """
+    Build the resized WebP and JPEG variants of every cover image.
+
+    Usage:
+        python scripts/build_cover_variants.py
+        python scripts/build_cover_variants.py --source-dir ../book_images --variant-dir .cover_variants
+
+    Run it after importing new cover images; the API workers then find the
+    variants instead of resizing at their next start. Covers whose variants
+    already exist are skipped; a cover whose image changed gets new variants
+    under new content-hashed names.
+    """
+    parser = argparse.ArgumentParser(description="Build the content-addressed cover image variants")
+    parser.add_argument("--source-dir", default=settings.cover_source_dir, help="Original images (default: COVER_SOURCE_DIR)")
+    parser.add_argument("--variant-dir", default=settings.cover_variant_dir, help="Output directory (default: COVER_VARIANT_DIR)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = CoverVariants(args.source_dir, args.variant_dir).build_all()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{report['sources']} covers x {len(COVER_SIZES)} sizes x {len(COVER_FORMATS)} formats "
+        f"in {args.variant_dir} ({elapsed:.1f}s), {report['failed']} failed"
+    )
+    if report['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import argparse
+import asyncio
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.catalog_import import IMPORT_ORDER, DEFAULT_CHUNK_SIZE, import_catalog, read_rows
+
+def main():
+    """
+    Import catalog rows from CSV or JSONL files.
+
+    Usage:
+        python scripts/import_catalog.py --authors authors.csv --books books.jsonl --reviews reviews.csv
+
+    Columns (CSV header or JSON keys):
+        authors:    author_name, author_bio
+        categories: category_name, category_desc
+        books:      book_title, author_name, category_name, book_summary, book_price, book_cover_photo
+        discounts:  book_title, author_name, discount_start_date, discount_end_date, discount_price
+        reviews:    book_title, author_name, review_title, review_details, review_date, rating_star
+
+    Rows are upserted on their natural key: author_name, category_name,
+    (book_title, author), (book, discount_start_date) and
+    (book, review_title, review_date).
+    """
+    parser = argparse.ArgumentParser(description="Bulk import catalog rows from CSV or JSONL files")
+    for entity in IMPORT_ORDER:
+        parser.add_argument(f"--{entity}", metavar="FILE", help=f"CSV or JSONL file of {entity}")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per COPY batch")
+    args = parser.parse_args()
+
+    sources = {
+        entity: read_rows(getattr(args, entity), args.format)
+        for entity in IMPORT_ORDER if getattr(args, entity)
+    }
+    if not sources:
+        parser.error("nothing to import, give at least one of --" + ", --".join(IMPORT_ORDER))
+
+    def progress(entity, staged, elapsed):
+        print(f"\r  {entity}: {staged} rows staged ({staged / elapsed if elapsed else 0:.0f} rows/s)", end="", flush=True)
+
+    reports = asyncio.run(import_catalog(sources, chunk_size=args.chunk_size, progress=progress))
+
+    print()
+    for report in reports:
+        print(
+            f"{report['entity']:<11} read {report['read']}, inserted {report['inserted']}, updated {report['updated']}, "
+            f"invalid {report['invalid']}, unresolved {report['unresolved']}, duplicates {report['duplicates']} "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+        )
+
+if __name__ == "__main__":
+    main()
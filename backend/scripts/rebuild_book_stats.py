@@ -0,0 +1,27 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session
+from app.database import engine
+from app.services.book_stats import rebuild_book_stats
+
+def main():
+    """
+    Rebuild the book_stats table from the review table.
+
+    Usage:
+        python scripts/rebuild_book_stats.py            # rebuild every book
+        python scripts/rebuild_book_stats.py 12 34 56   # refresh only these books
+    """
+    book_ids = [int(arg) for arg in sys.argv[1:]] or None
+
+    with Session(engine) as session:
+        rows = rebuild_book_stats(session=session, book_ids=book_ids)
+
+    print(f"Rebuilt book_stats: {rows} rows written")
+
+if __name__ == "__main__":
+    main()
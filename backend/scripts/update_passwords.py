@@ -1,42 +1,195 @@
 import sys
 import os
+import argparse
+import json
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
 
 # Thêm thư mục gốc của dự án vào sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlmodel import Session, select
+import bcrypt
+from sqlalchemy import text
+
+from app.config import settings
 from app.database import engine
-from app.models.user import User
-from app.auth.password import get_password_hash
 
-def update_passwords():
+DEFAULT_PASSWORD = "password123"
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHECKPOINT = ".update_passwords.checkpoint.json"
+
+def _ignore_interrupts() -> None:
+    # Ctrl+C goes to the whole process group; only the parent handles it (it
+    # saves the checkpoint and shuts the pool down), so the workers ignore it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def hash_password(password: str, rounds: int) -> str:
+    """
+    bcrypt-hash one password; runs in the worker processes
+    """
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+def _hash_batch(pool: ProcessPoolExecutor, password: str, rounds: int, size: int, workers: int) -> List[str]:
+    # One salt per user, so every row needs its own hash
+    chunksize = max(1, size // (workers * 4))
+    return list(pool.map(hash_password, [password] * size, [rounds] * size, chunksize=chunksize))
+
+def _user_filter(only_outdated: bool) -> str:
+    # The cost factor is the third field of a bcrypt hash: $2b$12$...
+    return "AND split_part(password, '$', 3) <> :cost" if only_outdated else ""
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    # Write then rename, so an interruption never leaves a half-written file
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, path)
+
+def update_passwords(
+    password: str = DEFAULT_PASSWORD,
+    rounds: int = settings.bcrypt_rounds,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    only_outdated: bool = False,
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    restart: bool = False
+) -> Dict[str, Any]:
     """
     Cập nhật mật khẩu cho tất cả người dùng trong database
+
+    Set the password of every user (or only of those whose hash uses another
+    cost factor than rounds) to a new bcrypt hash of password.
+
+    Users are streamed in id order through a server-side cursor, hashed on a
+    process pool and written back one batch per transaction with a single
+    UPDATE. The last written id is saved to the checkpoint file after every
+    batch, so an interrupted run continues where it stopped.
+
+    Args:
+        password: Plain password to set
+        rounds: bcrypt cost factor of the new hashes
+        batch_size: Users hashed and updated per transaction
+        workers: Hashing processes (default: number of CPUs)
+        only_outdated: Only update users whose hash has another cost factor
+        checkpoint_path: JSON file recording the progress
+        restart: Ignore an existing checkpoint and start from the first user
+
+    Returns:
+        The number of users updated, the elapsed time and the throughput
     """
-    with Session(engine) as session:
-        # Lấy tất cả người dùng
-        statement = select(User)
-        users = session.exec(statement).all()
-        
-        print(f"Found {len(users)} users")
-        
-        for user in users:
-            # Giả sử mật khẩu ban đầu là 'password123'
-            # Bạn có thể thay đổi thành mật khẩu khác hoặc sử dụng mật khẩu hiện tại
-            plain_password = "password123"
-            
-            # Hash mật khẩu
-            hashed_password = get_password_hash(plain_password)
-            
-            # Cập nhật mật khẩu
-            user.password = hashed_password
-            session.add(user)
-            
-            print(f"Updated password for user {user.email}")
-        
-        # Lưu thay đổi
-        session.commit()
-        print("All passwords updated successfully")
+    workers = workers or os.cpu_count() or 1
+    run = {'rounds': rounds, 'only_outdated': only_outdated}
+
+    checkpoint = {} if restart else load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get('run') != run:
+        raise SystemExit(
+            f"{checkpoint_path} belongs to a run with other options ({checkpoint.get('run')}); "
+            f"pass --restart to start over"
+        )
+    last_id = checkpoint.get('last_id', 0)
+    updated = checkpoint.get('updated', 0)
+    if last_id:
+        print(f"Resuming after user {last_id} ({updated} users already updated)")
+
+    parameters = {'last_id': last_id, 'cost': f"{rounds:02d}"}
+    user_filter = _user_filter(only_outdated)
+
+    with engine.connect() as connection:
+        remaining = connection.execute(
+            text(f'SELECT count(*) FROM "user" WHERE id > :last_id {user_filter}'), parameters
+        ).scalar_one()
+    print(f"Found {remaining} users to update with {workers} processes, batches of {batch_size}")
+
+    started = time.perf_counter()
+    done = 0
+    # Reads stream on their own connection: committing the writes would close the server-side cursor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_ignore_interrupts) as pool, \
+            engine.connect() as read_connection, \
+            engine.connect() as write_connection:
+        users = read_connection.execution_options(stream_results=True, yield_per=batch_size).execute(
+            text(f'SELECT id FROM "user" WHERE id > :last_id {user_filter} ORDER BY id'), parameters
+        )
+        for batch in users.partitions(batch_size):
+            ids = [user_id for (user_id,) in batch]
+            hashes = _hash_batch(pool, password, rounds, len(ids), workers)
+
+            with write_connection.begin():
+                write_connection.execute(
+                    text(
+                        'UPDATE "user" SET password = batch.password '
+                        'FROM unnest(CAST(:ids AS bigint[]), CAST(:hashes AS text[])) AS batch(id, password) '
+                        'WHERE "user".id = batch.id'
+                    ),
+                    {'ids': ids, 'hashes': hashes}
+                )
+
+            done += len(ids)
+            updated += len(ids)
+            save_checkpoint(checkpoint_path, {'run': run, 'last_id': ids[-1], 'updated': updated})
+
+            elapsed = time.perf_counter() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (remaining - done) / rate if rate else 0.0
+            print(
+                f"\r  {done}/{remaining} users ({done / remaining * 100 if remaining else 100:.1f}%), "
+                f"{rate:.0f} users/s, ETA {eta:.0f}s",
+                end="", flush=True
+            )
+
+    elapsed = time.perf_counter() - started
+    print()
+    # The run is complete: the next one starts from the first user again
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"Updated {done} users in {elapsed:.1f}s")
+    return {
+        'updated': done,
+        'seconds': round(elapsed, 3),
+        'users_per_second': round(done / elapsed, 1) if elapsed else None
+    }
+
+def main():
+    """
+    Usage:
+        python scripts/update_passwords.py                          # every user to "password123"
+        python scripts/update_passwords.py --password s3cret --rounds 12 --batch-size 2000
+        python scripts/update_passwords.py --only-outdated          # only hashes with another cost than --rounds
+
+    Interrupt it at any time (Ctrl+C) and run the same command again to resume.
+    Real users cannot be moved to a new cost factor offline, since bcrypt needs
+    the plain password; use PASSWORD_REHASH_ON_LOGIN for them.
+    """
+    parser = argparse.ArgumentParser(description="Set user passwords to a new bcrypt hash, in parallel and resumable")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help=f"Plain password to set (default: {DEFAULT_PASSWORD})")
+    parser.add_argument("--rounds", type=int, default=settings.bcrypt_rounds, help="bcrypt cost factor (default: BCRYPT_ROUNDS)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Users per UPDATE and checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: number of CPUs)")
+    parser.add_argument("--only-outdated", action="store_true", help="Skip users already hashed with --rounds")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first user")
+    args = parser.parse_args()
+
+    try:
+        update_passwords(
+            password=args.password,
+            rounds=args.rounds,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            only_outdated=args.only_outdated,
+            checkpoint_path=args.checkpoint,
+            restart=args.restart
+        )
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; run the same command again to resume from {args.checkpoint}")
+        sys.exit(130)
 
 if __name__ == "__main__":
-    update_passwords()
+    main()
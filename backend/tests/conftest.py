@@ -0,0 +1,158 @@
+"""
+Shared fixtures. The app runs against a throwaway SQLite database created
+from the models, so the suite needs no database server; tests of
+PostgreSQL-only features use TEST_POSTGRES_URL (a scratch database migrated
+with `alembic upgrade head`) and are skipped without it.
+"""
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+_TEST_DIR = tempfile.mkdtemp(prefix="bookworm-tests-")
+
+# Must be set before anything imports app.config
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TEST_DIR}/bookworm.db",
+    "ASYNC_DATABASE_URL": "",
+    # No cover images unless a test adds some
+    "COVER_SOURCE_DIR": os.path.join(_TEST_DIR, "covers"),
+    "COVER_VARIANT_DIR": os.path.join(_TEST_DIR, "cover_variants"),
+    "BCRYPT_ROUNDS": "4",
+    "LOG_LEVEL": "WARNING",
+    "PRICING_DATE": "2022-10-08",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlmodel import Session, SQLModel
+
+from app.main import app
+from app.auth.auth_handler import access_token_claims, create_access_token
+from app.auth.auth_service import cache_user_profile
+from app.auth.password import get_password_hash
+from app.cache import clear_caches
+from app.database import engine
+from app.models.author import Author
+from app.models.book import Book
+from app.models.category import Category
+from app.models.discount import Discount
+from app.models.review import Review
+from app.models.user import User
+from app.services.book_search import book_search_index
+from app.services.book_suggest import suggest_index
+
+PASSWORD = "secret"
+
+@compiles(BigInteger, "sqlite")
+def _compile_big_integer_sqlite(type_, compiler, **kw):
+    # SQLite only generates keys for INTEGER PRIMARY KEY columns
+    return "INTEGER"
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+def seed_catalog(session: Session) -> None:
+    """
+    A small catalog: 2 categories, 3 authors and 30 books, some of them
+    reviewed and some on sale at the pricing date
+    """
+    session.add_all([
+        Category(id=1, category_name="Science", category_desc="Science books"),
+        Category(id=2, category_name="Fiction", category_desc="Novels"),
+        Author(id=1, author_name="Carl Sagan", author_bio="Astronomer"),
+        Author(id=2, author_name="Ursula Le Guin", author_bio="Novelist"),
+        Author(id=3, author_name="Stephen Hawking", author_bio="Physicist"),
+    ])
+    session.flush()
+
+    for i in range(1, 31):
+        session.add(Book(
+            id=i,
+            category_id=1 if i % 2 else 2,
+            author_id=i % 3 + 1,
+            book_title=f"{['Cosmos', 'Earthsea', 'Time'][i % 3]} volume {i}",
+            book_summary=f"Summary of book {i}",
+            book_price=10 + i % 7,
+            book_cover_photo=f"book{i % 10 + 1}" if i % 4 else None,
+        ))
+    session.flush()
+
+    review_id = 0
+    for book_id in range(1, 21):
+        for star in range(1, book_id % 5 + 2):
+            review_id += 1
+            session.add(Review(
+                id=review_id,
+                book_id=book_id,
+                review_title=f"Review {review_id}",
+                review_details="Details",
+                review_date=datetime(2022, 1, 1 + review_id % 28),
+                rating_star=star,
+            ))
+
+    for book_id in (2, 5, 9, 14, 22):
+        session.add(Discount(
+            id=book_id,
+            book_id=book_id,
+            discount_start_date=date(2022, 1, 1),
+            discount_end_date=date(2022, 12, 31),
+            discount_price=5 + book_id % 3,
+        ))
+    session.commit()
+
+def seed_users(session: Session) -> None:
+    session.add_all([
+        User(id=1, first_name="Alice", last_name="Reader", email="alice@example.com",
+             password=get_password_hash(PASSWORD), admin=False),
+        User(id=2, first_name="Bob", last_name="Admin", email="bob@example.com",
+             password=get_password_hash(PASSWORD), admin=True),
+    ])
+    session.commit()
+
+@pytest.fixture
+def db():
+    """
+    A freshly created and seeded database, with every in-process cache and
+    index reset to match it
+    """
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    clear_caches()
+    with Session(engine) as session:
+        seed_catalog(session)
+        seed_users(session)
+    clear_caches()
+    with Session(engine) as session:
+        suggest_index.rebuild(session)
+    book_search_index.mark_stale()
+    yield engine
+
+@pytest.fixture
+def session(db):
+    with Session(engine) as session:
+        yield session
+
+@pytest.fixture
+def client(db):
+    # Not entered as a context manager: the lifespan's pollers and sweepers stay off
+    return TestClient(app)
+
+def bearer(user_id: int) -> dict:
+    """
+    Authorization header with an access token of a seeded user
+    """
+    with Session(engine) as session:
+        profile = cache_user_profile(session.get(User, user_id))
+    return {"Authorization": f"Bearer {create_access_token(access_token_claims(profile))}"}
+
+@pytest.fixture
+def user_headers(db):
+    return bearer(1)
+
+@pytest.fixture
+def admin_headers(db):
+    return bearer(2)
@@ -0,0 +1,39 @@
+import pytest
+
+SORT_MODES = [None, "price_asc", "price_desc", "discount_desc", "popularity_desc"]
+
+def walk(client, params):
+    # Follow next_cursor from the first page to the last
+    ids, cursor = [], None
+    while True:
+        response = client.get("/books/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        ids += [book["id"] for book in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+@pytest.mark.parametrize("sort_by", SORT_MODES)
+def test_cursor_pages_match_offset_pages(client, sort_by):
+    params = {"size": 5, **({"sort_by": sort_by} if sort_by else {})}
+    by_offset = []
+    for page in range(1, 7):
+        by_offset += [book["id"] for book in client.get("/books/", params={**params, "page": page}).json()["items"]]
+
+    by_cursor = walk(client, params)
+
+    assert by_cursor == by_offset
+    assert sorted(by_cursor) == list(range(1, 31))
+
+def test_cursor_respects_filters(client):
+    ids = walk(client, {"size": 5, "category_id": 1, "sort_by": "price_desc"})
+    assert sorted(ids) == list(range(1, 31, 2))
+
+def test_cursor_of_another_sort_mode_is_rejected(client):
+    cursor = client.get("/books/", params={"size": 5, "sort_by": "price_asc"}).json()["next_cursor"]
+    response = client.get("/books/", params={"size": 5, "sort_by": "price_desc", "cursor": cursor})
+    assert response.status_code == 400
+
+def test_garbage_cursor_is_rejected(client):
+    assert client.get("/books/", params={"cursor": "not-a-cursor"}).status_code == 400
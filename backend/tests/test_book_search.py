@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.main import app
+from app.models.book import Book
+from app.services.book_search import book_search_index
+
+def test_search_matches_title_author_and_summary(client):
+    body = client.get("/books/search", params={"q": "cosmos"}).json()
+    assert body["items"] and all("Cosmos" in book["title"] for book in body["items"])
+
+    by_author = client.get("/books/search", params={"q": "sagan", "size": 25}).json()
+    assert {book["author_name"] for book in by_author["items"]} == {"Carl Sagan"}
+
+    assert client.get("/books/search", params={"q": "cosmos hawking"}).json()["items"] == []
+
+def test_search_ranks_title_matches_first(client, session):
+    session.add(Book(id=31, category_id=1, author_id=2, book_title="Unrelated",
+                     book_summary="Mentions cosmos once", book_price=10))
+    session.commit()
+    items = client.get("/books/search", params={"q": "cosmos", "size": 25}).json()["items"]
+    assert items[-1]["id"] == 31
+    assert items[0]["rank"] > items[-1]["rank"]
+
+def test_new_books_are_found_after_commit(client, session):
+    assert client.get("/books/search", params={"q": "dragons"}).json()["items"] == []
+    session.add(Book(id=31, category_id=1, author_id=1, book_title="Dragons",
+                     book_summary="Here be dragons", book_price=10))
+    session.commit()
+    assert [book["id"] for book in client.get("/books/search", params={"q": "dragons"}).json()["items"]] == [31]
+
+def test_concurrent_searches_on_a_stale_index_do_not_block_each_other(db):
+    # The index is rebuilt through the AsyncSession of the request; a
+    # request waiting for the rebuild must not block the event loop
+    book_search_index.mark_stale()
+    results = []
+
+    async def search_concurrently():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.get("/books/search", params={"q": f"volume {i}"}) for i in range(8)
+            ))
+        results.extend(response.status_code for response in responses)
+
+    # A deadlocked loop never returns, so it runs in a thread we can give up on
+    runner = threading.Thread(target=lambda: asyncio.run(search_concurrently()), daemon=True)
+    runner.start()
+    runner.join(timeout=30)
+    assert not runner.is_alive(), "concurrent searches deadlocked"
+    assert results == [200] * 8
@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy import text
+
+from app.events import notify_tables_changed_in_database
+from app.models.author import Author
+from app.models.book import Book
+from app.services.book_suggest import SUGGEST_INCREMENTAL_LIMIT, SuggestIndex, suggest_index
+
+def suggest(client, q, limit=8):
+    return [(item["type"], item["text"]) for item in client.get("/books/suggest", params={"q": q, "limit": limit}).json()]
+
+def test_prefix_completes_titles_and_author_words(client):
+    assert suggest(client, "earthsea vol", 1) == [("title", "Earthsea volume 1")]
+    assert ("author", "Carl Sagan") in suggest(client, "sag")
+    assert suggest(client, "zzz") == []
+
+def test_committed_orm_writes_are_applied_at_once(client, session):
+    session.add(Book(id=31, category_id=1, author_id=1, book_title="Pale Blue Dot",
+                     book_summary="Sagan", book_price=10))
+    session.commit()
+    assert suggest(client, "pale") == [("title", "Pale Blue Dot")]
+
+    book = session.get(Book, 31)
+    book.book_title = "Contact"
+    session.commit()
+    assert suggest(client, "pale") == []
+    assert ("title", "Contact") in suggest(client, "conta")
+
+    author = session.get(Author, 3)
+    author.author_name = "Stephen W. Hawking"
+    session.commit()
+    assert suggest(client, "stephen") == [("author", "Stephen W. Hawking")]
+
+def test_large_batches_match_a_full_rebuild(session):
+    index = SuggestIndex()
+    index.rebuild(session)
+    changes = {("title", book_id): f"Renamed title {book_id}" for book_id in range(1, 31)}
+    changes[("author", 2)] = None
+    assert len(changes) * 3 > SUGGEST_INCREMENTAL_LIMIT
+    index.apply(changes)
+
+    for book_id in range(1, 31):
+        session.get(Book, book_id).book_title = f"Renamed title {book_id}"
+    session.flush()
+    session.execute(text("UPDATE book SET author_id = 1 WHERE author_id = 2"))
+    session.delete(session.get(Author, 2))
+    session.flush()
+    expected = SuggestIndex()
+    expected.rebuild(session)
+    session.rollback()
+
+    assert index._entries == expected._entries
+    assert index.suggest("renamed", 50) == expected.suggest("renamed", 50)
+
+def test_writes_seen_by_the_version_poller_rebuild_the_index(client, db):
+    # A write the ORM of this worker does not see, like another worker's
+    with db.begin() as connection:
+        connection.execute(text("UPDATE book SET book_title = 'Foundation' WHERE id = 1"))
+    assert suggest(client, "foundation") == []
+
+    notify_tables_changed_in_database({"review"})
+    assert suggest(client, "foundation") == []
+
+    notify_tables_changed_in_database({"book"})
+    deadline = time.monotonic() + 10
+    while suggest_index._rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert suggest(client, "foundation") == [("title", "Foundation")]
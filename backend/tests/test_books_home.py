@@ -0,0 +1,23 @@
+import pytest
+
+def test_home_returns_the_three_lists(client):
+    response = client.get("/books/home", params={"on_sale_limit": 3, "popular_limit": 2, "recommended_limit": 4})
+    assert response.status_code == 200
+    body = response.json()
+    assert body.keys() == {"on_sale", "popular", "recommended"}
+    assert len(body["on_sale"]) == 3
+    assert body["popular"] == client.get("/books/popular", params={"limit": 2}).json()
+    assert body["recommended"] == client.get("/books/recommended", params={"limit": 4}).json()
+
+@pytest.mark.parametrize("path, param", [
+    ("/books/home", "on_sale_limit"),
+    ("/books/home", "popular_limit"),
+    ("/books/home", "recommended_limit"),
+    ("/books/on-sale", "limit"),
+    ("/books/popular", "limit"),
+    ("/books/recommended", "limit"),
+])
+def test_list_limits_are_bounded(client, path, param):
+    assert client.get(path, params={param: 25}).status_code == 200
+    assert client.get(path, params={param: 26}).status_code == 422
+    assert client.get(path, params={param: 0}).status_code == 422
@@ -0,0 +1,83 @@
+import time
+from datetime import date
+
+from app.cache import LRUCache, cached, copy_result
+from app.models.discount import Discount
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.lookup("b") == (False, None)
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    cache = LRUCache(max_entries=10, ttl_seconds=60)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.stats()["expirations"] == 1
+
+def test_invalidate_tags_drops_only_tagged_entries():
+    cache = LRUCache(max_entries=10, ttl_seconds=60)
+    cache.set("books", 1, tags={"book"})
+    cache.set("both", 2, tags={"book", "review"})
+    cache.set("users", 3, tags={"user"})
+    assert cache.invalidate_tags({"book"}) == 2
+    assert cache.get("users") == 3
+    assert cache.get("books") is None and cache.get("both") is None
+
+def test_cached_keys_on_arguments_but_not_the_session():
+    calls = []
+
+    @cached("test_cached_keys", tags={"book"}, ttl_seconds=60)
+    def compute(value: int, session=None):
+        calls.append(value)
+        return {"value": value, "items": [value]}
+
+    assert compute(1, session="a") == compute(1, session="b") == {"value": 1, "items": [1]}
+    assert compute(2) == {"value": 2, "items": [2]}
+    assert calls == [1, 2]
+
+def test_cached_results_cannot_be_changed_by_callers():
+    @cached("test_cached_copies", tags={"book"}, ttl_seconds=60)
+    def compute():
+        return {"items": [{"id": 1}]}
+
+    first = compute()
+    first["items"][0]["id"] = 99
+    second = compute()
+    second["items"].append({"id": 2})
+    assert compute() == {"items": [{"id": 1}]}
+
+def test_copy_result_copies_containers_only():
+    value = {"a": [{"b": 1}], "c": (1, [2]), "d": date(2022, 1, 1)}
+    copied = copy_result(value)
+    assert copied == value
+    assert copied["a"] is not value["a"] and copied["a"][0] is not value["a"][0]
+    assert copied["c"][1] is not value["c"][1]
+    assert copied["d"] is value["d"]
+
+def test_catalog_commit_invalidates_listings(client, session):
+    before = client.get("/books/on-sale", params={"limit": 25}).json()
+    assert 1 not in [book["id"] for book in before]
+
+    session.add(Discount(id=100, book_id=1, discount_start_date=date(2022, 1, 1),
+                         discount_end_date=None, discount_price=1))
+    session.commit()
+
+    after = client.get("/books/on-sale", params={"limit": 25}).json()
+    assert 1 in [book["id"] for book in after]
+
+def test_cache_stats_requires_an_admin(client, user_headers, admin_headers):
+    assert client.get("/cache/stats").status_code in (401, 403)
+    assert client.get("/cache/stats", headers=user_headers).status_code == 403
+    response = client.get("/cache/stats", headers=admin_headers)
+    assert response.status_code == 200
+    assert "books" in response.json()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.catalog_import import IMPORT_SPECS, _parse, import_entity
+
+REVIEW = {"book_title": "Import test book", "author_name": "Import Test Author", "review_title": "Great",
+          "review_details": "Details", "review_date": "2022-05-01 10:00:00", "rating_star": "5"}
+
+def new_report():
+    return {'read': 0, 'invalid': 0}
+
+def test_ratings_outside_one_to_five_are_invalid():
+    rows = [REVIEW, {**REVIEW, "rating_star": "0"}, {**REVIEW, "rating_star": "6"}, {**REVIEW, "rating_star": "x"}]
+    report = new_report()
+
+    records = list(_parse(IMPORT_SPECS["reviews"], rows, report))
+
+    assert [record[-1] for record in records] == [5]
+    assert report == {'read': 4, 'invalid': 3}
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_import_upserts_on_the_natural_keys():
+    asyncpg = pytest.importorskip("asyncpg")
+    dsn = os.environ["TEST_POSTGRES_URL"].replace("postgresql+psycopg2://", "postgresql://", 1)
+
+    async def run():
+        connection = await asyncpg.connect(dsn)
+        try:
+            category = await connection.fetchval("SELECT category_name FROM category ORDER BY id LIMIT 1")
+            await import_entity(connection, "authors", [{"author_name": "Import Test Author"}])
+            books = await import_entity(connection, "books", [{
+                "book_title": "Import test book", "author_name": "Import Test Author", "category_name": category,
+                "book_summary": "Summary", "book_price": "9.99",
+            }])
+            book_id = await connection.fetchval("SELECT id FROM book WHERE book_title = 'Import test book'")
+
+            first = await import_entity(connection, "reviews", [REVIEW, {**REVIEW, "rating_star": "9"}])
+            again = await import_entity(connection, "reviews", [REVIEW])
+            repeated = await import_entity(connection, "reviews", [{**REVIEW, "rating_star": "4"}, REVIEW])
+            changed = await import_entity(connection, "reviews", [{**REVIEW, "rating_star": "3"}])
+            rating = await connection.fetchval("SELECT rating_star FROM review WHERE book_id = $1", book_id)
+
+            # Natural keys are not unique: only the oldest row of a key is updated
+            await connection.execute(
+                "INSERT INTO author (author_name, author_bio) VALUES ('Import Test Twin', 'a'), ('Import Test Twin', 'b')"
+            )
+            twins = await import_entity(connection, "authors", [{"author_name": "Import Test Twin", "author_bio": "c"}])
+            bios = [bio for (bio,) in await connection.fetch(
+                "SELECT author_bio FROM author WHERE author_name = 'Import Test Twin' ORDER BY id"
+            )]
+        finally:
+            # Every entity commits on its own, so remove the rows again
+            await connection.execute(
+                "DELETE FROM review WHERE book_id IN (SELECT id FROM book WHERE book_title = 'Import test book')"
+            )
+            await connection.execute("DELETE FROM book WHERE book_title = 'Import test book'")
+            await connection.execute("DELETE FROM author WHERE author_name IN ('Import Test Author', 'Import Test Twin')")
+            await connection.close()
+        return books, book_id, first, again, repeated, changed, rating, twins, bios
+
+    books, book_id, first, again, repeated, changed, rating, twins, bios = asyncio.run(run())
+
+    assert (books['inserted'], books['updated']) == (1, 0)
+    assert (first['inserted'], first['updated'], first['invalid']) == (1, 0, 1)
+    assert first['book_ids'] == [book_id]
+    assert (again['inserted'], again['updated'], again['book_ids']) == (0, 0, [])
+    # Repeated keys keep their last row
+    assert (repeated['inserted'], repeated['updated'], repeated['duplicates']) == (0, 0, 1)
+    assert (changed['inserted'], changed['updated'], changed['book_ids']) == (0, 1, [book_id])
+    assert rating == 3
+    assert (twins['inserted'], twins['updated']) == (0, 1)
+    assert bios == ["c", "b"]
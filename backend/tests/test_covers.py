@@ -0,0 +1,118 @@
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.http_cache import catalog_version
+from app.services.book_detail import get_book_detail
+from app.services.covers import COVER_FORMATS, COVER_SIZES, CoverVariants, cover_variants
+
+def write_cover(directory, name, size=(800, 1200), mode="RGB"):
+    os.makedirs(directory, exist_ok=True)
+    Image.new(mode, size, (200, 40, 40)).save(os.path.join(directory, f"{name}.png"))
+
+@pytest.fixture
+def covers(tmp_path):
+    write_cover(tmp_path / "sources", "book1")
+    write_cover(tmp_path / "sources", "book2", mode="RGBA")
+    return CoverVariants(str(tmp_path / "sources"), str(tmp_path / "variants"))
+
+def test_lookup_queues_the_build_instead_of_waiting(covers, monkeypatch):
+    release = threading.Event()
+    build = covers._load_or_build
+    monkeypatch.setattr(covers, "_load_or_build", lambda name, path: release.wait(10) and build(name, path))
+
+    assert covers.urls("book1") is None
+    assert covers.urls("book1") is None
+    release.set()
+    covers.wait()
+
+    urls = covers.urls("book1")
+    assert set(urls) == set(COVER_SIZES)
+    assert all(set(formats) == set(COVER_FORMATS) for formats in urls.values())
+    for formats in covers.variants("book1").values():
+        for filename in formats.values():
+            assert os.path.isfile(os.path.join(covers.variant_dir, filename))
+
+def test_a_burst_of_builds_is_published_once(covers, monkeypatch):
+    published = []
+    monkeypatch.setattr("app.services.covers.invalidate_tags", published.append)
+    covers.enqueue(["book1", "book2", "missing"])
+    covers.wait()
+
+    # Only the results tagged with these covers are dropped
+    assert published == [{"cover:book1", "cover:book2", "cover:missing"}]
+    assert covers.urls("book2") is not None
+    assert covers.urls("missing") is None
+    covers.wait()
+    assert len(published) == 1
+
+def test_invalid_names_are_never_queued(covers):
+    assert covers.urls("../etc/passwd") is None
+    assert covers._queued == set()
+
+def test_build_all_reuses_existing_variants(covers, tmp_path):
+    assert covers.build_all() == {'sources': 2, 'failed': 0}
+    built = sorted(os.listdir(covers.variant_dir))
+
+    # Another process finds the manifests instead of resizing again
+    other = CoverVariants(covers.source_dir, covers.variant_dir)
+    assert other.build_all() == {'sources': 2, 'failed': 0}
+    assert sorted(os.listdir(covers.variant_dir)) == built
+    assert other.variants("book1") == covers.variants("book1")
+
+@pytest.fixture
+def app_covers(db):
+    # Other tests looked up the seeded covers while they had no source
+    cover_variants.wait()
+    cover_variants._known.clear()
+    cover_variants._stamps.clear()
+    return cover_variants
+
+def test_listing_shows_covers_once_built(client, app_covers):
+    # Book 1 has cover book2, book 2 has cover book3 (without a source)
+    write_cover(settings.cover_source_dir, "book2")
+    app_covers.build("book3")
+    catalog_version._version = 3
+    try:
+        first = client.get("/books/1")
+        assert first.json()["cover_urls"] is None
+        # The catalog version will not change when the cover is ready
+        assert "etag" not in first.headers
+        assert first.headers["cache-control"] == "no-cache"
+        assert "etag" in client.get("/books/2").headers
+
+        app_covers.wait()
+        hits = get_book_detail.cache.hits
+        second = client.get("/books/1")
+        urls = second.json()["cover_urls"]
+        assert urls["card"]["webp"].startswith(settings.cover_base_url + "/book2-card-")
+        assert "etag" in second.headers
+        assert get_book_detail.cache.hits == hits
+
+        # Book 2 did not depend on the new cover and is still cached
+        client.get("/books/2")
+        assert get_book_detail.cache.hits == hits + 1
+    finally:
+        catalog_version._version = None
+
+def test_variant_route_supports_conditional_and_range_requests(client, app_covers):
+    write_cover(settings.cover_source_dir, "book3")
+    app_covers.build("book3")
+    url = app_covers.urls("book3")["thumbnail"]["jpeg"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert "immutable" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get(url, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == response.content[:10]
+
+    assert client.get("/covers/book3-card-0000000000000000.webp").status_code == 404
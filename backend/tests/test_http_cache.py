@@ -0,0 +1,144 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+from app.cache import LRUCache, add_tags, cached, collect_tags, invalidate_tags
+from app.events import _listeners, on_tables_changed
+from app.http_cache import CatalogVersion, catalog_version
+from app.services.covers import cover_variants
+
+class FakeSession:
+    """Answers the catalog version query with the given table versions"""
+    def __init__(self, versions):
+        self.versions = versions
+
+    def execute(self, statement):
+        versions = dict(self.versions)
+        return type("Result", (), {"all": lambda self: list(versions.items())})()
+
+@pytest.fixture
+def notified():
+    tables = []
+    on_tables_changed({"book", "review"}, tables.append)
+    yield tables
+    _listeners.pop()
+
+def test_changed_tables_are_notified_with_the_new_version(notified):
+    version = CatalogVersion()
+    session = FakeSession({"book": 5, "review": 7})
+    assert version.refresh(session) == 12
+    assert notified == []
+
+    session.versions["review"] = 8
+    assert version.refresh(session) == 13
+    assert notified == [{"review"}]
+    assert version.refresh(session) == 13
+    assert notified == [{"review"}]
+
+def test_local_commit_hides_the_version_until_the_next_poll():
+    version = CatalogVersion()
+    session = FakeSession({"book": 1})
+    assert version.refresh(session) == 1
+    version.changed({"book"})
+    assert version.version is None
+    assert version.refresh(session) == 1
+
+def test_cache_drops_results_computed_across_an_invalidation():
+    cache = LRUCache(max_entries=10, ttl_seconds=60)
+    version = cache.version({"book"})
+    cache.invalidate_tags({"book"})
+    cache.set("key", "old", tags={"book"}, version=version)
+    assert cache.get("key") is None
+    assert cache.stats()["stale_writes"] == 1
+
+    cache.set("key", "new", tags={"book"}, version=cache.version({"book"}))
+    assert cache.get("key") == "new"
+
+def test_cached_does_not_store_a_result_invalidated_while_computing():
+    calls = []
+
+    @cached("test_cached_race", tags={"book"}, ttl_seconds=60)
+    def compute():
+        calls.append(1)
+        # A commit lands while the result is being computed
+        compute.cache.invalidate_tags({"book"})
+        return len(calls)
+
+    assert compute() == 1
+    assert compute() == 2
+
+def test_cached_results_are_dropped_by_the_tags_they_added():
+    calls = []
+
+    @cached("test_cached_extra_tags", tags={"book"}, ttl_seconds=60)
+    def compute():
+        calls.append(1)
+        add_tags(["cover:x"])
+        if len(calls) == 1:
+            # The cover is built while the result is being computed
+            invalidate_tags({"cover:x"})
+        return len(calls)
+
+    assert compute() == 1
+    assert compute() == 2
+    with collect_tags() as reused:
+        assert compute() == 2
+    assert set(reused) == {"cover:x"}
+
+    invalidate_tags({"cover:y"})
+    assert compute() == 2
+    invalidate_tags({"cover:x"})
+    assert compute() == 3
+
+def test_unchanged_catalog_is_answered_with_304(client):
+    catalog_version._version = 42
+    try:
+        # Responses with covers still being built carry no ETag
+        client.get("/books/", params={"size": 5})
+        cover_variants.wait()
+
+        first = client.get("/books/", params={"size": 5})
+        etag = first.headers["etag"]
+        assert etag.startswith('W/"42-')
+        assert first.headers["cache-control"] == "public, max-age=0, must-revalidate"
+
+        again = client.get("/books/", params={"size": 5}, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+
+        other_query = client.get("/books/", params={"size": 15}, headers={"If-None-Match": etag})
+        assert other_query.status_code == 200
+
+        catalog_version._version = 43
+        assert client.get("/books/", params={"size": 5}, headers={"If-None-Match": etag}).status_code == 200
+    finally:
+        catalog_version._version = None
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_table_versions_advance_once_per_committed_transaction(notified):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    touch = text("UPDATE review SET rating_star = rating_star WHERE id IN (SELECT min(id) FROM review)")
+    try:
+        version = CatalogVersion()
+        with Session(engine) as session:
+            before = version.refresh(session)
+            assert before is not None
+
+            with engine.connect() as connection:
+                connection.execute(touch)
+                connection.rollback()
+            assert version.refresh(session) == before
+
+            with engine.connect() as connection:
+                connection.execute(touch)
+                connection.execute(touch)
+                # Not visible before the commit
+                assert version.refresh(session) == before
+                connection.commit()
+
+            assert version.refresh(session) == before + 1
+            assert notified == [{"review"}]
+    finally:
+        engine.dispose()
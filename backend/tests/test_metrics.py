@@ -0,0 +1,23 @@
+import pytest
+
+from app.config import settings
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape-token")
+    return "scrape-token"
+
+def test_metrics_require_authentication(client):
+    assert client.get("/metrics").status_code in (401, 403)
+
+def test_metrics_refuse_non_admin_users(client, user_headers):
+    assert client.get("/metrics", headers=user_headers).status_code == 403
+
+def test_metrics_for_admin_users(client, admin_headers):
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert "text/plain" in response.headers["content-type"]
+
+def test_metrics_for_the_scraper_token(client, metrics_token):
+    assert client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
@@ -0,0 +1,89 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlmodel import select
+
+from app.models.order import Order, OrderItem
+
+CART = [{"book_id": 1, "quantity": 2}, {"book_id": 2, "quantity": 1}]
+
+def place(client, headers, items=CART, key=None):
+    return client.post("/orders/", json=items, headers={**headers, **({"Idempotency-Key": key} if key else {})})
+
+def test_order_is_priced_like_the_listings(client, user_headers):
+    response = place(client, user_headers)
+    assert response.status_code == 200
+    order = response.json()["order"]
+
+    book_1 = client.get("/books/1").json()
+    book_2 = client.get("/books/2").json()
+    assert [item["price"] for item in order["items"]] == [book_1["final_price"], book_2["final_price"]]
+    assert Decimal(order["order_amount"]) == 2 * Decimal(book_1["final_price"]) + Decimal(book_2["final_price"])
+
+def test_retry_with_the_same_key_returns_the_first_order(client, session, user_headers):
+    first = place(client, user_headers, key="checkout-1").json()["order"]
+    retry = place(client, user_headers, key="checkout-1").json()["order"]
+
+    assert retry["id"] == first["id"]
+    assert retry["items"] == first["items"]
+    assert len(session.exec(select(Order)).all()) == 1
+    assert len(session.exec(select(OrderItem)).all()) == 2
+
+def test_key_reused_for_another_cart_is_rejected(client, user_headers):
+    assert place(client, user_headers, key="checkout-1").status_code == 200
+    response = place(client, user_headers, items=[{"book_id": 3, "quantity": 1}], key="checkout-1")
+    assert response.status_code == 409
+
+def test_keys_are_per_user(client, user_headers, admin_headers):
+    first = place(client, user_headers, key="checkout-1").json()["order"]
+    second = place(client, admin_headers, key="checkout-1").json()["order"]
+    assert first["id"] != second["id"]
+
+def test_orders_without_a_key_are_never_merged(client, session, user_headers):
+    place(client, user_headers)
+    place(client, user_headers)
+    assert len(session.exec(select(Order)).all()) == 2
+
+def test_invalid_carts_are_rejected(client, user_headers):
+    assert place(client, user_headers, items=[]).status_code == 400
+    assert place(client, user_headers, items=[{"book_id": 1, "quantity": 9}]).status_code == 400
+    assert place(client, user_headers, items=[{"book_id": 999, "quantity": 1}]).status_code == 404
+
+def seed_orders(session, user_id, dates):
+    for i, order_date in enumerate(dates, start=1):
+        session.add(Order(id=user_id * 100 + i, user_id=user_id, order_date=order_date, order_amount=10))
+        session.add(OrderItem(id=user_id * 100 + i, order_id=user_id * 100 + i, book_id=i, quantity=1, price=10))
+    session.commit()
+
+def test_order_history_pages_cover_every_order_once(client, session, user_headers):
+    dates = [datetime(2022, 1, 1 + i % 4) for i in range(9)] + [None, None]
+    seed_orders(session, 1, dates)
+    seed_orders(session, 2, [datetime(2022, 1, 1)])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/orders/", params=params, headers=user_headers).json()
+        assert body["total"] == 11
+        assert len(body["items"]) <= 3
+        seen += body["items"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(order["id"] for order in seen) == list(range(101, 112))
+    # Undated orders first, then newest first with ties broken by id
+    assert [order["order_date"] for order in seen[:2]] == [None, None]
+    keys = [(order["order_date"], order["id"]) for order in seen[2:]]
+    assert keys == sorted(keys, reverse=True)
+    assert all("items" in order for order in seen)
+
+def test_order_history_summary_leaves_items_out(client, session, user_headers):
+    seed_orders(session, 1, [datetime(2022, 1, 1), datetime(2022, 1, 2)])
+    body = client.get("/orders/", params={"summary": True}, headers=user_headers).json()
+    assert body["total"] == 2
+    assert [order["id"] for order in body["items"]] == [102, 101]
+    assert all("items" not in order for order in body["items"])
+
+def test_order_history_rejects_garbage_cursors(client, user_headers):
+    assert client.get("/orders/", params={"cursor": "xyz"}, headers=user_headers).status_code == 400
@@ -0,0 +1,34 @@
+import pytest
+
+from app.instrumentation import collect_request_stats
+from app.loading import LazyLoadError, strict_loading
+from app.models.book import Book
+from app.services.books_on_sale import get_books_on_sale
+from app.services.books_popular import get_popular_books
+from app.services.books_recommended import get_recommended_books
+
+# Each listing is one query for the books (author included) whatever the limit
+LISTINGS = [get_popular_books, get_recommended_books, get_books_on_sale]
+
+def statements(listing, session, limit):
+    # Lazy loads raise in strict mode, so a formatting loop cannot add queries unseen
+    with strict_loading(), collect_request_stats() as stats:
+        listing(limit=limit, session=session)
+    return stats.statements
+
+@pytest.mark.parametrize("listing", LISTINGS, ids=lambda listing: listing.__name__)
+def test_listing_runs_a_fixed_number_of_statements(session, listing):
+    small = statements(listing, session, 2)
+    large = statements(listing, session, 20)
+
+    assert small == large == 1
+
+@pytest.mark.parametrize("listing", LISTINGS, ids=lambda listing: listing.__name__)
+def test_cached_listing_runs_no_statements(session, listing):
+    statements(listing, session, 5)
+    assert statements(listing, session, 5) == 0
+
+def test_strict_mode_refuses_lazy_loads(session):
+    book = session.get(Book, 1)
+    with strict_loading(), pytest.raises(LazyLoadError):
+        book.reviews
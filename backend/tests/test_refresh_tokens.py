@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.auth.auth_handler import create_refresh_token
+from app.auth.auth_service import (
+    create_refresh_token_in_db, delete_expired_refresh_tokens, get_refresh_token, refresh_token_cache, utc_now
+)
+from app.main import app
+from app.models.refresh_token import RefreshToken
+from tests.conftest import PASSWORD
+
+def login(client, email="alice@example.com"):
+    response = client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()["access_token"], client.cookies["refresh_token"]
+
+def refresh(client, token):
+    client.cookies.set("refresh_token", token)
+    return client.post("/auth/refresh")
+
+def test_refresh_issues_an_access_token(client):
+    _, token = login(client)
+    response = refresh(client, token)
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "alice@example.com"
+
+def test_logout_revokes_the_refresh_token(client):
+    _, token = login(client)
+    assert client.post("/auth/logout").status_code == 200
+
+    assert refresh(client, token).status_code == 401
+    # Also once the worker forgot the token and reads it from the database
+    refresh_token_cache.clear()
+    assert refresh(client, token).status_code == 401
+
+def test_logout_all_revokes_every_session_of_the_user(client, db):
+    other_device = TestClient(app)
+    access_token, token = login(client)
+    _, other_token = login(other_device)
+    _, admin_token = login(TestClient(app), "bob@example.com")
+
+    response = client.post("/auth/logout-all", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+
+    assert refresh(client, token).status_code == 401
+    assert refresh(other_device, other_token).status_code == 401
+    assert refresh(client, admin_token).status_code == 200
+
+def test_sweep_deletes_expired_and_revoked_tokens(client, session):
+    _, revoked = login(client)
+    client.post("/auth/logout")
+    _, valid = login(client)
+    expired = create_refresh_token({"sub": "1"})
+    create_refresh_token_in_db(session, 1, expired, utc_now() - timedelta(minutes=1))
+
+    assert delete_expired_refresh_tokens(session, batch_size=1) == 1
+    assert delete_expired_refresh_tokens(session) == 1
+    assert delete_expired_refresh_tokens(session) == 0
+
+    assert len(session.exec(select(RefreshToken)).all()) == 1
+    refresh_token_cache.clear()
+    assert get_refresh_token(session, valid) is not None
+    assert get_refresh_token(session, revoked) is None
+    assert get_refresh_token(session, expired) is None
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useParams } from "react-router-dom";
-import { booksApi } from "../services/api/books";
+import { booksApi, coverImage } from "../services/api/books";
+import { CoverUrls } from "../types/book";
 import { addToCart as addItemToCart, getCartItems } from "../services/cart";
 
 type ProductPageProps = {
@@ -13,6 +14,7 @@ interface BookDetail {
   title: string;
   summary: string;
   cover: string;
+  cover_urls?: CoverUrls | null;
   original_price: number;
   discount_price?: number;
   final_price: number;
@@ -164,7 +166,7 @@ const ProductPage: React.FC<ProductPageProps> = ({ addToCart }) => {
               <div className="w-full md:w-[200px] relative">
                 <div className="bg-gray-100">
                   <img
-                    src={book.cover ? `/covers/${book.cover}.jpg` : '/covers/default.jpg'}
+                    src={coverImage(book, 'detail')}
                     alt={book.title}
                     onError={(e) => {
                       // Khi ảnh lỗi, thay thế bằng ảnh mặc định
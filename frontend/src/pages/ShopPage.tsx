@@ -2,8 +2,9 @@ import { useState, useEffect } from "react";
 import { FaChevronDown, FaChevronUp } from "react-icons/fa";
 import { Link, useSearchParams } from "react-router-dom";
 import BookCard from '../components/BookCard';
-import { booksApi } from '../services/api/books';
+import { booksApi, coverImage } from '../services/api/books';
 import { API_BASE_URL } from '../services/api';
+import { CoverUrls } from '../types/book';
 
 // Define interfaces for our data types
 interface Category {
@@ -28,6 +29,7 @@ interface Book {
   discount_price?: number;
   final_price: number;
   cover?: string;
+  cover_urls?: CoverUrls | null;
   category_id: number;
   category_name?: string;
   author_id: number;
@@ -452,7 +454,7 @@ const ShopPage = () => {
                     <BookCard
                       title={book.title}
                       author={book.author_name || "Unknown Author"}
-                      image={book.cover ? `/covers/${book.cover}.jpg` : '/covers/default.png'}
+                      image={coverImage(book)}
                       originalPrice={book.original_price}
                       salePrice={book.final_price}
                       rating={book.avg_rating}
@@ -1,4 +1,4 @@
-import { Book } from '../../types/book.ts';
+import { Book, CoverUrls } from '../../types/book.ts';
 import { API_BASE_URL, handleResponse } from './index.ts';
 
 // Backend API response format
@@ -10,6 +10,7 @@ interface BackendBook {
   discount_price: number;
   final_price: number;
   cover: string;
+  cover_urls?: CoverUrls | null;
   category_id: number;
   author_id: number;
   author_name?: string;
@@ -17,6 +18,17 @@ interface BackendBook {
   avg_rating?: number;
 }
 
+// Resized WebP cover served by the API, falling back to the bundled originals
+export const coverImage = (
+  book: { cover?: string | null; cover_urls?: CoverUrls | null },
+  size: keyof CoverUrls = 'card'
+): string => {
+  if (book.cover_urls) {
+    return `${API_BASE_URL}${book.cover_urls[size].webp}`;
+  }
+  return book.cover ? `/covers/${book.cover}.jpg` : '/covers/default.jpg';
+};
+
 // Define the parameters for getBooks
 interface GetBooksParams {
   category_id?: number;
@@ -41,6 +53,7 @@ interface BookDetail {
   title: string;
   summary: string;
   cover: string;
+  cover_urls?: CoverUrls | null;
   author_id?: number;
   category_id?: number;
 
@@ -108,7 +121,7 @@ export const booksApi = {
       id: book.id,
       title: book.title,
       author: book.author_name || `Author #${book.author_id}`,
-      image: book.cover ? `/covers/${book.cover}.jpg` : '/covers/default.jpg',
+      image: coverImage(book),
       price: book.original_price,
       discountPrice: book.discount_price,
       rating: book.avg_rating || 0,
@@ -134,7 +147,7 @@ export const booksApi = {
       id: book.id,
       title: book.title,
       author: book.author_name || `Author #${book.author_id}`,
-      image: book.cover ? `/covers/${book.cover}.jpg` : '/covers/default.jpg',
+      image: coverImage(book),
       price: book.original_price,
       discountPrice: book.final_price,
       rating: book.avg_rating || 0,
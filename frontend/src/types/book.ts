@@ -1,3 +1,6 @@
+// Resized cover image URLs returned by the API, by size and format
+export type CoverUrls = Record<'thumbnail' | 'card' | 'detail', { webp: string; jpeg: string }>;
+
 export interface Book {
   id: number;
   title: string;